@@ -0,0 +1,298 @@
+"""
+Benchmarks of the client hot paths.
+
+    python -m benchmarks.run                        # run and print
+    python -m benchmarks.run --save 0.1.4           # also write benchmarks/baselines/0.1.4.json
+    python -m benchmarks.run --compare 0.1.4        # compare with a saved baseline
+    python -m benchmarks.run --quick -k transform   # smaller sizes, only matching benchmarks
+
+Micro benchmarks report the best time per call in seconds. End-to-end benchmarks run FlopsClient against
+a local StubServer and report throughput (calls/s) and latency percentiles.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from copy import deepcopy
+from datetime import datetime
+from time import perf_counter
+from timeit import repeat
+
+from flops.client import FlopsClient
+from flops.decoders import OrjsonDecoder, StdlibDecoder, UnderscoreDecoder, orjson
+from flops.helpers import order_list_by_dict_key, transform_dict_keys_to_underscore, underscore_to_camelcase
+from flops.stub import StubServer
+from flops.tests.helpers import FakeResponse, FakeSession
+from flops.tests.payloads import make_install_spec, make_vms_response
+from flops.validators import FlopsValidator
+from flops.watch import VMWatcher
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+SIZES = (10, 100, 1000, 10000, 100000)
+QUICK_SIZES = (10, 100, 1000)
+CONCURRENCY = (1, 4, 16, 64)
+E2E_CALLS = 2000
+QUICK_E2E_CALLS = 200
+STUB_LATENCY = 0.002
+REGRESSION_THRESHOLD = 1.1
+
+
+def best_time(func, total_items):
+    number = max(1, 20000 // total_items)
+    return min(repeat(func, number=number, repeat=5)) / number
+
+
+def bench_transform_dict_keys_to_underscore(size):
+    data = make_vms_response(size)
+    return {'seconds': best_time(lambda: transform_dict_keys_to_underscore(data), size)}
+
+
+def legacy_camelcase_to_underscore(value):
+    # the per-character implementation replaced by the memoized transform
+    return ''.join('_' + char.lower() if char.isupper() else char.lower() for char in value)
+
+
+def legacy_transform_dict_keys_to_underscore(data):
+    if isinstance(data, dict):
+        return {legacy_camelcase_to_underscore(k): legacy_transform_dict_keys_to_underscore(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [legacy_transform_dict_keys_to_underscore(v) for v in data]
+    return data
+
+
+def bench_transform_dict_keys_to_underscore_legacy(size):
+    """
+    Reference for bench_transform_dict_keys_to_underscore: _process_response used to transform the payload
+    twice with the per-character implementation.
+    """
+    if size > 10000:  # minutes per size
+        return None
+    data = make_vms_response(size)
+    assert legacy_transform_dict_keys_to_underscore(data) == transform_dict_keys_to_underscore(data)
+    return {'seconds': best_time(
+        lambda: legacy_transform_dict_keys_to_underscore(legacy_transform_dict_keys_to_underscore(data)), size)}
+
+
+def bench_underscore_to_camelcase(size):
+    keys = ['{}_{}_id'.format(key, i % 50) for i, key in enumerate(['tenant', 'public_key', 'vm'] * size)][:size]
+    return {'seconds': best_time(lambda: [underscore_to_camelcase(k) for k in keys], size)}
+
+
+def bench_order_list_by_dict_key(size):
+    data = transform_dict_keys_to_underscore(make_vms_response(size))['result']
+    return {'seconds': best_time(lambda: order_list_by_dict_key(data, key='cpu'), size)}
+
+
+def bench_process_response(size):
+    response = FakeResponse(make_vms_response(size))
+    client = FlopsClient('client_id', 'api_key')
+    return {'seconds': best_time(lambda: client._process_response(response), size)}
+
+
+def bench_process_response_stdlib(size):
+    response = FakeResponse(make_vms_response(size))
+    client = FlopsClient('client_id', 'api_key', json_decoder=StdlibDecoder())
+    return {'seconds': best_time(lambda: client._process_response(response), size)}
+
+
+def bench_process_response_fused(size):
+    response = FakeResponse(make_vms_response(size))
+    client = FlopsClient('client_id', 'api_key', json_decoder=UnderscoreDecoder())
+    return {'seconds': best_time(lambda: client._process_response(response), size)}
+
+
+def bench_process_response_orjson(size):
+    if orjson is None:
+        return None
+    response = FakeResponse(make_vms_response(size))
+    client = FlopsClient('client_id', 'api_key', json_decoder=OrjsonDecoder())
+    return {'seconds': best_time(lambda: client._process_response(response), size)}
+
+
+def bench_process_response_lazy(size):
+    response = FakeResponse(make_vms_response(size))
+    client = FlopsClient('client_id', 'api_key', json_decoder=StdlibDecoder(), lazy_responses=True)
+    return {'seconds': best_time(lambda: client._process_response(response)['result'][0]['id'], size)}
+
+
+def bench_process_response_lazy_orjson(size):
+    if orjson is None:
+        return None
+    response = FakeResponse(make_vms_response(size))
+    client = FlopsClient('client_id', 'api_key', json_decoder=OrjsonDecoder(), lazy_responses=True)
+    return {'seconds': best_time(lambda: client._process_response(response)['result'][0]['id'], size)}
+
+
+def bench_get_vms_lazy(size):
+    response = FakeResponse(make_vms_response(size))
+    client = FlopsClient('client_id', 'api_key', json_decoder=StdlibDecoder(), lazy_responses=True)
+    client._session = FakeSession({'vm': lambda params: response})
+    return {'seconds': best_time(lambda: client.get_vms()[0]['id'], size)}
+
+
+def bench_watch_diff(size):
+    previous = transform_dict_keys_to_underscore(make_vms_response(size))['result']
+    current = deepcopy(previous)  # a new poll returns equal but distinct records
+    watcher = VMWatcher(client=None)
+    watcher.diff(previous)
+    return {'seconds': best_time(lambda: watcher.diff(current), size)}
+
+
+def bench_validate_create(size):
+    specs = [make_install_spec(i) for i in range(size)]
+    return {'seconds': best_time(lambda: [FlopsValidator._validate_create(spec) for spec in specs], size)}
+
+
+def bench_validate_many(size):
+    specs = [make_install_spec(i) for i in range(size)]
+    return {'seconds': best_time(lambda: FlopsValidator.validate_many(specs), size)}
+
+
+MICRO_BENCHMARKS = (
+    bench_transform_dict_keys_to_underscore,
+    bench_transform_dict_keys_to_underscore_legacy,
+    bench_underscore_to_camelcase,
+    bench_order_list_by_dict_key,
+    bench_process_response,
+    bench_process_response_stdlib,
+    bench_process_response_fused,
+    bench_process_response_orjson,
+    bench_process_response_lazy,
+    bench_process_response_lazy_orjson,
+    bench_get_vms_lazy,
+    bench_watch_diff,
+    bench_validate_create,
+    bench_validate_many,
+)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_e2e(server, method, items, concurrency):
+    client = server.client()
+    client.get_vms()  # fills the tenant cache like a long-running worker
+
+    def timed(item):
+        started_at = perf_counter()
+        getattr(client, method)(item)
+        return perf_counter() - started_at
+
+    started_at = perf_counter()
+    results = client.map(timed, items, concurrency=concurrency)
+    elapsed = perf_counter() - started_at
+
+    errors = [r.exception for r in results if not r.ok]
+    if errors:
+        raise errors[0]
+    latencies = [r.result for r in results]
+    return {
+        'throughput': len(items) / elapsed,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+    }
+
+
+def e2e_benchmarks(calls):
+    def bench(method):
+        def run(concurrency):
+            with StubServer(latency=STUB_LATENCY) as server:
+                vm_ids = [server.add_vm('vm-{}'.format(i))['id'] for i in range(100)]
+                return run_e2e(server, method, [vm_ids[i % len(vm_ids)] for i in range(calls)], concurrency)
+        run.__name__ = 'bench_e2e_{}'.format(method)
+        return run
+
+    return bench('get_vm'), bench('reboot_vm')
+
+
+def baseline_path(name):
+    return name if name.endswith('.json') else os.path.join(BASELINES_DIR, name + '.json')
+
+
+def save(results, name):
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    document = {
+        'meta': {
+            'name': name, 'date': datetime.now().isoformat(), 'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    with open(baseline_path(name), 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+
+
+def compare(results, name):
+    """
+    :return: names of the benchmarks slower than the baseline by more than REGRESSION_THRESHOLD
+    """
+    with open(baseline_path(name)) as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for key, metrics in sorted(results.items()):
+        if key not in baseline:
+            continue
+        if 'seconds' in metrics:
+            ratio = metrics['seconds'] / baseline[key]['seconds']
+        else:
+            ratio = baseline[key]['throughput'] / metrics['throughput']
+        flag = ''
+        if ratio > REGRESSION_THRESHOLD:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print('{:<50} {:>7.2f}x slower{}'.format(key, ratio, flag) if ratio >= 1 else
+              '{:<50} {:>7.2f}x faster'.format(key, 1 / ratio))
+    return regressions
+
+
+def print_results(results):
+    for key, metrics in sorted(results.items()):
+        if 'seconds' in metrics:
+            print('{:<50} {:>12.6f} s'.format(key, metrics['seconds']))
+        else:
+            print('{:<50} {:>9.0f} calls/s  p50 {:.4f}  p95 {:.4f}  p99 {:.4f}'.format(
+                key, metrics['throughput'], metrics['p50'], metrics['p95'], metrics['p99']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='flops client benchmarks')
+    parser.add_argument('--quick', action='store_true', help='small payloads and fewer end-to-end calls')
+    parser.add_argument('-k', dest='name_filter', help='run only benchmarks containing this substring')
+    parser.add_argument('--save', metavar='NAME', help='save results as a baseline')
+    parser.add_argument('--compare', metavar='NAME', help='compare results with a saved baseline')
+    args = parser.parse_args(argv)
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    calls = QUICK_E2E_CALLS if args.quick else E2E_CALLS
+
+    results = {}
+    for func in MICRO_BENCHMARKS:
+        for size in sizes:
+            key = '{}[{}]'.format(func.__name__[len('bench_'):], size)
+            if not args.name_filter or args.name_filter in key:
+                result = func(size)
+                if result is not None:  # None when skipped, e.g. an optional dependency is missing
+                    results[key] = result
+    for func in e2e_benchmarks(calls):
+        for concurrency in CONCURRENCY:
+            key = '{}[c={}]'.format(func.__name__[len('bench_'):], concurrency)
+            if not args.name_filter or args.name_filter in key:
+                results[key] = func(concurrency)
+
+    print_results(results)
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        print()
+        if compare(results, args.compare):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
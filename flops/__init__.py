@@ -3,11 +3,7 @@ flops.ru API client (http://bit.ly/flops_ru)
 """
 
 from .client import FlopsClient
+from .async_client import AsyncFlopsClient
 
 __author__ = 'Anton Tuchak ( https://github.com/atuchak )'
 __author_email__ = 'anton.tuchak@gmail.com'
-
-
-
-
-
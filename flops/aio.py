@@ -0,0 +1,173 @@
+"""
+Minimal asyncio HTTP/1.1 client used by AsyncFlopsClient: GET requests over keep-alive connections
+reused from a pool, so many concurrent requests need neither threads nor extra dependencies.
+
+Errors are the ones of requests (requests.ConnectionError, requests.Timeout), so retries and error
+handling work the same for both clients.
+"""
+import asyncio
+import ssl
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+
+import requests
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class AsyncResponse(namedtuple('AsyncResponse', ['status_code', 'headers', 'content'])):
+    """
+    status_code and content as on requests.Response; headers have lower case names.
+    """
+
+
+def query_string(params):
+    """
+    Encodes params the way requests does: None values are dropped and lists become repeated keys.
+    """
+    return urlencode([(k, v) for k, v in params.items() if v is not None], doseq=True)
+
+
+async def _read_headers(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('connection closed by the server')
+    version, status_code = status_line.split(None, 2)[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return version, int(status_code), headers
+
+
+async def _read_body(reader, headers):
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0], 16)
+            if not size:
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):  # trailers
+            pass
+        return b''.join(chunks), True
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length'])), True
+    return await reader.read(), False
+
+
+class AsyncConnectionPool:
+    """
+    Keeps up to maxsize idle connections per host and allows at most maxsize requests in flight.
+    The pool belongs to the event loop that used it first; used from another loop it starts over.
+
+    :param timeout: (connect, read) seconds, as the timeout of FlopsClient
+    """
+
+    def __init__(self, maxsize=32, timeout=(5, 60), ssl_context=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._loop = None
+        self._idle = {}
+        self._semaphore = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._drop_idle()
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.maxsize)
+
+    def _drop_idle(self):
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for _, writer in connections:
+                if not writer.transport.is_closing() and self._loop is not None and not self._loop.is_closed():
+                    writer.close()
+
+    async def _connect(self, scheme, host, port):
+        context = None
+        if scheme == 'https':
+            context = self.ssl_context = self.ssl_context or ssl.create_default_context()
+        try:
+            return await asyncio.wait_for(asyncio.open_connection(host, port, ssl=context), self.timeout[0])
+        except asyncio.TimeoutError:
+            raise requests.ConnectTimeout('connect to {}:{} timed out'.format(host, port))
+        except OSError as e:
+            raise requests.ConnectionError(e)
+
+    async def _request(self, reader, writer, request):
+        writer.write(request)
+        await writer.drain()
+        version, status_code, headers = await _read_headers(reader)
+        content, reusable = await _read_body(reader, headers)
+        reusable = reusable and version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        return AsyncResponse(status_code, headers, content), reusable
+
+    async def get(self, url, params=None, headers=None):
+        """
+        :return: AsyncResponse of a GET request
+        """
+        self._bind()
+        parts = urlsplit(url)
+        port = parts.port or DEFAULT_PORTS[parts.scheme]
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or '/'
+        query = '&'.join(q for q in (parts.query, query_string(params or {})) if q)
+        if query:
+            target += '?' + query
+        lines = ['GET {} HTTP/1.1'.format(target), 'Host: {}'.format(parts.netloc), 'Connection: keep-alive',
+                 'Accept-Encoding: identity']
+        lines.extend('{}: {}'.format(name, value) for name, value in (headers or {}).items())
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        async with self._semaphore:
+            reader, writer = self._idle_connection(key) or await self._connect(*key)
+            try:
+                response, reusable = await asyncio.wait_for(self._request(reader, writer, request), self.timeout[1])
+            except asyncio.TimeoutError:
+                writer.close()
+                raise requests.ReadTimeout('read from {} timed out'.format(parts.netloc))
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                writer.close()
+                raise requests.ConnectionError(e)
+            except BaseException:  # cancelled in the middle of the response
+                writer.close()
+                raise
+            idle = self._idle.setdefault(key, [])
+            if reusable and len(idle) < self.maxsize:
+                idle.append((reader, writer))
+            else:
+                writer.close()
+            return response
+
+    def _idle_connection(self, key):
+        """
+        :return: an idle (reader, writer) the server did not close yet, or None
+        """
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.transport.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    def close(self):
+        """
+        Closes the idle connections. Connections of an event loop already closed are left to the garbage collector.
+        """
+        self._drop_idle()
+
+    async def aclose(self):
+        """
+        Closes the idle connections and waits until they are closed.
+        """
+        writers = [writer for connections in self._idle.values() for _, writer in connections]
+        self._drop_idle()
+        await asyncio.gather(*(writer.wait_closed() for writer in writers), return_exceptions=True)
@@ -0,0 +1,268 @@
+"""
+asyncio interface to the flops.ru API.
+
+AsyncFlopsClient exposes the FlopsClient API methods as coroutines. Requests are sent by an asyncio
+connection pool (flops.aio) on the running event loop, so hundreds of concurrent calls need no threads;
+concurrency bounds the requests in flight.
+
+The method bodies are the ones of FlopsClient. A call runs the FlopsClient method until it needs a
+response, awaits that request, and runs the method again with the responses received so far, until it
+returns. Error mapping, key transforms, tenant resolution and caches are therefore shared with FlopsClient.
+The cache lookups of a call are replayed as well, so caches filled by concurrent calls do not change the
+requests of a method body run again.
+
+Methods that run their own threads or keep a reference to the client (SYNC_ONLY) are not exposed;
+wait_for_operation, wait_for_operations and watch_vms have asyncio versions.
+"""
+
+import asyncio
+import contextvars
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from flops.aio import AsyncConnectionPool
+from flops.client import FlopsClient
+from flops.exceptions import ApiLimitError, OperationTimeoutError
+from flops.metrics import RequestInfo
+from flops.operations import OperationScheduler
+from flops.watch import VMWatcher
+
+SYNC_ONLY = frozenset([
+    'map', 'batch', 'inventory', 'provision_many', 'rolling_resize', 'prune_snapshots', 'sync_pubkeys',
+    'operation', 'wait_for_operation', 'wait_for_operations', 'watch_vms', 'add_hook', 'remove_hook', 'close',
+    'aclose',
+])
+
+_replay = contextvars.ContextVar('flops_replay')
+_missing = object()
+
+
+class _PendingRequest(BaseException):
+    """
+    Raised out of a FlopsClient method body when it needs a response not received yet.
+    A BaseException, so the method's own error handling can not catch it.
+    """
+
+    def __init__(self, url, params, purpose):
+        super().__init__(url)
+        self.url = url
+        self.params = params
+        self.purpose = purpose
+
+
+class _Replay:
+    def __init__(self):
+        self.responses = []  # [(url, params, data, exception)] in request order
+        self.position = 0
+        self.lookups = []  # [(cache, key, value)] in lookup order
+        self.lookup_position = 0
+
+
+class _ReplayCache:
+    """
+    Cache wrapper answering the lookups a call already made from its replay, so that a cache filled by
+    another call in the meantime does not change the requests of a method body run again.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, key, default=None):
+        replay = _replay.get(None)
+        if replay is None:
+            return self.cache.get(key, default)
+        if replay.lookup_position < len(replay.lookups):
+            cache, lookup_key, value = replay.lookups[replay.lookup_position]
+            if (cache, lookup_key) != (self.cache, key):
+                raise RuntimeError('{} looked up on replay instead of {}'.format(key, lookup_key))
+        else:
+            value = self.cache.get(key, default)
+            replay.lookups.append((self.cache, key, value))
+        replay.lookup_position += 1
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+
+class _ReplayClient(FlopsClient):
+    """
+    FlopsClient whose requests and cache lookups are answered from the replay of the current call.
+    Method bodies must not depend on anything but their arguments, the cache lookups and the responses.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = _ReplayCache(self.cache)
+        self._default_tenant = _ReplayCache(self._default_tenant)
+        self._vm_tenants = _ReplayCache(self._vm_tenants)
+
+    def _perform_request(self, url, params=None):
+        if params is None:
+            params = {}
+        replay = _replay.get()
+        if replay.position == len(replay.responses):
+            raise _PendingRequest(url, params, getattr(self._local, 'purpose', None))
+        request_url, request_params, data, exception = replay.responses[replay.position]
+        if (request_url, request_params) != (url, params):
+            raise RuntimeError('{} made a different request on replay: {}'.format(url, request_url))
+        replay.position += 1
+        if exception is not None:
+            raise exception
+        return data
+
+
+class AsyncFlopsClient:
+    client_class = _ReplayClient
+
+    def __init__(self, client_id='', api_key='', concurrency=32, **kwargs):
+        """
+        :param concurrency: maximum number of requests in flight, also the connection pool size
+        :param kwargs: FlopsClient attributes (endpoint, timeout, retry_policy, rate_limiter, hooks, ...)
+        """
+        self.concurrency = concurrency
+        kwargs['operation_handles'] = False  # Operation handles are resolved by a polling thread
+        self._client = self.client_class(client_id, api_key, **kwargs)
+        self._pool = AsyncConnectionPool(maxsize=concurrency, timeout=self._client.timeout)
+
+    @property
+    def endpoint(self):
+        return self._client.endpoint
+
+    @endpoint.setter
+    def endpoint(self, value):
+        self._client.endpoint = value
+
+    def add_hook(self, event, hook):
+        self._client.add_hook(event, hook)
+
+    def remove_hook(self, event, hook):
+        self._client.remove_hook(event, hook)
+
+    async def _call(self, _method_name, *args, **kwargs):
+        method = getattr(self._client, _method_name)
+        replay = _Replay()
+        while True:
+            replay.position = replay.lookup_position = 0
+            token = _replay.set(replay)
+            try:
+                return method(*args, **kwargs)
+            except _PendingRequest as e:
+                pending = e
+            finally:
+                _replay.reset(token)
+            try:
+                data, exception = await self._perform_request(pending.url, pending.params, pending.purpose), None
+            except Exception as e:
+                data, exception = None, e
+            replay.responses.append((pending.url, pending.params, data, exception))
+
+    async def _perform_request(self, url, params, purpose=None):
+        client = self._client
+        endpoint, request_url, request_params = client._prepare_request(url, params)
+        attempt = 1
+        while True:
+            info = RequestInfo(url, endpoint, params, purpose, attempt)
+            try:
+                return await self._send(request_url, request_params, info)
+            except Exception as e:
+                if client.retry_policy is None or not client.retry_policy.should_retry(endpoint, e, attempt):
+                    e.attempts = attempt
+                    raise
+            await asyncio.sleep(client.retry_policy.delay(attempt))
+            attempt += 1
+
+    async def _send(self, url, params, info):
+        client = self._client
+        client._run_hooks('on_request', info)
+        if client.rate_limiter is not None:
+            delay = client.rate_limiter.reserve(info.endpoint)
+            if delay:
+                await asyncio.sleep(delay)
+
+        started_at = perf_counter()
+        try:
+            response = await self._pool.get(url, params, headers={'Content-type': 'application/json'})
+            info.status_code = response.status_code
+            info.bytes = len(response.content)
+            data = client._process_response(response, info)
+        except Exception as e:
+            info.elapsed = perf_counter() - started_at
+            info.error = e
+            if client.rate_limiter is not None and isinstance(e, ApiLimitError):
+                client.rate_limiter.on_limit(info.endpoint)
+            client._run_hooks('on_error', info)
+            raise
+        info.elapsed = perf_counter() - started_at
+        if client.rate_limiter is not None:
+            client.rate_limiter.on_success(info.endpoint)
+        client._run_hooks('on_response', info)
+        return data
+
+    async def wait_for_operation(self, operation_id, timeout=None, polling_time=0.5):
+        started_at = datetime.now()
+        while True:
+            res = await self.get_operation_status(operation_id)
+            if res['status'].lower() == 'done':
+                return res
+            if timeout and datetime.now() - started_at > timedelta(seconds=timeout):
+                raise OperationTimeoutError
+            await asyncio.sleep(polling_time)
+
+    async def wait_for_operations(self, operation_ids, timeout=None, **kwargs):
+        scheduler = OperationScheduler(set(operation_ids), timeout=timeout, **kwargs)
+        while scheduler:
+            delay, operation_id = scheduler.pop()
+            if delay:
+                await asyncio.sleep(delay)
+            status = await self.get_operation_status(operation_id)
+            if scheduler.report(operation_id, status):
+                yield status
+
+    async def watch_vms(self, interval=5, jitter=0.1, emit_initial=True):
+        watcher = VMWatcher(self, interval=interval, jitter=jitter, emit_initial=emit_initial)
+        while True:
+            for change in watcher.diff(await self.get_vms()):
+                yield change
+            await asyncio.sleep(watcher.next_delay())
+
+    def close(self):
+        """
+        Closes the idle connections without waiting. Prefer aclose() or async with inside the event loop.
+        """
+        self._pool.close()
+        self._client.close()
+
+    async def aclose(self):
+        await self._pool.aclose()
+        self._client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+
+def _make_api_method(name):
+    method = getattr(FlopsClient, name)
+
+    async def api_method(self, *args, **kwargs):
+        return await self._call(name, *args, **kwargs)
+
+    api_method.__name__ = name
+    api_method.__doc__ = method.__doc__
+    return api_method
+
+
+# every public FlopsClient method, so methods added to the mixins are exposed without listing them here
+API_METHODS = tuple(
+    name for name in dir(FlopsClient)
+    if not name.startswith('_') and callable(getattr(FlopsClient, name)) and name not in SYNC_ONLY
+)
+
+for _name in API_METHODS:
+    setattr(AsyncFlopsClient, _name, _make_api_method(_name))
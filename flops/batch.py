@@ -0,0 +1,115 @@
+from collections import namedtuple
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+from itertools import islice
+from time import monotonic
+
+from flops.exceptions import OperationTimeoutError
+from flops.operations import Operation
+
+
+class BatchResult(namedtuple('BatchResult', ['item', 'result', 'exception', 'operation'])):
+    """
+    Outcome of one call of a batch. operation holds the finished operation status when the batch waited for it.
+    """
+
+    @property
+    def ok(self):
+        return self.exception is None
+
+
+def _operation_id(result):
+    if isinstance(result, Mapping):
+        return result.get('operation_id')
+
+
+def _wait_for_operations(client, results, timeout):
+    deadline = monotonic() + timeout if timeout else None
+    indexes = {}
+    for index, res in enumerate(results):
+        if res.ok and _operation_id(res.result) is not None:
+            indexes.setdefault(_operation_id(res.result), []).append(index)
+
+    handles = [index for index, res in enumerate(results) if res.ok and isinstance(res.result, Operation)]
+    wait_futures([results[index].result for index in handles], timeout=timeout)
+    for index in handles:
+        operation = results[index].result
+        if not operation.done():
+            results[index] = results[index]._replace(exception=OperationTimeoutError(operation.operation_id))
+        elif operation.exception():
+            results[index] = results[index]._replace(exception=operation.exception())
+        else:
+            results[index] = results[index]._replace(operation=operation.result())
+
+    if deadline is not None:
+        # the rest of the timeout; not 0, which means no timeout, so the first poll still reports finished ones
+        timeout = max(deadline - monotonic(), 0.001)
+    try:
+        for status in client.wait_for_operations(list(indexes), timeout=timeout):
+            for index in indexes.pop(status['id']):
+                results[index] = results[index]._replace(operation=status)
+    except Exception as e:
+        for pending in indexes.values():
+            for index in pending:
+                results[index] = results[index]._replace(exception=e)
+    return results
+
+
+def run_batch(client, method, items, args=(), kwargs=None, concurrency=None, wait=False, timeout=None):
+    if isinstance(method, str):
+        method = getattr(client, method)
+    kwargs = kwargs or {}
+    items = list(items)
+
+    def call(item):
+        try:
+            return BatchResult(item, method(item, *args, **kwargs), None, None)
+        except Exception as e:
+            return BatchResult(item, None, e, None)
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(concurrency or client.batch_concurrency, len(items))) as executor:
+        results = list(executor.map(call, items))
+    if wait:
+        results = _wait_for_operations(client, results, timeout)
+    return results
+
+
+def imap_bounded(func, items, concurrency):
+    """
+    Calls func(item) on a thread pool and yields the results in the order they finish. At most concurrency
+    calls are in flight; the next item is submitted only when a call finished. Closing the generator waits
+    for the calls in flight and never starts the remaining items.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {executor.submit(func, item) for item in islice(items, concurrency)}
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.update(executor.submit(func, item) for item in islice(items, 1))
+                yield future.result()
+
+
+class Batch:
+    """
+    Runs any client method over a set of items: client.batch(vm_ids).reboot_vm()
+    """
+
+    def __init__(self, client, items, concurrency=None, wait=False, timeout=None):
+        self.client = client
+        self.items = list(items)
+        self.concurrency = concurrency
+        self.wait = wait
+        self.timeout = timeout
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def call(*args, **kwargs):
+            return run_batch(self.client, method, self.items, args=args, kwargs=kwargs,
+                             concurrency=self.concurrency, wait=self.wait, timeout=self.timeout)
+
+        call.__name__ = name
+        return call
@@ -0,0 +1,75 @@
+from bisect import bisect_left, bisect_right
+from itertools import product
+
+from flops.exceptions import NotFoundError
+
+ORDER_FIELDS = ('memory', 'disk', 'cpu', 'price')
+
+
+class TariffCatalog:
+    """
+    Tariffs indexed once for repeated placement queries without network calls or re-sorting.
+
+        catalog = flops_client.tariff_catalog()
+        catalog.smallest(for_windows=False, min_memory=4096, min_cpu=2)  # cheapest matching tariff
+        catalog.query(on_demand=False, max_price=1000, order_by='memory')
+
+    For every for_windows / on_demand combination (None matches both) the tariffs are kept sorted by
+    each of ORDER_FIELDS, so a query bisects the range of its order_by field and filters only that slice.
+    """
+
+    def __init__(self, tariffs):
+        self.tariffs = list(tariffs)
+        self.by_id = {tariff['id']: tariff for tariff in self.tariffs}
+        self._indexes = {}
+        for for_windows, on_demand in product((None, False, True), repeat=2):
+            group = [t for t in self.tariffs if for_windows in (None, t['for_windows'])
+                     and on_demand in (None, t['on_demand'])]
+            for field in ORDER_FIELDS:
+                ordered = sorted(group, key=lambda t: (t[field], t['id']))
+                self._indexes[for_windows, on_demand, field] = ([t[field] for t in ordered], ordered)
+
+    def __len__(self):
+        return len(self.tariffs)
+
+    def __iter__(self):
+        return iter(self.tariffs)
+
+    def get(self, tariff_id):
+        try:
+            return self.by_id[tariff_id]
+        except KeyError:
+            raise NotFoundError(tariff_id)
+
+    def query(self, for_windows=None, on_demand=None, order_by='price', limit=None, **limits):
+        """
+        :param limits: min_<field> / max_<field> inclusive bounds for memory, disk, cpu and price
+        :return: matching tariffs ordered by order_by (then id)
+        """
+        bounds = []
+        for key, value in limits.items():
+            bound, _, field = key.partition('_')
+            if bound not in ('min', 'max') or field not in ORDER_FIELDS:
+                raise TypeError('unexpected limit {}'.format(key))
+            if value is not None and field != order_by:
+                bounds.append((field, value, bound == 'min'))
+
+        values, ordered = self._indexes[for_windows, on_demand, order_by]
+        low, high = limits.get('min_' + order_by), limits.get('max_' + order_by)
+        start = 0 if low is None else bisect_left(values, low)
+        end = len(values) if high is None else bisect_right(values, high)
+
+        result = []
+        for tariff in ordered[start:end]:
+            if all(tariff[field] >= value if is_min else tariff[field] <= value for field, value, is_min in bounds):
+                result.append(tariff)
+                if len(result) == limit:
+                    break
+        return result
+
+    def smallest(self, for_windows=None, on_demand=None, order_by='price', **limits):
+        """
+        :return: the first tariff of query() or None
+        """
+        result = self.query(for_windows, on_demand, order_by=order_by, limit=1, **limits)
+        return result[0] if result else None
@@ -1,5 +1,10 @@
+import threading
+import weakref
+from collections.abc import Mapping
+from contextlib import contextmanager
+from copy import deepcopy
 from datetime import datetime, timedelta
-from time import sleep
+from time import perf_counter, sleep
 
 try:
     from urllib.parse import urljoin
@@ -7,26 +12,144 @@ except ImportError:
     from urlparse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from flops.batch import Batch, run_batch
+from flops.cache import TTLCache
+from flops.catalog import TariffCatalog
+from flops.decoders import default_decoder
 from flops.exceptions import (
     ValidationError, AuthError, NotFoundError, ApiError, OperationTimeoutError,
     OperationError, ApiLimitError,
 )
-from flops.helpers import transform_dict_keys_to_underscore, underscore_to_camelcase, order_list_by_dict_key
+from flops.helpers import (
+    transform_dict_keys_to_underscore, underscore_to_camelcase, order_list_by_dict_key, filter_by_name,
+    endpoint_template,
+)
+from flops.inventory import Inventory
+from flops.keys import KeyRegistry, apply_key_change, plan_pubkey_sync
+from flops.metrics import HOOK_EVENTS, TENANT_LOOKUP, RequestInfo
+from flops.models import Distribution, PublicKeyRecord, SnapshotRecord, Tariff, VMRecord
+from flops.operations import DEFAULT_POLLING_INTERVAL, Operation, OperationPoller, wait_for_operations
+from flops.provision import provision_many
+from flops.resize import rolling_resize
+from flops.retry import SAFE_ENDPOINTS, RetryPolicy
+from flops.singleflight import SingleFlight
+from flops.snapshots import SnapshotTree, prune_snapshots
 from flops.validators import FlopsValidator
+from flops.views import LazyMapping, materialize, peek_field
+from flops.watch import VMWatcher
+
+
+def _close_adapters(adapters):
+    for adapter in adapters:
+        adapter.close()
 
 
 class BaseAPI:
     endpoint = 'https://api.flops.ru/api/v1/'
+    tenant_cache_ttl = 300
+    tenant_cache_size = 10000
+    cache = None
+    cache_ttls = {'tenant': 300, 'tariffs': 3600, 'distribution': 3600, 'software': 3600}
+    batch_concurrency = 16
+    operation_handles = False
+    polling_intervals = None  # operation_type: (first, max) seconds between polls, None for POLLING_INTERVALS
+    default_polling_interval = DEFAULT_POLLING_INTERVAL
+    hooks = None
+    rate_limiter = None
+    retry_policy = RetryPolicy()
+    pool_connections = 10
+    pool_maxsize = 32
+    timeout = (5, 60)  # connect, read seconds
+    per_thread_session = False
+    json_decoder = None
+    lazy_responses = False
+    coalesce_endpoints = SAFE_ENDPOINTS
 
     def __init__(self, client_id='', api_key='', **kwargs):
         self.client_id = client_id
         self.api_key = api_key
-        self._session = requests.Session()
 
         for attr, attr_value in kwargs.items():
             setattr(self, attr, attr_value)
 
+        if self.json_decoder is None:
+            self.json_decoder = default_decoder(transform_keys=not self.lazy_responses)
+        self._session = self._make_session()
+        self._thread_sessions = weakref.WeakSet()
+        self._thread_sessions_lock = threading.Lock()
+
+        self._default_tenant = TTLCache(ttl=self.tenant_cache_ttl, maxsize=1)
+        self._vm_tenants = TTLCache(ttl=self.tenant_cache_ttl, maxsize=self.tenant_cache_size)
+        if self.cache is None:
+            self.cache = TTLCache(maxsize=len(self.cache_ttls))
+        self._operation_poller = OperationPoller(self, intervals=self.polling_intervals,
+                                                 default_interval=self.default_polling_interval)
+        self.hooks = {event: list((self.hooks or {}).get(event, ())) for event in HOOK_EVENTS}
+        self._local = threading.local()
+        self._single_flight = SingleFlight()
+
+    def _make_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _get_session(self):
+        """
+        :return: the shared session or, with per_thread_session, a session owned by the calling thread.
+                 A thread session lives as long as its thread; its connections are closed when the thread exits.
+        """
+        if not self.per_thread_session:
+            return self._session
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._make_session()
+            weakref.finalize(session, _close_adapters, list(session.adapters.values()))
+            with self._thread_sessions_lock:
+                self._thread_sessions.add(session)
+        return session
+
+    def close(self):
+        """
+        Closes the pooled connections of all sessions.
+        """
+        with self._thread_sessions_lock:
+            sessions = list(self._thread_sessions)
+            self._thread_sessions.clear()
+        for session in [self._session] + sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add_hook(self, event, hook):
+        """
+        Registers hook(request_info) for 'on_request', 'on_response' or 'on_error'.
+        """
+        self.hooks[event].append(hook)
+
+    def remove_hook(self, event, hook):
+        self.hooks[event].remove(hook)
+
+    def _run_hooks(self, event, info):
+        for hook in self.hooks[event]:
+            hook(info)
+
+    @contextmanager
+    def _request_purpose(self, purpose):
+        previous = getattr(self._local, 'purpose', None)
+        self._local.purpose = purpose
+        try:
+            yield
+        finally:
+            self._local.purpose = previous
+
     @staticmethod
     def _process_errors(error_message, error_code, field_errors):
         if error_code == 'error.not.owner':
@@ -55,47 +178,146 @@ class BaseAPI:
 
         raise ApiError(error_message)
 
-    def _process_response(self, response):
+    def _process_response(self, response, info=None):
         if response.status_code != 200:
-            raise ApiError
-
-        data = response.json()
-        data = transform_dict_keys_to_underscore(data)
+            error = ApiLimitError('Too many requests') if response.status_code == 429 else ApiError()
+            error.status_code = response.status_code
+            raise error
+
+        started_at = perf_counter()
+        data = self.json_decoder.decode(response.content)
+        decoded_at = perf_counter()
+        if self.lazy_responses:
+            data = LazyMapping(data)
+        elif not self.json_decoder.transforms_keys:
+            data = transform_dict_keys_to_underscore(data)
+        if info is not None:
+            info.decode_time = decoded_at - started_at
+            info.transform_time = perf_counter() - decoded_at
 
         if data['status'] == 'ERROR':
             error_code = data.get('error_code')
             field_errors = data.get('field_errors')  # reinstall_vm
             self._process_errors(error_code=error_code, error_message=data['error_message'], field_errors=field_errors)
 
-        elif 'result' in data and isinstance(data['result'], dict) and data['result'].get('status') == 'ERROR':
+        elif 'result' in data and isinstance(data['result'], Mapping) and data['result'].get('status') == 'ERROR':
             error_code = data['result'].get('error_code')
             error_message = data['result'].get('error_message')
             self._process_errors(error_code=error_code, error_message=error_message, field_errors='')
 
-        return transform_dict_keys_to_underscore(data)
+        return data
+
+    def _prepare_request(self, url, params):
+        """
+        :return: (endpoint template, absolute url, camelCase query params with the credentials)
+        """
+        if not self.client_id or not self.api_key:
+            raise AuthError("client_id or  api_key is not valid")
+
+        request_params = dict(params, client_id=self.client_id, api_key=self.api_key)
+        request_params = {underscore_to_camelcase(k): v for k, v in request_params.items()}
+        return endpoint_template(url), urljoin(self.endpoint, url), request_params
 
     def _perform_request(self, url, params=None):
         if params is None:
             params = {}
 
-        if not self.client_id or not self.api_key:
-            raise AuthError("client_id or  api_key is not valid")
+        endpoint, request_url, request_params = self._prepare_request(url, params)
+        purpose = getattr(self._local, 'purpose', None)
 
-        url = urljoin(self.endpoint, url)
-        params.update({'client_id': self.client_id, 'api_key': self.api_key})
-        params = {underscore_to_camelcase(k): v for k, v in params.items()}
+        if endpoint not in self.coalesce_endpoints:
+            return self._perform_with_retries(url, endpoint, params, purpose, request_url, request_params)
+        key = (request_url, repr(sorted(request_params.items())))
+        return self._single_flight.do(key, lambda: self._perform_with_retries(
+            url, endpoint, params, purpose, request_url, request_params))
+
+    def _perform_with_retries(self, url, endpoint, params, purpose, request_url, request_params):
+        attempt = 1
+        while True:
+            info = RequestInfo(url, endpoint, params, purpose, attempt)
+            try:
+                return self._send(request_url, request_params, info)
+            except Exception as e:
+                if self.retry_policy is None or not self.retry_policy.should_retry(endpoint, e, attempt):
+                    e.attempts = attempt
+                    raise
+            sleep(self.retry_policy.delay(attempt))
+            attempt += 1
+
+    def _send(self, url, params, info):
+        self._run_hooks('on_request', info)
         headers = {'Content-type': 'application/json'}
-        response = self._session.get(url, params=params, headers=headers)
-        return self._process_response(response)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(info.endpoint)
+
+        started_at = perf_counter()
+        try:
+            response = self._get_session().get(url, params=params, headers=headers, timeout=self.timeout)
+            info.status_code = response.status_code
+            info.bytes = len(response.content)
+            data = self._process_response(response, info)
+        except Exception as e:
+            info.elapsed = perf_counter() - started_at
+            info.error = e
+            if self.rate_limiter is not None and isinstance(e, ApiLimitError):
+                self.rate_limiter.on_limit(info.endpoint)
+            self._run_hooks('on_error', info)
+            raise
+        info.elapsed = perf_counter() - started_at
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_success(info.endpoint)
+        self._run_hooks('on_response', info)
+        return data
+
+    def _cache_key(self, url):
+        return '{}:{}'.format(self.client_id, urljoin(self.endpoint, url))
+
+    def _perform_cached_request(self, url):
+        ttl = self.cache_ttls.get(url)
+        if not ttl:
+            return self._perform_request(url)
+
+        key = self._cache_key(url)
+        data = self.cache.get(key)
+        if data is None:
+            data = materialize(self._perform_request(url))
+            self.cache.set(key, data, ttl=ttl)
+        return deepcopy(data)
+
+    def invalidate_cache(self, url=None):
+        if url is None:
+            self.cache.clear()
+        else:
+            self.cache.delete(self._cache_key(url))
 
     def get_tenants(self):
-        return self._perform_request('tenant')['result']
+        if self.tenant_cache_ttl == 0:  # the tenant cache is disabled, the tenant reference cache as well
+            tenants = self._perform_request('tenant')['result']
+        else:
+            tenants = self._perform_cached_request('tenant')['result']
+        if tenants:
+            self._default_tenant.set('id', tenants[0]['id'])
+        return tenants
 
     def _get_default_tenant_id(self):
-        return self.get_tenants()[0]['id']
+        tenant_id = self._default_tenant.get('id')
+        if tenant_id is None:
+            with self._request_purpose(TENANT_LOOKUP):
+                tenant_id = self.get_tenants()[0]['id']
+        return tenant_id
+
+    def _remember_vm_tenants(self, vms):
+        for vm_id, tenant_id in zip(peek_field(vms, 'id'), peek_field(vms, 'tenant_id')):
+            if tenant_id is not None:
+                self._vm_tenants.set(str(vm_id), tenant_id)
 
-    def get_tariffs(self, for_windows=None, order_by=None, on_demand=None):
-        result = self._perform_request('tariffs')['result']
+    def clear_tenant_cache(self):
+        self._default_tenant.clear()
+        self._vm_tenants.clear()
+        self.invalidate_cache('tenant')
+
+    def get_tariffs(self, for_windows=None, order_by=None, on_demand=None, as_records=False):
+        result = self._perform_cached_request('tariffs')['result']
 
         if for_windows is not None:
             result = [r for r in result if r['for_windows'] == for_windows]
@@ -103,10 +325,17 @@ class BaseAPI:
             result = [r for r in result if r['on_demand'] == on_demand]
         if order_by:
             result = order_list_by_dict_key(result, key=order_by)
-        return result
+        return Tariff.from_list(result) if as_records else result
 
-    def get_distributions(self):
-        return self._perform_request('distribution')['result']
+    def tariff_catalog(self):
+        """
+        :return: TariffCatalog of the current tariffs for repeated queries without requests
+        """
+        return TariffCatalog(self.get_tariffs())
+
+    def get_distributions(self, as_records=False):
+        result = self._perform_cached_request('distribution')['result']
+        return Distribution.from_list(result) if as_records else result
 
     def get_distributions_by_name(self, name, match_type='equal'):
         distributions = self.get_distributions()
@@ -120,7 +349,7 @@ class BaseAPI:
         return list(match_types.get(match_type, 'equal'))
 
     def get_software(self):
-        return self._perform_request('software')['result']
+        return self._perform_cached_request('software')['result']
 
     def get_operation_status(self, operation_id):
         return self._perform_request('operation/{}/'.format(operation_id))['result']
@@ -135,6 +364,41 @@ class BaseAPI:
                 raise OperationTimeoutError
             sleep(polling_time)
 
+    def operation(self, response):
+        """
+        :return: Operation handle of a started operation (a response with operation_id, or an Operation),
+                 resolved by the shared poller of the client
+        """
+        if isinstance(response, Operation):
+            return response
+        return self._operation_poller.submit(response)
+
+    def _operation(self, response):
+        """
+        Wraps the response of a started operation into an Operation handle if operation_handles is enabled.
+        """
+        if self.operation_handles and response.get('operation_id') is not None:
+            return self.operation(response)
+        return response
+
+    def wait_for_operations(self, operation_ids, timeout=None, **kwargs):
+        """
+        Polls many operations in one loop with per operation_type backoff.
+        :return: generator of operation statuses in the order the operations finish
+        """
+        return wait_for_operations(self, operation_ids, timeout=timeout, **kwargs)
+
+    def map(self, method, items, args=(), kwargs=None, concurrency=None, wait=False, timeout=None):
+        """
+        Calls method(item, *args, **kwargs) for every item on a thread pool.
+        :return: list of BatchResult in the order of items
+        """
+        return run_batch(self, method, items, args=args, kwargs=kwargs,
+                         concurrency=concurrency, wait=wait, timeout=timeout)
+
+    def batch(self, items, concurrency=None, wait=False, timeout=None):
+        return Batch(self, items, concurrency=concurrency, wait=wait, timeout=timeout)
+
     def _get_tenant_id(self, tenant_id, vm_id):
         if tenant_id:
             return tenant_id
@@ -149,8 +413,9 @@ class BaseAPI:
 
 
 class PublicKey(BaseAPI):
-    def get_pubkeys(self):
-        return self._perform_request('pubkeys')['result']
+    def get_pubkeys(self, as_records=False):
+        result = self._perform_request('pubkeys')['result']
+        return PublicKeyRecord.from_list(result) if as_records else result
 
     def get_pubkey(self, key_id):
         public_keys = self.get_pubkeys()
@@ -164,11 +429,26 @@ class PublicKey(BaseAPI):
         if name == '':
             return
         public_keys = self.get_pubkeys()
-        match_types = {
-            'equal': [pk for pk in public_keys if pk['name'] == name],
-            'startswith': [pk for pk in public_keys if pk['name'].startswith(name)],
-        }
-        return match_types.get(match_type, 'equal')
+        return filter_by_name(public_keys, name, match_type)
+
+    def key_registry(self):
+        """
+        :return: KeyRegistry of the account public keys indexed by id, name and fingerprint
+        """
+        return KeyRegistry(self.get_pubkeys())
+
+    def sync_pubkeys(self, desired_keys, delete=True, concurrency=None, tenant_id=None):
+        """
+        Makes the account keys equal to desired_keys ([{'name': ..., 'public_key': ...}]) with the fewest
+        add, edit and delete calls, run concurrently. See flops.keys.plan_pubkey_sync.
+        :return: list of BatchResult with KeyChange items
+        """
+        changes = plan_pubkey_sync(self.key_registry(), desired_keys, delete=delete)
+        if not changes:
+            return []
+        tenant_id = self._default_tenant_id(tenant_id)
+        return self.map(lambda change: apply_key_change(self, change, tenant_id=tenant_id), changes,
+                        concurrency=concurrency)
 
     def add_pubkey(self, name, public_key, tenant_id=None):
         if not tenant_id:
@@ -205,56 +485,82 @@ class Backup(BaseAPI, FlopsValidator):
     def change_vm_backup_policy(self, vm_id, quantity=None, frequency=None, tenant_id=None):
         params = self._validate_change_backup_policy(quantity, frequency)
         params.update({'tenant_id': self._default_tenant_id(tenant_id)})
-        return self._perform_request('vm/{}/backup_policy_change'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/backup_policy_change'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def rollback_vm_backup(self, vm_id, backup, create_backup=True, tenant_id=None):
         params = {
             'tenant_id': self._get_tenant_id(tenant_id, vm_id),
             'backup': backup, 'create_backup': create_backup,
         }
-        return self._perform_request('vm/{}/backup_rollback'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/backup_rollback'.format(vm_id), params=params)
+        return self._operation(resp)
 
 
 class Snapshot(BaseAPI):
-    def get_vm_snapshots(self, vm_id):
-        return self._perform_request('vm/{}/snapshots/'.format(vm_id), params={})['result']
+    def get_vm_snapshots(self, vm_id, as_records=False):
+        result = self._perform_request('vm/{}/snapshots/'.format(vm_id), params={})['result']
+        return SnapshotRecord.from_list(result) if as_records else result
 
     def create_vm_snapshot(self, vm_id, name, description='', tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id, 'name': name, 'description': description}
-        return self._perform_request('vm/{}/snapshot_create/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/snapshot_create/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def rollback_vm_snapshot(self, vm_id, snapshot_id, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id, 'snapshot_id': snapshot_id}
-        return self._perform_request('vm/{}/snapshot_rollback/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/snapshot_rollback/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def delete_vm_snapshot(self, vm_id, snapshot_id, delete_children=False, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id, 'snapshot_id': snapshot_id, 'delete_children': delete_children}
-        return self._perform_request('vm/{}/snapshot_delete/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/snapshot_delete/'.format(vm_id), params=params)
+        return self._operation(resp)
+
+    def snapshot_tree(self, vm_id):
+        """
+        :return: SnapshotTree of the VM snapshots linked by parent_id
+        """
+        return SnapshotTree(vm_id, self.get_vm_snapshots(vm_id))
+
+    def prune_snapshots(self, vm_ids, keep_last=None, max_age=None, concurrency=8, **kwargs):
+        """
+        Deletes the snapshots of many VMs that are neither among the keep_last newest nor younger than max_age,
+        concurrently across VMs and children first within a VM.
+        :return: generator of RetentionResult, see flops.snapshots
+        """
+        return prune_snapshots(self, vm_ids, keep_last=keep_last, max_age=max_age, concurrency=concurrency,
+                               **kwargs)
 
 
 class VM(BaseAPI, FlopsValidator):
-    def get_vms(self):
-        return self._perform_request('vm')['result']
+    def get_vms(self, as_records=False):
+        vms = self._perform_request('vm')['result']
+        self._remember_vm_tenants(vms)
+        return VMRecord.from_list(vms) if as_records else vms
+
+    def watch_vms(self, interval=5, jitter=0.1, emit_initial=True):
+        """
+        Polls get_vms every interval seconds (+-jitter share) and yields VMChange for created, deleted
+        and changed VMs. With emit_initial the VMs of the first poll are reported as created.
+        """
+        return iter(VMWatcher(self, interval=interval, jitter=jitter, emit_initial=emit_initial))
 
     def get_vms_by_name(self, name, match_type='equal'):
         if name == '':
             return
 
         vms = self.get_vms()
-        match_types = {
-            'equal': [vm for vm in vms if vm['name'] == name],
-            'startswith': [vm for vm in vms if vm['name'].startswith(name)],
-        }
-        return match_types.get(match_type, 'equal')
+        return filter_by_name(vms, name, match_type)
 
     def install_vm(self, name='', distribution_id=None, tariff_id=None, tenant_id=None, memory=None,
                    disk=None, cpu=None, ip_count=None, password=None, send_password=True, open_support_access=False,
@@ -274,7 +580,8 @@ class VM(BaseAPI, FlopsValidator):
 
         resp = self._perform_request('vm/install/', params=params)
         resp['vm_id'] = resp.pop('result')
-        return resp
+        self._remember_vm_tenants([{'id': resp['vm_id'], 'tenant_id': tenant_id}])
+        return self._operation(resp)
 
     def clone_vm(self, vm_id, name, tenant_id=None, snapshot_id=None):
         params = {}
@@ -283,7 +590,8 @@ class VM(BaseAPI, FlopsValidator):
         if snapshot_id:
             params[snapshot_id] = snapshot_id
         params.update({'vm_id': vm_id, 'name': name})
-        return self._perform_request('vm/{}/clone/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/clone/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def reinstall_vm(self, vm_id, name=None, distribution_id=None, tariff_id=None, tenant_id=None, memory=None,
                      disk=None, cpu=None, password=None, send_password=True, open_support_access=False,
@@ -302,76 +610,93 @@ class VM(BaseAPI, FlopsValidator):
 
         params = {k: v for k, v in locals().items() if k in self.create_params}  # TODO
         params = self._validate_reinstall(vm_id, params)
-        return self._perform_request('vm/{}/reinstall/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/reinstall/'.format(vm_id), params=params)
+        return self._operation(resp)
 
-    def get_vm(self, vm_id):
-        return self._perform_request('vm/{}/'.format(vm_id))['result']
+    def get_vm(self, vm_id, as_records=False):
+        vm = self._perform_request('vm/{}/'.format(vm_id))['result']
+        self._remember_vm_tenants([vm])
+        return VMRecord.from_dict(vm) if as_records else vm
 
     def _get_vm_tenant_id(self, vm_id):
-        return self.get_vm(vm_id)['tenant_id']
+        tenant_id = self._vm_tenants.get(str(vm_id))
+        if tenant_id is None:
+            with self._request_purpose(TENANT_LOOKUP):
+                tenant_id = self.get_vm(vm_id)['tenant_id']
+        return tenant_id
 
     def rename_vm(self, vm_id, new_name, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'name': new_name, 'tenant_id': tenant_id}
-        return self._perform_request('vm/{}/rename/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/rename/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def start_vm(self, vm_id, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id}
-        return self._perform_request('vm/{}/start/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/start/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def reset_vm(self, vm_id, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id}
-        return self._perform_request('vm/{}/reset/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/reset/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def reboot_vm(self, vm_id, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id}
-        return self._perform_request('vm/{}/reboot/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/reboot/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def poweroff_vm(self, vm_id, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id}
-        return self._perform_request('vm/{}/poweroff/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/poweroff/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def shutdown_vm(self, vm_id, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id}
-        return self._perform_request('vm/{}/shutdown/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/shutdown/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def delete_vm(self, vm_id, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id}
-        return self._perform_request('vm/{}/delete/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/delete/'.format(vm_id), params=params)
+        self._vm_tenants.delete(str(vm_id))
+        return self._operation(resp)
 
     def change_vm_password(self, vm_id, password, send_password=False, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id, 'password': password, 'send_password': send_password}
-        return self._perform_request('vm/{}/password_change/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/password_change/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def change_vm_pubkeys(self, vm_id, key_ids=[], tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id, 'key_ids': key_ids}
-        return self._perform_request('vm/{}/pubkey_change/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/pubkey_change/'.format(vm_id), params=params)
+        return self._operation(resp)
 
 
 class VMResources:
@@ -381,7 +706,8 @@ class VMResources:
 
         params = {'tenant_id': tenant_id, 'memory': memory, 'allow_restart': allow_restart}
         # TODO validate (Минимальное значение — 512, максимальное — 16384)
-        return self._perform_request('vm/{}/memory_change/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/memory_change/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def change_vm_disk(self, vm_id, disk, allow_restart=False, tenant_id=None, allow_memory_change=False):
         if not tenant_id:
@@ -392,7 +718,8 @@ class VMResources:
             'allow_restart': allow_restart, 'allow_memory_change': allow_memory_change,
         }
         # TODO (размер HDD в мегабайтах, число, обязательный. Минимальное значение — 8192, максимальное — 524288)
-        return self._perform_request('vm/{}/disk_change/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/disk_change/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def change_vm_cpu(self, vm_id, cpu, tenant_id=None):
         if not tenant_id:
@@ -400,29 +727,48 @@ class VMResources:
 
         params = {'tenant_id': tenant_id, 'cpu': cpu}
         # TODO valodate (количество процессорных ядер, число, обязательный. Минимальное значение — 1, максимальное — 12)
-        return self._perform_request('vm/{}/cpu_change/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/cpu_change/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def add_vm_ip(self, vm_id, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id}
-        return self._perform_request('vm/{}/ip_add/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/ip_add/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def delete_vm_ip(self, vm_id, ip, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id, 'ip': ip}
-        return self._perform_request('vm/{}/ip_delete/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/ip_delete/'.format(vm_id), params=params)
+        return self._operation(resp)
 
     def move_vm_ip(self, vm_id, to_vm_id, ip, tenant_id=None):
         if not tenant_id:
             tenant_id = self._get_vm_tenant_id(vm_id)
 
         params = {'tenant_id': tenant_id, 'to_vm_id': to_vm_id, 'ip': ip}
-        return self._perform_request('vm/{}/ip_move/'.format(vm_id), params=params)
+        resp = self._perform_request('vm/{}/ip_move/'.format(vm_id), params=params)
+        return self._operation(resp)
 
 
 class FlopsClient(VM, VMResources, Backup, PublicKey, Snapshot):
-    pass
+    def inventory(self):
+        return Inventory(self)
+
+    def provision_many(self, template, count, concurrency=8, **kwargs):
+        """
+        Installs count VMs from template and yields a ProvisionResult per VM as soon as it is ready or failed,
+        see flops.provision.provision_many.
+        """
+        return provision_many(self, template, count, concurrency=concurrency, **kwargs)
+
+    def rolling_resize(self, vm_ids, target, max_unavailable=1, checkpoint=None, **kwargs):
+        """
+        Changes memory, disk and cpu of many VMs to target, at most max_unavailable VMs at a time.
+        :return: generator of ResizeResult, see flops.resize
+        """
+        return rolling_resize(self, vm_ids, target, max_unavailable=max_unavailable, checkpoint=checkpoint, **kwargs)
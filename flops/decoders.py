@@ -0,0 +1,63 @@
+"""
+JSON decoders for API responses.
+
+Decoders read the raw response bytes. By default UnderscoreDecoder converts the keys while the stdlib
+parser builds the objects, so no second pass is needed. orjson parses faster but can not convert keys while
+parsing, and with the separate key pass it is not faster (python -m benchmarks.run -k process_response).
+It is the default only for lazy_responses, which convert keys on access anyway.
+
+    flops_client = FlopsClient(client_id, api_key, json_decoder=StdlibDecoder())
+"""
+import json
+
+from flops.helpers import camelcase_to_underscore
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class StdlibDecoder:
+    name = 'json'
+    transforms_keys = False  # keys are converted to underscore by the client afterwards
+
+    def decode(self, content):
+        return json.loads(content)
+
+
+class UnderscoreDecoder(StdlibDecoder):
+    name = 'json+underscore'
+    transforms_keys = True
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder(object_pairs_hook=self._object_pairs)
+
+    @staticmethod
+    def _object_pairs(pairs):
+        return {camelcase_to_underscore(k): v for k, v in pairs}
+
+    def decode(self, content):
+        if isinstance(content, (bytes, bytearray)):
+            content = content.decode('utf-8')
+        return self._decoder.decode(content)
+
+
+class OrjsonDecoder(StdlibDecoder):
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('orjson is not installed')
+
+    def decode(self, content):
+        return orjson.loads(content)
+
+
+def default_decoder(transform_keys=True):
+    """
+    :param transform_keys: the decoded keys must be converted to underscore
+    """
+    if transform_keys:
+        return UnderscoreDecoder()
+    return OrjsonDecoder() if orjson is not None else StdlibDecoder()
@@ -1,5 +1,6 @@
 class ApiError(Exception):
-    pass
+    status_code = None  # HTTP status of a non-200 response
+    attempts = 1  # number of requests made before the error was raised
 
 
 class AuthError(ApiError):
@@ -24,3 +25,12 @@ class OperationError(ApiError):
 
 class OperationTimeoutError(ApiError):
     pass
+
+
+class ReadinessTimeoutError(OperationTimeoutError):
+    pass
+
+
+class ProvisionError(ApiError):
+    failures = ()  # ProvisionResult of every failed VM
+    cleanup_failures = ()  # BatchResult of every VM that could not be deleted
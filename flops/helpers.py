@@ -1,4 +1,10 @@
-def underscore_to_camelcase(value):
+KEY_CACHE_SIZE = 4096
+
+_underscore_keys = {}
+_camelcase_keys = {}
+
+
+def _convert_underscore_to_camelcase(value):
     def camelcase():
         yield str.lower
         while True:
@@ -8,14 +14,28 @@ def underscore_to_camelcase(value):
     return ''.join(next(c)(x) if x else '_' for x in value.split('_'))
 
 
-def camelcase_to_underscore(value):
-    def camelcase(char):
-        if char.isupper():
-            return '_' + char.lower()
-        else:
-            return char.lower()
+def _convert_camelcase_to_underscore(value):
+    return ''.join('_' + char.lower() if char.isupper() else char.lower() for char in value)
+
+
+def underscore_to_camelcase(value):
+    try:
+        return _camelcase_keys[value]
+    except KeyError:
+        result = _convert_underscore_to_camelcase(value)
+        if len(_camelcase_keys) < KEY_CACHE_SIZE:
+            _camelcase_keys[value] = result
+        return result
+
 
-    return ''.join(camelcase(v) for v in value)
+def camelcase_to_underscore(value):
+    try:
+        return _underscore_keys[value]
+    except KeyError:
+        result = _convert_camelcase_to_underscore(value)
+        if len(_underscore_keys) < KEY_CACHE_SIZE:
+            _underscore_keys[value] = result
+        return result
 
 
 def transform_dict_keys_to_camelcase(data):
@@ -28,12 +48,52 @@ def transform_dict_keys_to_camelcase(data):
 
 def transform_dict_keys_to_underscore(data):
     if isinstance(data, dict):
-        return {camelcase_to_underscore(k): transform_dict_keys_to_underscore(v) for k, v in data.items()}
+        return {camelcase_to_underscore(k): _transform_value(v) for k, v in data.items()}
     if isinstance(data, list):
-        return [transform_dict_keys_to_underscore(v) for v in data]
+        return _transform_list(data)
     return data
 
 
+def _transform_value(value):
+    value_type = type(value)
+    if value_type is dict:
+        return {camelcase_to_underscore(k): _transform_value(v) for k, v in value.items()}
+    if value_type is list:
+        return _transform_list(value)
+    if isinstance(value, (dict, list)):
+        return transform_dict_keys_to_underscore(value)
+    return value
+
+
+def _transform_list(data):
+    # API lists are homogeneous, so the converted keys of the previous dict are reused while the keys repeat
+    result = []
+    keys = converted_keys = None
+    for item in data:
+        if type(item) is not dict:
+            result.append(_transform_value(item))
+            continue
+        item_keys = tuple(item)
+        if item_keys != keys:
+            keys = item_keys
+            converted_keys = [camelcase_to_underscore(k) for k in keys]
+        result.append(dict(zip(converted_keys, [_transform_value(v) for v in item.values()])))
+    return result
+
+
 def order_list_by_dict_key(data, key, descending=False):
     default_value = 0
     return sorted(data, key=lambda k: k.get(key, default_value), reverse=descending)
+
+
+def filter_by_name(data, name, match_type='equal'):
+    if match_type == 'startswith':
+        return [item for item in data if item['name'].startswith(name)]
+    return [item for item in data if item['name'] == name]
+
+
+def endpoint_template(url):
+    """
+    'vm/123/reboot/' -> 'vm/{id}/reboot/'
+    """
+    return '/'.join('{id}' if part.isdigit() else part for part in url.split('/'))
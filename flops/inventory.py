@@ -0,0 +1,102 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+from flops.exceptions import NotFoundError
+
+MAX_CHAR = chr(0x10ffff)
+
+
+class ResourceIndex:
+    """
+    Lookups by id, exact name and name prefix over records fetched with one API call.
+    Name lookups return records in the order of the API response.
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.by_id = {}
+        self.by_name = defaultdict(list)
+        for record in self.records:
+            self.by_id[record['id']] = record
+            self.by_name[record['name']].append(record)
+
+        positions = sorted((record['name'], position) for position, record in enumerate(self.records))
+        self._names = [name for name, _ in positions]
+        self._positions = [position for _, position in positions]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def get(self, record_id):
+        try:
+            return self.by_id[record_id]
+        except KeyError:
+            raise NotFoundError(record_id)
+
+    def startswith(self, prefix):
+        start = bisect_left(self._names, prefix)
+        end = bisect_left(self._names, prefix + MAX_CHAR, lo=start)
+        return [self.records[position] for position in sorted(self._positions[start:end])]
+
+    def find_by_name(self, name, match_type='equal'):
+        if name == '':
+            return
+        if match_type == 'startswith':
+            return self.startswith(name)
+        return list(self.by_name.get(name, ()))
+
+
+class VMIndex(ResourceIndex):
+    def __init__(self, records):
+        super().__init__(records)
+        self.by_tenant = defaultdict(list)
+        self.by_ip = {}
+        for vm in self.records:
+            self.by_tenant[vm.get('tenant_id')].append(vm)
+            for ip in vm.get('ip_addresses') or ():
+                self.by_ip[ip] = vm
+
+
+class Inventory:
+    """
+    Snapshot of the account VMs and public keys for repeated lookups without network calls.
+    Call refresh() to fetch the current state.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.vms = VMIndex([])
+        self.pubkeys = ResourceIndex([])
+        self.refreshed_at = None
+        self.refresh()
+
+    def refresh(self):
+        self.vms = VMIndex(self.client.get_vms())
+        self.pubkeys = ResourceIndex(self.client.get_pubkeys())
+        self.refreshed_at = datetime.now()
+        return self
+
+    def get_vm(self, vm_id):
+        return self.vms.get(vm_id)
+
+    def get_vms_by_name(self, name, match_type='equal'):
+        return self.vms.find_by_name(name, match_type)
+
+    def get_vms_by_tenant(self, tenant_id):
+        return list(self.vms.by_tenant.get(tenant_id, ()))
+
+    def get_vm_by_ip(self, ip):
+        try:
+            return self.vms.by_ip[ip]
+        except KeyError:
+            raise NotFoundError(ip)
+
+    def get_pubkey(self, key_id):
+        return self.pubkeys.get(key_id)
+
+    def get_pubkeys_by_name(self, name, match_type='equal'):
+        return self.pubkeys.find_by_name(name, match_type)
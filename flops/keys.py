@@ -0,0 +1,94 @@
+import base64
+import binascii
+import hashlib
+from collections import defaultdict, namedtuple
+
+from flops.inventory import ResourceIndex
+
+ADD = 'add'
+EDIT = 'edit'
+DELETE = 'delete'
+
+
+def fingerprint(public_key):
+    """
+    :return: OpenSSH SHA256 fingerprint of an 'ssh-rsa AAAA... comment' public key. Keys whose body is not
+             valid base64 are fingerprinted by their text, so equal keys still get equal fingerprints.
+    """
+    parts = public_key.split()
+    body = parts[1] if len(parts) > 1 else public_key.strip()
+    try:
+        blob = base64.b64decode(body, validate=True)
+    except (binascii.Error, ValueError):
+        blob = ' '.join(parts[:2]).encode('utf-8')
+    return 'SHA256:' + base64.b64encode(hashlib.sha256(blob).digest()).decode('ascii').rstrip('=')
+
+
+class KeyRegistry(ResourceIndex):
+    """
+    Public keys indexed by id, name and fingerprint.
+    """
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.by_fingerprint = defaultdict(list)
+        for key in self.records:
+            self.by_fingerprint[fingerprint(key['public_key'])].append(key)
+
+    def find_by_fingerprint(self, key_fingerprint):
+        return list(self.by_fingerprint.get(key_fingerprint, ()))
+
+    def find_by_public_key(self, public_key):
+        return self.find_by_fingerprint(fingerprint(public_key))
+
+    def __contains__(self, public_key):
+        return fingerprint(public_key) in self.by_fingerprint
+
+
+class KeyChange(namedtuple('KeyChange', ['action', 'key_id', 'name', 'public_key'])):
+    """
+    One add, edit or delete call of a key sync plan. key_id is None for additions.
+    """
+
+
+def plan_pubkey_sync(registry, desired_keys, delete=True):
+    """
+    :param desired_keys: [{'name': ..., 'public_key': ...}]
+    :return: list of KeyChange making the account keys equal to desired_keys. Keys are matched by fingerprint
+             first (a rename becomes an edit of the name) and then by name (a rotated key becomes an edit
+             of the public key). With delete the unmatched account keys are deleted.
+    """
+    changes = []
+    matched = set()
+    unmatched = []
+    for desired in desired_keys:
+        existing = [k for k in registry.find_by_public_key(desired['public_key']) if k['id'] not in matched]
+        if existing:
+            key = existing[0]
+            matched.add(key['id'])
+            if key['name'] != desired['name']:
+                changes.append(KeyChange(EDIT, key['id'], desired['name'], None))
+        else:
+            unmatched.append(desired)
+
+    for desired in unmatched:
+        existing = [k for k in registry.find_by_name(desired['name']) if k['id'] not in matched]
+        if existing:
+            key = existing[0]
+            matched.add(key['id'])
+            changes.append(KeyChange(EDIT, key['id'], None, desired['public_key']))
+        else:
+            changes.append(KeyChange(ADD, None, desired['name'], desired['public_key']))
+
+    if delete:
+        changes.extend(KeyChange(DELETE, key['id'], key['name'], None) for key in registry
+                       if key['id'] not in matched)
+    return changes
+
+
+def apply_key_change(client, change, tenant_id=None):
+    if change.action == ADD:
+        return client.add_pubkey(change.name, change.public_key, tenant_id=tenant_id)
+    if change.action == EDIT:
+        return client.edit_pubkey(change.key_id, tenant_id=tenant_id, name=change.name, public_key=change.public_key)
+    return client.delete_pubkey(change.key_id, tenant_id=tenant_id)
@@ -0,0 +1,125 @@
+import threading
+from bisect import bisect_left
+
+HOOK_EVENTS = ('on_request', 'on_response', 'on_error')
+
+TENANT_LOOKUP = 'tenant_lookup'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+
+class RequestInfo:
+    """
+    Passed to the client hooks. endpoint is the url template, e.g. 'vm/{id}/reboot/'; purpose tells implicit
+    requests apart (TENANT_LOOKUP for tenant resolution); attempt counts retries of the same call from 1.
+    Times are in seconds, bytes is the response body size.
+    """
+
+    __slots__ = ('url', 'endpoint', 'params', 'purpose', 'attempt', 'status_code', 'bytes', 'elapsed',
+                 'decode_time', 'transform_time', 'error')
+
+    def __init__(self, url, endpoint, params=None, purpose=None, attempt=1):
+        self.url = url
+        self.endpoint = endpoint
+        self.params = params
+        self.purpose = purpose
+        self.attempt = attempt
+        self.status_code = None
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.decode_time = 0.0
+        self.transform_time = 0.0
+        self.error = None
+
+    def __repr__(self):
+        return '<RequestInfo {} {:.4f}s>'.format(self.endpoint, self.elapsed)
+
+
+class EndpointStats:
+    def __init__(self, endpoint, purpose=None, buckets=LATENCY_BUCKETS):
+        self.endpoint = endpoint
+        self.purpose = purpose
+        self.buckets = buckets
+        self.histogram = [0] * len(buckets)
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.bytes = 0
+        self.decode_time = 0.0
+        self.transform_time = 0.0
+
+    def add(self, info):
+        self.count += 1
+        self.errors += info.error is not None
+        self.retries += info.attempt > 1
+        self.total_time += info.elapsed
+        self.max_time = max(self.max_time, info.elapsed)
+        self.histogram[bisect_left(self.buckets, info.elapsed)] += 1
+        self.bytes += info.bytes
+        self.decode_time += info.decode_time
+        self.transform_time += info.transform_time
+
+    def quantile(self, q):
+        """
+        :return: upper bound of the latency bucket holding the q quantile
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.histogram):
+            seen += bucket_count
+            if seen >= rank and seen:
+                return min(bound, self.max_time)
+        return self.max_time
+
+    def as_dict(self):
+        return {
+            'endpoint': self.endpoint, 'purpose': self.purpose, 'count': self.count, 'errors': self.errors,
+            'retries': self.retries,
+            'total_time': self.total_time, 'mean_time': self.total_time / self.count if self.count else 0.0,
+            'max_time': self.max_time, 'p50': self.quantile(0.5), 'p95': self.quantile(0.95),
+            'bytes': self.bytes, 'decode_time': self.decode_time, 'transform_time': self.transform_time,
+            'histogram': dict(zip(self.buckets, self.histogram)),
+        }
+
+
+class MetricsCollector:
+    """
+    Collects per endpoint template call counts, latency histograms, payload bytes and decode/transform times.
+
+        metrics = MetricsCollector().install(flops_client)
+        ...
+        metrics.report()  # endpoints sorted by total time
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def install(self, client):
+        client.add_hook('on_response', self.record)
+        client.add_hook('on_error', self.record)
+        return self
+
+    def uninstall(self, client):
+        client.remove_hook('on_response', self.record)
+        client.remove_hook('on_error', self.record)
+
+    def record(self, info):
+        key = (info.endpoint, info.purpose)
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats(info.endpoint, info.purpose, self.buckets)
+            stats.add(info)
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+
+    def report(self):
+        with self._lock:
+            stats = [s.as_dict() for s in self.endpoints.values()]
+        return sorted(stats, key=lambda s: s['total_time'], reverse=True)
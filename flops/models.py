@@ -0,0 +1,138 @@
+"""
+Compact record classes for API resources.
+
+    vms = flops_client.get_vms(as_records=True)
+    vms[0].name, vms[0].backup_policy.quantity, vms[0]['tenant_id']
+    vms[0].to_dict()  # the plain dict returned without as_records
+
+Records keep the known fields in __slots__ and unknown fields in a small extra dict, so several thousand
+VMs take a fraction of the memory of nested dicts. Fields missing from a payload read as None and are
+left out of to_dict().
+The mapping of payload keys to slots is computed once per key tuple and reused for every object.
+"""
+from collections.abc import Mapping
+
+from flops.helpers import KEY_CACHE_SIZE
+
+
+class Record:
+    __slots__ = ('_extra', '_missing')
+    fields = ()
+    nested = {}  # field: Record class of a nested object
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._plans = {}
+
+    def __init__(self, **kwargs):
+        for field in self.fields:
+            setattr(self, field, kwargs.pop(field, None))
+        self._extra = kwargs or None
+        self._missing = ()
+
+    @classmethod
+    def _plan(cls, keys):
+        """
+        :return: ([(key, slot setter or None for extra keys, nested class)], names of the missing fields,
+                  setters of the missing fields)
+        """
+        plan = cls._plans.get(keys)
+        if plan is None:
+            setters = [(key, getattr(cls, key).__set__ if key in cls.fields else None, cls.nested.get(key))
+                       for key in keys]
+            missing = tuple(field for field in cls.fields if field not in keys)
+            plan = (setters, missing, [getattr(cls, field).__set__ for field in missing])
+            if len(cls._plans) < KEY_CACHE_SIZE:
+                cls._plans[keys] = plan
+        return plan
+
+    @classmethod
+    def from_dict(cls, data):
+        setters, missing, missing_setters = cls._plan(tuple(data))
+        record = cls.__new__(cls)
+        extra = None
+        for (key, setter, nested), value in zip(setters, data.values()):
+            if nested is not None and isinstance(value, Mapping):
+                value = nested.from_dict(value)
+            if setter is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+            else:
+                setter(record, value)
+        for setter in missing_setters:
+            setter(record, None)
+        record._extra = extra
+        record._missing = missing
+        return record
+
+    @classmethod
+    def from_list(cls, data):
+        return [cls.from_dict(item) for item in data]
+
+    def to_dict(self):
+        data = {}
+        for field in self.fields:
+            if field in self._missing:
+                continue
+            value = getattr(self, field)
+            data[field] = value.to_dict() if isinstance(value, Record) else value
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            return getattr(self, key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.fields:
+            return key not in self._missing
+        return bool(self._extra) and key in self._extra
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, ' '.join(
+            '{}={!r}'.format(field, getattr(self, field)) for field in self.fields[:2]))
+
+
+class BackupPolicy(Record):
+    __slots__ = fields = ('quantity', 'frequency')
+
+
+class Distribution(Record):
+    __slots__ = fields = ('id', 'name', 'description', 'for_windows')
+
+
+class Tariff(Record):
+    __slots__ = fields = ('id', 'name', 'memory', 'disk', 'cpu', 'price', 'for_windows', 'on_demand')
+
+
+class PublicKeyRecord(Record):
+    __slots__ = fields = ('id', 'name', 'public_key', 'tenant_id')
+
+
+class SnapshotRecord(Record):
+    __slots__ = fields = ('id', 'name', 'description', 'time_added', 'parent_id')
+
+
+class VMRecord(Record):
+    __slots__ = fields = (
+        'id', 'name', 'tenant_id', 'tariff_id', 'memory', 'disk', 'cpu', 'ip_count', 'state', 'time_added',
+        'private_ip_address', 'internal_id', 'ip_addresses', 'distribution', 'backup_policy',
+        'open_support_access', 'public_key_ids', 'software_ids',
+    )
+    nested = {'distribution': Distribution, 'backup_policy': BackupPolicy}
@@ -0,0 +1,203 @@
+import heapq
+import threading
+from concurrent.futures import Future
+from itertools import count
+from time import monotonic, sleep
+
+from flops.exceptions import OperationTimeoutError
+
+# operation_type: (delay before the second poll, max delay between polls), seconds
+POLLING_INTERVALS = {
+    'VM_INSTALL': (2.0, 10.0),
+    'VM_REINSTALL': (2.0, 10.0),
+    'VM_CLONE': (2.0, 10.0),
+    'VM_VOLUME_CHANGE': (1.0, 10.0),
+    'VM_CREATE_SNAPSHOT': (1.0, 10.0),
+    'VM_ROLLBACK_SNAPSHOT': (1.0, 10.0),
+    'VM_DELETE_SNAPSHOT': (1.0, 10.0),
+}
+DEFAULT_POLLING_INTERVAL = (0.5, 5.0)
+BACKOFF_FACTOR = 1.5
+
+
+def is_done(status):
+    return status['status'].lower() == 'done'
+
+
+class OperationScheduler:
+    """
+    Keeps the poll schedule of many pending operations.
+
+    Every operation is polled right away, then with a delay growing by backoff_factor from the first interval
+    of its operation_type up to the max one. When the operation reports its percentage the delay follows
+    the estimated remaining time instead.
+    """
+
+    def __init__(self, operation_ids=(), timeout=None, intervals=None, default_interval=DEFAULT_POLLING_INTERVAL,
+                 backoff_factor=BACKOFF_FACTOR):
+        self.intervals = POLLING_INTERVALS if intervals is None else intervals
+        self.default_interval = default_interval
+        self.backoff_factor = backoff_factor
+        self.deadline = monotonic() + timeout if timeout else None
+        self.polls = 0
+        self._heap = []
+        self._seq = count()
+        self._delays = {}
+        self._started_at = {}
+        for operation_id in operation_ids:
+            self.add(operation_id)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, operation_id, poll_at=None):
+        self._started_at.setdefault(operation_id, monotonic())
+        heapq.heappush(self._heap, (poll_at or monotonic(), next(self._seq), operation_id))
+
+    def pending(self):
+        return [operation_id for _, _, operation_id in self._heap]
+
+    def next_poll_at(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop(self):
+        """
+        :return: (seconds to wait before polling, operation_id)
+        """
+        poll_at, _, operation_id = heapq.heappop(self._heap)
+        return max(0, poll_at - monotonic()), operation_id
+
+    def report(self, operation_id, status):
+        """
+        Takes the polled status of the operation and reschedules it unless it is done.
+        :return: True if the operation is done
+        """
+        self.polls += 1
+        if is_done(status):
+            self._delays.pop(operation_id, None)
+            self._started_at.pop(operation_id, None)
+            return True
+
+        now = monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            heapq.heappush(self._heap, (now, next(self._seq), operation_id))
+            raise OperationTimeoutError('Operations {} are not done'.format(sorted(self.pending())))
+
+        first, maximum = self.intervals.get(status.get('operation_type'), self.default_interval)
+        delay = self._delays.get(operation_id)
+        delay = first if delay is None else min(delay * self.backoff_factor, maximum)
+
+        percentage = status.get('percentage')
+        if percentage and 0 < percentage < 100:
+            elapsed = now - self._started_at[operation_id]
+            delay = min(max(elapsed * (100 - percentage) / percentage / 2, first), maximum)
+
+        self._delays[operation_id] = delay
+        poll_at = now + delay
+        if self.deadline is not None:
+            poll_at = min(poll_at, self.deadline)
+        heapq.heappush(self._heap, (poll_at, next(self._seq), operation_id))
+        return False
+
+
+def wait_for_operations(client, operation_ids, timeout=None, **kwargs):
+    scheduler = OperationScheduler(set(operation_ids), timeout=timeout, **kwargs)
+    while scheduler:
+        delay, operation_id = scheduler.pop()
+        if delay:
+            sleep(delay)
+        status = client.get_operation_status(operation_id)
+        if scheduler.report(operation_id, status):
+            yield status
+
+
+class Operation(Future):
+    """
+    Handle of a started operation, resolved with its final status by the client's OperationPoller.
+    Item access reads the original API response, e.g. operation['vm_id'] after install_vm.
+    """
+
+    def __init__(self, operation_id, response=None):
+        super().__init__()
+        self.operation_id = operation_id
+        self.response = response or {'operation_id': operation_id}
+
+    def __getitem__(self, key):
+        return self.response[key]
+
+    def __contains__(self, key):
+        return key in self.response
+
+    def get(self, key, default=None):
+        return self.response.get(key, default)
+
+    def __repr__(self):
+        return '<Operation {} {}>'.format(self.operation_id, self._state.lower())
+
+
+class OperationPoller:
+    """
+    Resolves Operation handles from one background thread. The thread starts with the first submitted
+    operation and exits after idle_timeout seconds without pending operations.
+    """
+
+    idle_timeout = 10
+
+    def __init__(self, client, **scheduler_kwargs):
+        self.client = client
+        self._scheduler = OperationScheduler(**scheduler_kwargs)
+        self._operations = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, response):
+        operation_id = response['operation_id']
+        with self._condition:
+            operation = self._operations.get(operation_id)
+            if operation is None:
+                operation = self._operations[operation_id] = Operation(operation_id, response)
+                operation.set_running_or_notify_cancel()
+                self._scheduler.add(operation_id)
+                self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='flops-operation-poller', daemon=True)
+                self._thread.start()
+        return operation
+
+    def _next_operation(self):
+        with self._condition:
+            while True:
+                poll_at = self._scheduler.next_poll_at()
+                if poll_at is None:
+                    if not self._condition.wait(self.idle_timeout) and not self._scheduler:
+                        self._thread = None
+                        return None
+                    continue
+                if poll_at > monotonic():
+                    self._condition.wait(poll_at - monotonic())
+                    continue
+                _, operation_id = self._scheduler.pop()
+                return self._operations[operation_id]
+
+    def _finish(self, operation):
+        with self._condition:
+            self._operations.pop(operation.operation_id, None)
+
+    def _run(self):
+        while True:
+            operation = self._next_operation()
+            if operation is None:
+                return
+
+            try:
+                status = self.client.get_operation_status(operation.operation_id)
+                with self._condition:
+                    done = self._scheduler.report(operation.operation_id, status)
+            except Exception as e:
+                self._finish(operation)
+                operation.set_exception(e)
+                continue
+
+            if done:
+                self._finish(operation)
+                operation.set_result(status)
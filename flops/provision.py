@@ -0,0 +1,222 @@
+"""
+Bulk provisioning: install many VMs from one template and wait until they accept TCP connections.
+
+    template = {'name': 'web-{}', 'tariff_id': 'M', 'distribution_id': 'Debian 9 64 bit', 'public_key_ids': [key_id]}
+    for result in flops_client.provision_many(template, count=20, concurrency=8):
+        print(result.vm['name'], result.vm['ip_addresses']) if result.ok else print(result.exception)
+
+Stages overlap: while some VMs are being installed, the install operations of others are polled by the
+client's shared OperationPoller and the finished ones are probed for readiness.
+"""
+import queue
+import socket
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from itertools import islice
+from time import monotonic, sleep
+
+from flops.exceptions import NotFoundError, OperationTimeoutError, ProvisionError, ReadinessTimeoutError, \
+    ValidationError
+
+
+class ProvisionResult(namedtuple('ProvisionResult', ['index', 'spec', 'vm', 'exception'])):
+    """
+    Outcome for the spec number index: vm is the VM record (get_vm) once it is ready, or exception.
+    """
+
+    @property
+    def ok(self):
+        return self.exception is None
+
+
+def first_public_ip(vm):
+    return vm['ip_addresses'][0]
+
+
+def wait_for_port(host, port=22, timeout=300, interval=1, connect_timeout=2, stop=None):
+    """
+    Blocks until host:port accepts a TCP connection. Raises ReadinessTimeoutError after timeout seconds,
+    or ProvisionError as soon as the stop event (threading.Event) is set.
+    """
+    deadline = monotonic() + timeout
+    while True:
+        if stop is not None and stop.is_set():
+            raise ProvisionError('cancelled')
+        try:
+            socket.create_connection((host, port), timeout=connect_timeout).close()
+            return
+        except OSError:
+            if monotonic() + interval > deadline:
+                raise ReadinessTimeoutError('{}:{} is not reachable'.format(host, port))
+            if stop is None:
+                sleep(interval)
+            else:
+                stop.wait(interval)
+
+
+def _spec_name(name, index):
+    if '{' in name:
+        return name.format(index)
+    return '{}-{}'.format(name, index)
+
+
+def _resolve(get_records, value, fields):
+    if value is None or str(value).isdigit():
+        return value
+    for record in get_records():
+        if any(record.get(field) == value for field in fields):
+            return record['id']
+    raise NotFoundError(value)
+
+
+def make_specs(client, template, count, start=1):
+    """
+    :return: install_vm keyword arguments of count VMs. The tenant, and the tariff and distribution given by
+             name (or distribution description), are resolved once for all specs; ids need no request.
+    """
+    template = dict(template)
+    template['tenant_id'] = template.get('tenant_id') or client._get_default_tenant_id()
+    template['tariff_id'] = _resolve(client.get_tariffs, template.get('tariff_id'), ('name',))
+    template['distribution_id'] = _resolve(client.get_distributions, template.get('distribution_id'),
+                                           ('description', 'name'))
+    name = template.pop('name', 'vm')
+    return [dict(template, name=_spec_name(name, index)) for index in range(start, start + count)]
+
+
+class ProvisionPipeline:
+    def __init__(self, client, specs, concurrency=8, port=22, address=first_public_ip, ready_timeout=300,
+                 timeout=None, cleanup=False, cleanup_timeout=600):
+        """
+        :param cleanup_timeout: seconds to wait for the started installs before the created VMs are deleted
+        """
+        self.client = client
+        self.specs = specs
+        self.concurrency = concurrency
+        self.port = port
+        self.address = address
+        self.ready_timeout = ready_timeout
+        self.timeout = timeout
+        self.cleanup = cleanup
+        self.cleanup_timeout = cleanup_timeout
+        self.vm_ids = {}  # index: id of every VM created by the pipeline
+        self.cleanup_failures = []
+        self._operations = {}  # index: install operation
+        self._results = queue.Queue()
+        self._failed = False
+        self._stopped = threading.Event()
+
+    def _put(self, result):
+        if not result.ok:
+            self._failed = True
+        self._results.put(result)
+
+    def _install(self, index, spec):
+        if self._stopped.is_set() or self._failed and self.cleanup:
+            return self._put(ProvisionResult(index, spec, None, ProvisionError('cancelled')))
+        try:
+            operation = self.client.operation(self.client.install_vm(**spec))
+            self.vm_ids[index] = operation['vm_id']
+            self._operations[index] = operation
+        except Exception as e:
+            return self._put(ProvisionResult(index, spec, None, e))
+        operation.add_done_callback(lambda op: self._installed(index, spec, op))
+
+    def _installed(self, index, spec, operation):
+        if operation.exception() is not None:
+            return self._put(ProvisionResult(index, spec, None, operation.exception()))
+        try:
+            self._ready_pool.submit(self._ready, index, spec)
+        except RuntimeError as e:  # the pipeline was stopped
+            self._put(ProvisionResult(index, spec, None, e))
+
+    def _ready(self, index, spec):
+        if self._stopped.is_set():
+            return self._put(ProvisionResult(index, spec, None, ProvisionError('cancelled')))
+        try:
+            vm = self.client.get_vm(self.vm_ids[index])
+            if self.port:
+                wait_for_port(self.address(vm), self.port, timeout=self.ready_timeout, stop=self._stopped)
+        except Exception as e:
+            return self._put(ProvisionResult(index, spec, None, e))
+        self._put(ProvisionResult(index, spec, vm, None))
+
+    def _next_result(self, deadline):
+        try:
+            return self._results.get(timeout=None if deadline is None else max(0, deadline - monotonic()))
+        except queue.Empty:
+            raise OperationTimeoutError('provisioning did not finish in {} seconds'.format(self.timeout))
+
+    def _delete_created(self):
+        # a VM can not be deleted while it is being installed; the deletes of the unfinished ones fail
+        wait_futures(list(self._operations.values()), timeout=self.cleanup_timeout)
+        vm_ids = list(self.vm_ids.values())
+        self.cleanup_failures = [r for r in self.client.map('delete_vm', vm_ids, concurrency=self.concurrency)
+                                 if not r.ok]
+        return self.cleanup_failures
+
+    def _stop(self, install_pool):
+        """
+        Cancels the installs not started yet and the readiness checks, with cleanup deletes the created VMs.
+        """
+        self._stopped.set()
+        install_pool.shutdown(wait=True)  # the queued installs return at once
+        self._ready_pool.shutdown(wait=False)  # the readiness checks return when they see _stopped
+        if self.cleanup:
+            self._delete_created()
+
+    def __iter__(self):
+        deadline = None if self.timeout is None else monotonic() + self.timeout
+        failures = []
+        install_pool = ThreadPoolExecutor(self.concurrency)
+        self._ready_pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix='flops-provision-ready')
+        specs = iter(enumerate(self.specs))
+        try:
+            for index, spec in islice(specs, self.concurrency):
+                install_pool.submit(self._install, index, spec)
+            for _ in self.specs:
+                result = self._next_result(deadline)
+                for index, spec in islice(specs, 1):  # at most concurrency VMs are in progress
+                    install_pool.submit(self._install, index, spec)
+                if not result.ok:
+                    failures.append(result)
+                yield result
+        except BaseException as e:  # a timeout, an error or the generator was closed
+            self._stop(install_pool)
+            if self.cleanup and not isinstance(e, GeneratorExit):
+                e.cleanup_failures = self.cleanup_failures
+            raise
+        install_pool.shutdown()
+        self._ready_pool.shutdown()
+
+        if failures and self.cleanup:
+            error = ProvisionError('{} of {} VMs failed, created VMs were deleted'.format(
+                len(failures), len(self.specs)))
+            error.failures = failures
+            error.cleanup_failures = self._delete_created()
+            raise error
+
+
+def provision_many(client, template, count, concurrency=8, port=22, address=first_public_ip, ready_timeout=300,
+                   timeout=None, cleanup=False, cleanup_timeout=600, start=1):
+    """
+    Installs count VMs from template (install_vm keyword arguments; '{}' in the name is replaced by the VM
+    number starting from start) and yields a ProvisionResult per VM as soon as it is ready or failed.
+    At most concurrency VMs are installed or checked for readiness at the same time.
+
+    All specs are validated before the first install. With port=None readiness is the finished install
+    operation; otherwise a TCP connect to address(vm):port. With cleanup=True the first failure stops further
+    installs and, after all started VMs settled, every VM created by the call is deleted and ProvisionError
+    is raised. When the timeout expires or the generator is closed, the installs not started yet are
+    cancelled and, with cleanup=True, the created VMs are deleted; the OperationTimeoutError then has
+    cleanup_failures set. Cleanup waits at most cleanup_timeout seconds for the started installs; deletes of
+    VMs still being installed then fail and are reported in cleanup_failures.
+    """
+    specs = make_specs(client, template, count, start=start)
+    errors = client.validate_many(specs)
+    invalid = [(spec['name'], spec_errors) for spec, spec_errors in zip(specs, errors) if spec_errors]
+    if invalid:
+        raise ValidationError('; '.join('{}: {}'.format(name, ' '.join(e)) for name, e in invalid))
+    return iter(ProvisionPipeline(client, specs, concurrency=concurrency, port=port, address=address,
+                                  ready_timeout=ready_timeout, timeout=timeout, cleanup=cleanup,
+                                  cleanup_timeout=cleanup_timeout))
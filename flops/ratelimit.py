@@ -0,0 +1,119 @@
+import threading
+from time import monotonic, sleep
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Callers reserve a token and sleep outside of the lock, so waiting callers
+    are served in order of arrival at the configured rate.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.burst
+        self._updated_at = monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self):
+        """
+        Takes a token. :return: seconds to wait before using it
+        """
+        with self._lock:
+            self._refill(monotonic())
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            sleep(delay)
+        return delay
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(monotonic())
+            self.rate = float(rate)
+
+
+class AdaptiveBucket(TokenBucket):
+    """
+    Token bucket that halves its rate on limit errors (down to min_rate) and recovers additively
+    by recovery share of max_rate per successful request. The limit errors of requests sent together report
+    one throttling, so the rate decreases at most once per cooldown seconds.
+    """
+
+    def __init__(self, rate, burst=None, decrease_factor=0.5, recovery=0.01, min_rate=0.1, cooldown=1.0):
+        super().__init__(rate, burst)
+        self.max_rate = float(rate)
+        self.decrease_factor = decrease_factor
+        self.recovery = recovery
+        self.min_rate = min_rate
+        self.cooldown = cooldown
+        self._decreased_at = None
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            self.set_rate(min(self.max_rate, self.rate + self.max_rate * self.recovery))
+
+    def on_limit(self):
+        with self._lock:
+            now = monotonic()
+            self.tokens = min(self.tokens, 0)
+            if self._decreased_at is not None and now - self._decreased_at < self.cooldown:
+                return
+            self._decreased_at = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+
+
+class RateLimiter:
+    """
+    Global and per endpoint template request budgets shared by all threads of a client.
+
+        flops_client = FlopsClient(client_id, api_key,
+                                   rate_limiter=RateLimiter(rate=20, endpoint_rates={'vm/install/': 1}))
+
+    Rates are requests per second. On ApiLimitError the global and the endpoint budget shrink
+    and then recover gradually with successful requests.
+    """
+
+    def __init__(self, rate=10, burst=None, endpoint_rates=None, decrease_factor=0.5, recovery=0.01, min_rate=0.1,
+                 cooldown=1.0):
+        options = {'decrease_factor': decrease_factor, 'recovery': recovery, 'min_rate': min_rate, 'cooldown': cooldown}
+        self.bucket = AdaptiveBucket(rate, burst, **options)
+        self.endpoint_buckets = {
+            endpoint: AdaptiveBucket(endpoint_rate, **options) for endpoint, endpoint_rate in
+            (endpoint_rates or {}).items()
+        }
+
+    def _buckets(self, endpoint):
+        bucket = self.endpoint_buckets.get(endpoint)
+        return (self.bucket, bucket) if bucket is not None else (self.bucket,)
+
+    def reserve(self, endpoint):
+        """
+        Takes a token of the global and the endpoint budget. :return: seconds to wait before the request
+        """
+        return max(bucket.reserve() for bucket in self._buckets(endpoint))
+
+    def acquire(self, endpoint):
+        """
+        Blocks until both the global and the endpoint budget allow a request. :return: seconds waited
+        """
+        delay = self.reserve(endpoint)
+        if delay:
+            sleep(delay)
+        return delay
+
+    def on_success(self, endpoint):
+        for bucket in self._buckets(endpoint):
+            bucket.on_success()
+
+    def on_limit(self, endpoint):
+        for bucket in self._buckets(endpoint):
+            bucket.on_limit()
@@ -0,0 +1,166 @@
+"""
+Rolling resize of many VMs to a target shape.
+
+    for result in flops_client.rolling_resize(vm_ids, {'memory': 2048, 'cpu': 2}, max_unavailable=10,
+                                              checkpoint='resize.json'):
+        print(result.vm_id, result.steps, result.exception)
+
+Only the fields that differ from the current VM are changed. A VM needing several changes is shut down once,
+changed without restarts and started again, instead of restarting for every change. A VM shut down for the
+changes is started again when a change fails. At most max_unavailable VMs are resized at the same time;
+their operations are polled by the client's shared OperationPoller.
+Progress is written to the checkpoint file after every VM, and a run with the same checkpoint skips the VMs
+already resized.
+"""
+import json
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+from flops.batch import imap_bounded
+from flops.validators import RESIZE_SCHEMA, CompiledValidator
+
+RUNNING = 'VIR_DOMAIN_RUNNING'
+SHAPE_FIELDS = ('memory', 'disk', 'cpu')
+
+DONE = 'done'
+FAILED = 'failed'
+IN_PROGRESS = 'in_progress'
+
+
+class ResizeResult(namedtuple('ResizeResult', ['vm_id', 'steps', 'exception'])):
+    """
+    steps are the (method name, kwargs) calls made for the VM.
+    """
+
+    @property
+    def ok(self):
+        return self.exception is None
+
+
+def plan_resize(vm, target, was_running=None, consolidate_restarts=True):
+    """
+    :return: list of (client method name, kwargs) bringing vm to the target shape
+    """
+    shape = {field: value for field, value in target.items() if value is not None and vm.get(field) != value}
+    changes = []
+    if shape.get('memory', 0) > vm['memory']:
+        changes.append(('change_vm_memory', {'memory': shape['memory']}))
+    if 'disk' in shape:
+        changes.append(('change_vm_disk', {'disk': shape['disk']}))
+    if shape.get('memory', vm['memory']) < vm['memory']:  # after the disk change keeps HDD/RAM in range
+        changes.append(('change_vm_memory', {'memory': shape['memory']}))
+    if 'cpu' in shape:
+        changes.append(('change_vm_cpu', {'cpu': shape['cpu']}))
+
+    running = vm['state'] == RUNNING
+    was_running = running if was_running is None else was_running
+    if consolidate_restarts and len(changes) > 1 or not running:
+        steps = [('shutdown_vm', {})] if running else []
+        for method, kwargs in changes:
+            if method != 'change_vm_cpu':
+                kwargs['allow_restart'] = False
+        steps.extend(changes)
+        if was_running:
+            steps.append(('start_vm', {}))
+        return steps
+
+    for method, kwargs in changes:
+        if method != 'change_vm_cpu':
+            kwargs['allow_restart'] = True
+    return changes
+
+
+class Checkpoint:
+    """
+    JSON file with the resize state of every VM, replaced atomically on every update.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.vms = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.vms = json.load(f)['vms']
+
+    def get(self, vm_id):
+        return self.vms.get(str(vm_id), {})
+
+    def update(self, vm_id, **state):
+        with self._lock:
+            self.vms[str(vm_id)] = dict(self.vms.get(str(vm_id), {}), **state)
+            if not self.path:
+                return
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'vms': self.vms}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class RollingResize:
+    shape_validator = CompiledValidator(RESIZE_SCHEMA)
+
+    def __init__(self, client, vm_ids, target, max_unavailable=1, checkpoint=None, timeout=None,
+                 consolidate_restarts=True):
+        """
+        :param target: {'memory': ..., 'disk': ..., 'cpu': ...} or a callable returning it for a VM record
+        :param timeout: seconds to wait for every operation
+        """
+        self.client = client
+        self.vm_ids = list(vm_ids)
+        self.target = target if callable(target) else lambda vm: target
+        self.max_unavailable = max_unavailable
+        self.checkpoint = Checkpoint(checkpoint)
+        self.timeout = timeout
+        self.consolidate_restarts = consolidate_restarts
+
+    def _target(self, vm):
+        target = {field: value for field, value in self.target(vm).items() if field in SHAPE_FIELDS}
+        shape = {field: target.get(field) or vm[field] for field in SHAPE_FIELDS}
+        self.shape_validator(shape)
+        return target
+
+    def resize(self, vm_id):
+        vm = self.client.get_vm(vm_id)
+        state = self.checkpoint.get(vm_id)
+        was_running = state.get('was_running', vm['state'] == RUNNING)
+        steps = plan_resize(vm, self._target(vm), was_running, self.consolidate_restarts)
+        self.checkpoint.update(vm_id, status=IN_PROGRESS, was_running=was_running)
+        try:
+            for method, kwargs in steps:
+                self.client.operation(getattr(self.client, method)(vm_id, **kwargs)).result(timeout=self.timeout)
+        except Exception as e:
+            if ('start_vm', {}) in steps:
+                self._restart(vm_id, e)
+            raise
+        self.checkpoint.update(vm_id, status=DONE)
+        return steps
+
+    def _restart(self, vm_id, exception):
+        """
+        Starts a VM left shut down by a failed step. A failed start is kept as exception.start_exception.
+        """
+        try:
+            self.client.operation(self.client.start_vm(vm_id)).result(timeout=self.timeout)
+        except Exception as e:
+            exception.start_exception = e
+
+    def _run_one(self, vm_id):
+        try:
+            return ResizeResult(vm_id, self.resize(vm_id), None)
+        except Exception as e:
+            self.checkpoint.update(vm_id, status=FAILED, error=str(e))
+            return ResizeResult(vm_id, None, e)
+
+    def __iter__(self):
+        pending = [vm_id for vm_id in self.vm_ids if self.checkpoint.get(vm_id).get('status') != DONE]
+        return imap_bounded(self._run_one, pending, self.max_unavailable)
+
+
+def rolling_resize(client, vm_ids, target, max_unavailable=1, checkpoint=None, **kwargs):
+    if not callable(target):
+        RollingResize.shape_validator(dict(target))  # out of range values fail before the first change
+    return iter(RollingResize(client, vm_ids, target, max_unavailable=max_unavailable, checkpoint=checkpoint,
+                              **kwargs))
@@ -0,0 +1,44 @@
+import random
+
+import requests
+
+from flops.exceptions import ApiError
+
+# read-only endpoint templates, repeating them can not change the account state
+SAFE_ENDPOINTS = frozenset([
+    'tenant', 'tariffs', 'distribution', 'software', 'operation/{id}/', 'pubkeys', 'vm', 'vm/{id}/',
+    'vm/{id}/backups', 'vm/{id}/snapshots/',
+])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class RetryPolicy:
+    """
+    Retries failed requests to safe (read-only) endpoints with jittered exponential backoff.
+    Requests to other endpoints are never repeated, so mutations can not be duplicated.
+
+    Transient errors are HTTP statuses from statuses and connection errors or timeouts.
+    The delay before attempt n + 1 is uniform in [0, min(max_backoff, backoff * 2 ** (n - 1))].
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=10, statuses=RETRY_STATUSES,
+                 safe_endpoints=SAFE_ENDPOINTS):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.safe_endpoints = safe_endpoints
+
+    def is_safe(self, endpoint):
+        return endpoint in self.safe_endpoints
+
+    def is_transient(self, error):
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        return isinstance(error, ApiError) and error.status_code in self.statuses
+
+    def should_retry(self, endpoint, error, attempt):
+        return attempt < self.max_attempts and self.is_safe(endpoint) and self.is_transient(error)
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import Future
+from copy import deepcopy
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function, callers arriving
+    while it runs wait for it and get a deep copy of its result (or its exception). Every caller owns
+    the object it gets, so results can be modified safely.
+    """
+
+    def __init__(self):
+        self.shared = 0  # number of calls answered by another caller's result
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                call.followers = 0
+            else:
+                call.followers += 1
+                self.shared += 1
+
+        if not leader:
+            return deepcopy(call.result())
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            call.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._calls[key]
+            followers = call.followers
+        call.set_result(result)
+        return deepcopy(result) if followers else result
@@ -0,0 +1,185 @@
+"""
+Snapshot trees and retention cleanup of many VMs.
+
+    tree = flops_client.snapshot_tree(vm_id)
+    for snapshot, depth in tree.walk():
+        print('  ' * depth + snapshot['name'])
+
+    for result in flops_client.prune_snapshots(vm_ids, keep_last=7, max_age=timedelta(days=30), concurrency=8):
+        print(result.vm_id, result.deleted, result.exception)
+
+A snapshot is kept when it is one of the keep_last newest snapshots of its VM or younger than max_age; every
+other snapshot is deleted. Deletes never remove the children of a snapshot (the API re-parents them), and a
+subtree is deleted leaves first, so every delete removes exactly one snapshot. The VMs are cleaned up
+concurrently, at most concurrency at a time; the deletes of one VM are made one after another, each waiting
+for its operation. Closing the generator lets the VMs in progress finish and skips the rest.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from flops.batch import imap_bounded
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
+
+
+def parse_time(value):
+    """
+    :return: aware datetime of an API timestamp like '2018-06-08T19:52:44.665+0000'
+    """
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, TIME_FORMAT)
+
+
+class SnapshotTree:
+    """
+    Snapshots of one VM linked by parent_id. Snapshots whose parent is not in the list are roots.
+    """
+
+    def __init__(self, vm_id, snapshots):
+        self.vm_id = vm_id
+        self.snapshots = list(snapshots)
+        self.by_id = {snapshot['id']: snapshot for snapshot in self.snapshots}
+        self._children = {snapshot['id']: [] for snapshot in self.snapshots}
+        self.roots = []
+        for snapshot in self.snapshots:
+            parent_id = snapshot.get('parent_id')
+            if parent_id in self._children and parent_id != snapshot['id']:
+                self._children[parent_id].append(snapshot)
+            else:
+                self.roots.append(snapshot)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def __iter__(self):
+        return iter(self.snapshots)
+
+    def __contains__(self, snapshot_id):
+        return snapshot_id in self.by_id
+
+    def get(self, snapshot_id):
+        return self.by_id.get(snapshot_id)
+
+    def parent(self, snapshot_id):
+        return self.by_id.get(self.by_id[snapshot_id].get('parent_id'))
+
+    def children(self, snapshot_id):
+        return list(self._children[snapshot_id])
+
+    def ancestors(self, snapshot_id):
+        """
+        :return: snapshots from the parent of snapshot_id up to its root
+        """
+        result = []
+        snapshot = self.parent(snapshot_id)
+        while snapshot is not None and snapshot not in result:
+            result.append(snapshot)
+            snapshot = self.parent(snapshot['id'])
+        return result
+
+    def descendants(self, snapshot_id):
+        return [snapshot for snapshot, _ in self.walk(snapshot_id)][1:]
+
+    def walk(self, snapshot_id=None):
+        """
+        :return: generator of (snapshot, depth), parents before their children
+        """
+        stack = [(self.by_id[snapshot_id], 0)] if snapshot_id is not None else [(s, 0) for s in self.roots[::-1]]
+        while stack:
+            snapshot, depth = stack.pop()
+            yield snapshot, depth
+            stack.extend((child, depth + 1) for child in self._children[snapshot['id']][::-1])
+
+    def children_first(self, snapshot_ids=None):
+        """
+        :return: snapshots (all or those in snapshot_ids) ordered so that every snapshot comes before its parent
+        """
+        order = [snapshot for snapshot, _ in self.walk()][::-1]
+        if snapshot_ids is None:
+            return order
+        snapshot_ids = set(snapshot_ids)
+        return [snapshot for snapshot in order if snapshot['id'] in snapshot_ids]
+
+
+class RetentionPolicy:
+    def __init__(self, keep_last=None, max_age=None):
+        """
+        :param keep_last: number of newest snapshots always kept
+        :param max_age: timedelta or seconds; younger snapshots are always kept
+        """
+        if keep_last is not None and keep_last < 0:
+            raise ValueError('keep_last must not be negative')
+        if max_age is not None and not isinstance(max_age, timedelta):
+            max_age = timedelta(seconds=max_age)
+        self.keep_last = keep_last
+        self.max_age = max_age
+
+    def expired(self, tree, now=None):
+        """
+        :return: snapshots of tree to delete, children before their parents. Without any rule nothing expires.
+        """
+        if self.keep_last is None and self.max_age is None:
+            return []
+        now = now or datetime.now(timezone.utc)
+        added = {snapshot['id']: parse_time(snapshot['time_added']) for snapshot in tree}
+        newest = sorted(tree, key=lambda snapshot: (added[snapshot['id']], snapshot['id']), reverse=True)
+        keep = {snapshot['id'] for snapshot in newest[:self.keep_last or 0]}
+        if self.max_age is not None:
+            keep.update(snapshot_id for snapshot_id, time in added.items() if now - time <= self.max_age)
+        return tree.children_first(snapshot_id for snapshot_id in added if snapshot_id not in keep)
+
+
+class RetentionResult(namedtuple('RetentionResult', ['vm_id', 'expired', 'deleted', 'exception'])):
+    """
+    expired are the snapshots selected for deletion, deleted the ids actually deleted, in order.
+    """
+
+    @property
+    def ok(self):
+        return self.exception is None
+
+
+class SnapshotRetention:
+    def __init__(self, client, vm_ids, policy, concurrency=8, dry_run=False, timeout=None, now=None):
+        """
+        :param timeout: seconds to wait for every delete operation
+        """
+        self.client = client
+        self.vm_ids = list(vm_ids)
+        self.policy = policy
+        self.concurrency = concurrency
+        self.dry_run = dry_run
+        self.timeout = timeout
+        self.now = now
+
+    def prune(self, vm_id):
+        tree = self.client.snapshot_tree(vm_id)
+        expired = self.policy.expired(tree, now=self.now)
+        deleted = []
+        if expired and not self.dry_run:
+            tenant_id = self.client._get_vm_tenant_id(vm_id)
+            try:
+                for snapshot in expired:
+                    response = self.client.delete_vm_snapshot(vm_id, snapshot['id'], tenant_id=tenant_id)
+                    self.client.operation(response).result(timeout=self.timeout)
+                    deleted.append(snapshot['id'])
+            except Exception as e:
+                return RetentionResult(vm_id, expired, deleted, e)
+        return RetentionResult(vm_id, expired, deleted, None)
+
+    def _run_one(self, vm_id):
+        try:
+            return self.prune(vm_id)
+        except Exception as e:
+            return RetentionResult(vm_id, None, [], e)
+
+    def __iter__(self):
+        return imap_bounded(self._run_one, self.vm_ids, self.concurrency)
+
+
+def prune_snapshots(client, vm_ids, keep_last=None, max_age=None, concurrency=8, dry_run=False, timeout=None,
+                    now=None):
+    policy = RetentionPolicy(keep_last=keep_last, max_age=max_age)
+    return iter(SnapshotRetention(client, vm_ids, policy, concurrency=concurrency, dry_run=dry_run,
+                                  timeout=timeout, now=now))
@@ -0,0 +1,578 @@
+"""
+Local stateful stand-in for the flops.ru API used by tests and load runs.
+
+    with StubServer(latency=0.01) as server:
+        client = server.client()
+        client.get_vms()
+
+or from a shell: python -m flops.stub --port 8000
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+from collections import Counter
+from copy import deepcopy
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from urllib.parse import urlsplit, parse_qs
+
+from flops.helpers import endpoint_template
+
+API_PREFIX = '/api/v1/'
+
+TENANTS = [{'id': 1, 'name': 'default'}]
+
+TARIFFS = [
+    {'id': 1, 'name': 'on-demand', 'memory': 512, 'disk': 8192, 'cpu': 1, 'price': 0,
+     'forWindows': False, 'onDemand': True},
+    {'id': 2, 'name': 'S', 'memory': 512, 'disk': 10240, 'cpu': 1, 'price': 150, 'forWindows': False,
+     'onDemand': False},
+    {'id': 3, 'name': 'M', 'memory': 1024, 'disk': 20480, 'cpu': 1, 'price': 290, 'forWindows': False,
+     'onDemand': False},
+    {'id': 4, 'name': 'L', 'memory': 2048, 'disk': 40960, 'cpu': 2, 'price': 590, 'forWindows': False,
+     'onDemand': False},
+    {'id': 5, 'name': 'XL', 'memory': 4096, 'disk': 81920, 'cpu': 4, 'price': 1190, 'forWindows': False,
+     'onDemand': False},
+    {'id': 6, 'name': 'XXL', 'memory': 8192, 'disk': 163840, 'cpu': 8, 'price': 2390, 'forWindows': False,
+     'onDemand': False},
+    {'id': 7, 'name': 'Windows M', 'memory': 2048, 'disk': 40960, 'cpu': 2, 'price': 990, 'forWindows': True,
+     'onDemand': False},
+    {'id': 8, 'name': 'Windows L', 'memory': 4096, 'disk': 81920, 'cpu': 4, 'price': 1790, 'forWindows': True,
+     'onDemand': False},
+]
+
+DISTRIBUTIONS = [
+    {'id': 1, 'name': 'Debian', 'description': 'Debian 7 64 bit', 'forWindows': False},
+    {'id': 2, 'name': 'Debian', 'description': 'Debian 8 64 bit', 'forWindows': False},
+    {'id': 3, 'name': 'Debian', 'description': 'Debian 9 64 bit', 'forWindows': False},
+    {'id': 4, 'name': 'Ubuntu', 'description': 'Ubuntu 16.04 64 bit', 'forWindows': False},
+    {'id': 5, 'name': 'CentOS', 'description': 'CentOS 7 64 bit', 'forWindows': False},
+    {'id': 6, 'name': 'Windows', 'description': 'Windows Server 2012 R2', 'forWindows': True},
+]
+
+SOFTWARE = [
+    {'id': 1, 'name': 'LAMP'},
+    {'id': 2, 'name': 'Docker'},
+]
+
+# action: (operation type, method name of StubState applying it)
+VM_ACTIONS = {
+    'rename': ('VM_UPDATE', 'rename_vm'),
+    'start': ('VM_START', 'start_vm'),
+    'reset': ('VM_RESET', None),
+    'reboot': ('VM_REBOOT', None),
+    'poweroff': ('VM_DESTROY', 'poweroff_vm'),
+    'shutdown': ('VM_SHUTDOWN', 'poweroff_vm'),
+    'delete': ('VM_DELETE', 'delete_vm'),
+    'reinstall': ('VM_REINSTALL', 'reinstall_vm'),
+    'password_change': ('VM_PASSWORD_CHANGE', None),
+    'pubkey_change': ('VM_PUBLIC_KEY_CHANGE', 'change_vm_pubkeys'),
+    'memory_change': ('VM_MEMORY_CHANGE', 'change_vm_memory'),
+    'disk_change': ('VM_VOLUME_CHANGE', 'change_vm_disk'),
+    'cpu_change': ('VM_CPU_CORES_QUOTA_CHANGE', 'change_vm_cpu'),
+    'ip_add': ('VM_IP_ADD', 'add_vm_ip'),
+    'ip_delete': ('VM_IP_DELETE', 'delete_vm_ip'),
+    'ip_move': ('VM_IP_ADD', 'move_vm_ip'),  # the API reports ip moves as VM_IP_ADD
+    'backup_policy_change': ('VM_BACKUP_POLICY_CHANGE', 'change_vm_backup_policy'),
+    'backup_rollback': ('VM_BACKUP_ROLLBACK', None),
+    'snapshot_create': ('VM_CREATE_SNAPSHOT', 'create_vm_snapshot'),
+    'snapshot_rollback': ('VM_ROLLBACK_SNAPSHOT', 'rollback_vm_snapshot'),
+    'snapshot_delete': ('VM_DELETE_SNAPSHOT', 'delete_vm_snapshot'),
+}
+
+
+class StubError(Exception):
+    def __init__(self, error_code, error_message=''):
+        super().__init__(error_message)
+        self.error_code = error_code
+        self.error_message = error_message
+
+
+def _now():
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + '+0000'
+
+
+def _value(values):
+    value = values[-1]
+    if value.lstrip('-').isdigit():
+        return int(value)
+    if value in ('True', 'true'):
+        return True
+    if value in ('False', 'false'):
+        return False
+    return value
+
+
+def _parse_params(query):
+    params = {}
+    for key, values in parse_qs(query, keep_blank_values=True).items():
+        if key.endswith('Ids'):
+            params[key] = [_value([v]) for v in values if v != '']
+        else:
+            params[key] = _value(values)
+    return params
+
+
+class StubState:
+    """
+    In-memory account state. Records are kept with the camelCase keys the API responds with.
+    """
+
+    def __init__(self, operation_duration=0, max_vms=None):
+        self.operation_duration = operation_duration
+        self.max_vms = max_vms
+        self.lock = threading.RLock()
+        self.tenants = deepcopy(TENANTS)
+        self.tariffs = deepcopy(TARIFFS)
+        self.distributions = deepcopy(DISTRIBUTIONS)
+        self.software = deepcopy(SOFTWARE)
+        self.vms = {}
+        self.pubkeys = {}
+        self.snapshots = {}
+        self.backups = {}
+        self.operations = {}
+        self._current_snapshot = {}
+        self._vm_operations = {}
+        self._ids = Counter()
+        self._operation(None, 'VM_INSTALL')
+
+    def _next_id(self, kind):
+        self._ids[kind] += 1
+        return self._ids[kind]
+
+    def _next_ip(self):
+        ip_id = self._next_id('ip')
+        return '10.{}.{}.{}'.format(ip_id // 65536 % 256, ip_id // 256 % 256, ip_id % 256 or 1)
+
+    def _operation(self, vm_id, operation_type):
+        operation_id = self._next_id('operation')
+        self.operations[operation_id] = {
+            'id': operation_id, 'vmId': vm_id, 'operationType': operation_type, 'timeAdded': _now(),
+            '_started_at': monotonic(),
+        }
+        self._vm_operations[vm_id] = operation_id
+        return operation_id
+
+    def operation_status(self, operation_id):
+        operation = self._get(self.operations, operation_id, 'error.object.not.found')
+        elapsed = monotonic() - operation['_started_at']
+        done = elapsed >= self.operation_duration
+        status = {k: v for k, v in operation.items() if not k.startswith('_')}
+        status['status'] = 'DONE' if done else 'IN_PROGRESS'
+        status['percentage'] = 100 if done else int(elapsed / self.operation_duration * 100)
+        return status
+
+    def _busy(self, vm_id):
+        operation_id = self._vm_operations.get(vm_id)
+        return operation_id is not None and self.operation_status(operation_id)['status'] != 'DONE'
+
+    @staticmethod
+    def _get(records, record_id, error_code):
+        try:
+            return records[record_id]
+        except KeyError:
+            raise StubError(error_code, 'Object {} not found'.format(record_id))
+
+    def get_vm(self, vm_id):
+        return self._get(self.vms, vm_id, 'error.vm.not.found')
+
+    def _tariff(self, tariff_id):
+        for tariff in self.tariffs:
+            if tariff['id'] == tariff_id:
+                return tariff
+        raise StubError('error.object.not.found', 'Tariff {} not found'.format(tariff_id))
+
+    def _distribution(self, distribution_id):
+        for distribution in self.distributions:
+            if distribution['id'] == distribution_id:
+                return {k: distribution[k] for k in ('id', 'name', 'description')}
+        raise StubError('error.object.not.found', 'Distribution {} not found'.format(distribution_id))
+
+    def _shape(self, params, tariff):
+        if tariff['onDemand']:
+            return {k: params.get(k, tariff[k]) for k in ('memory', 'disk', 'cpu')}
+        return {k: tariff[k] for k in ('memory', 'disk', 'cpu')}
+
+    def add_vm(self, name, tenant_id=1, distribution_id=3, tariff_id=2, ip_count=1, **fields):
+        if self.max_vms is not None and len(self.vms) >= self.max_vms:
+            raise StubError('vm.limit.exceed', 'VM limit exceeded')
+        tariff = self._tariff(tariff_id)
+        vm_id = self._next_id('vm')
+        vm = {
+            'id': vm_id, 'name': name, 'tenantId': tenant_id, 'tariffId': tariff_id,
+            'distribution': self._distribution(distribution_id),
+            'state': 'VIR_DOMAIN_RUNNING', 'timeAdded': _now(), 'internalId': 'vm{}'.format(vm_id),
+            'privateIpAddress': '192.168.{}.{}'.format(vm_id // 256 % 256, vm_id % 256),
+            'ipAddresses': [self._next_ip() for _ in range(ip_count)],
+            'backupPolicy': {'quantity': 0, 'frequency': 0},
+            'publicKeyIds': fields.pop('publicKeyIds', []),
+        }
+        vm.update(self._shape(fields, tariff))
+        self.vms[vm_id] = vm
+        self.snapshots[vm_id] = {}
+        self.backups[vm_id] = []
+        return vm
+
+    def install_vm(self, params):
+        for field in ('name', 'tenantId', 'distributionId', 'tariffId'):
+            if params.get(field) in (None, ''):
+                raise StubError(None, '{}: required'.format(field))
+        fields = {k: params[k] for k in ('memory', 'disk', 'cpu', 'publicKeyIds') if k in params}
+        vm = self.add_vm(params['name'], tenant_id=params['tenantId'], distribution_id=params['distributionId'],
+                         tariff_id=params['tariffId'], ip_count=params.get('ipCount', 1), **fields)
+        return {'result': vm['id'], 'operationId': self._operation(vm['id'], 'VM_INSTALL')}
+
+    def clone_vm(self, vm_id, params):
+        source = self.get_vm(vm_id)
+        vm = self.add_vm(params['name'], tenant_id=source['tenantId'], distribution_id=source['distribution']['id'],
+                         tariff_id=source['tariffId'], ip_count=len(source['ipAddresses']))
+        for field in ('memory', 'disk', 'cpu', 'backupPolicy', 'publicKeyIds'):
+            vm[field] = deepcopy(source[field])
+        return {'operationId': self._operation(vm['id'], 'VM_CLONE')}
+
+    def vm_action(self, vm_id, action, params):
+        vm = self.get_vm(vm_id)
+        if self._busy(vm_id):
+            raise StubError('error.operation.already.started', 'Operation already started')
+        operation_type, method = VM_ACTIONS[action]
+        result = getattr(self, method)(vm, params) if method else None
+        response = {'operationId': self._operation(vm_id, operation_type)}
+        if result is not None:
+            response['result'] = result
+        return response
+
+    def rename_vm(self, vm, params):
+        vm['name'] = params['name']
+
+    def start_vm(self, vm, params):
+        vm['state'] = 'VIR_DOMAIN_RUNNING'
+
+    def poweroff_vm(self, vm, params):
+        vm['state'] = 'VIR_DOMAIN_SHUTOFF'
+
+    def delete_vm(self, vm, params):
+        del self.vms[vm['id']]
+
+    def reinstall_vm(self, vm, params):
+        tariff = self._tariff(params.get('tariffId', vm['tariffId']))
+        vm['tariffId'] = tariff['id']
+        vm.update(self._shape(params, tariff))
+        if 'name' in params:
+            vm['name'] = params['name']
+        if 'distributionId' in params:
+            vm['distribution'] = self._distribution(params['distributionId'])
+
+    def change_vm_pubkeys(self, vm, params):
+        vm['publicKeyIds'] = params.get('keyIds', [])
+
+    def change_vm_memory(self, vm, params):
+        vm['memory'] = params['memory']
+
+    def change_vm_disk(self, vm, params):
+        vm['disk'] = params['disk']
+
+    def change_vm_cpu(self, vm, params):
+        vm['cpu'] = params['cpu']
+
+    def add_vm_ip(self, vm, params):
+        vm['ipAddresses'].append(self._next_ip())
+
+    def delete_vm_ip(self, vm, params):
+        if params['ip'] not in vm['ipAddresses']:
+            raise StubError('error.object.not.found', 'IP {} not found'.format(params['ip']))
+        vm['ipAddresses'].remove(params['ip'])
+
+    def move_vm_ip(self, vm, params):
+        to_vm = self.get_vm(params['toVmId'])
+        self.delete_vm_ip(vm, params)
+        to_vm['ipAddresses'].append(params['ip'])
+
+    def change_vm_backup_policy(self, vm, params):
+        vm['backupPolicy'] = {'quantity': params['quantity'], 'frequency': params['frequency']}
+
+    def create_vm_snapshot(self, vm, params):
+        snapshot_id = self._next_id('snapshot')
+        self.snapshots[vm['id']][snapshot_id] = {
+            'id': snapshot_id, 'name': params['name'], 'description': params.get('description', ''),
+            'timeAdded': _now(), 'parentId': self._current_snapshot.get(vm['id']),
+        }
+        self._current_snapshot[vm['id']] = snapshot_id
+        return snapshot_id
+
+    def rollback_vm_snapshot(self, vm, params):
+        self._get(self.snapshots[vm['id']], params['snapshotId'], 'error.object.not.found')
+        self._current_snapshot[vm['id']] = params['snapshotId']
+
+    def delete_vm_snapshot(self, vm, params):
+        snapshots = self.snapshots[vm['id']]
+        snapshot = self._get(snapshots, params['snapshotId'], 'error.object.not.found')
+        children = [s for s in snapshots.values() if s['parentId'] == snapshot['id']]
+        if children and not params.get('deleteChildren'):
+            for child in children:
+                child['parentId'] = snapshot['parentId']
+        deleted = [snapshot['id']]
+        while deleted:
+            snapshot_id = deleted.pop()
+            removed = snapshots.pop(snapshot_id)
+            if self._current_snapshot.get(vm['id']) == snapshot_id:
+                self._current_snapshot[vm['id']] = removed['parentId']
+            if params.get('deleteChildren'):
+                deleted.extend(s['id'] for s in snapshots.values() if s['parentId'] == snapshot_id)
+
+    def add_pubkey(self, params):
+        key_id = self._next_id('pubkey')
+        self.pubkeys[key_id] = {'id': key_id, 'name': params['name'], 'publicKey': params['publicKey'],
+                                'tenantId': params.get('tenantId')}
+        return self.pubkeys[key_id]
+
+    def edit_pubkey(self, key_id, params):
+        key = self._get(self.pubkeys, key_id, 'error.object.not.found')
+        key.update({k: params[k] for k in ('name', 'publicKey') if k in params})
+        return key
+
+    def delete_pubkey(self, key_id):
+        self._get(self.pubkeys, key_id, 'error.object.not.found')
+        del self.pubkeys[key_id]
+
+    def dispatch(self, path, params):
+        parts = path.strip('/').split('/')
+        template = endpoint_template(path).strip('/')
+        record_id = next((int(p) for p in parts if p.isdigit()), None)
+
+        if template == 'tenant':
+            return {'result': self.tenants}
+        if template == 'tariffs':
+            return {'result': self.tariffs}
+        if template == 'distribution':
+            return {'result': self.distributions}
+        if template == 'software':
+            return {'result': self.software}
+        if template == 'operation/{id}':
+            return {'result': self.operation_status(record_id)}
+        if template == 'pubkeys':
+            return {'result': list(self.pubkeys.values())}
+        if template == 'pubkeys/add':
+            return {'result': self.add_pubkey(params)}
+        if template == 'pubkeys/{id}/edit':
+            return {'result': self.edit_pubkey(record_id, params)}
+        if template == 'pubkeys/{id}/delete':
+            self.delete_pubkey(record_id)
+            return {}
+        if template == 'vm':
+            return {'result': list(self.vms.values())}
+        if template == 'vm/install':
+            return self.install_vm(params)
+        if template == 'vm/{id}':
+            return {'result': self.get_vm(record_id)}
+        if template == 'vm/{id}/clone':
+            return self.clone_vm(record_id, params)
+        if template == 'vm/{id}/backups':
+            self.get_vm(record_id)
+            return {'result': self.backups[record_id]}
+        if template == 'vm/{id}/snapshots':
+            self.get_vm(record_id)
+            return {'result': list(self.snapshots[record_id].values())}
+        if template.startswith('vm/{id}/') and parts[2] in VM_ACTIONS:
+            return self.vm_action(record_id, parts[2], params)
+        raise StubError('error.object.not.found', 'Unknown endpoint {}'.format(path))
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+    connection_count = 0
+
+    def process_request(self, request, client_address):
+        self.connection_count += 1
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # clients giving up on a slow response
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """
+    Serves StubState over HTTP on a background thread.
+
+    latency: seconds added to every response, or a (min, max) range.
+    endpoint_latency: the same per endpoint template, e.g. {'vm/{id}/': 0.2}.
+    operation_duration: seconds until started operations are DONE.
+    max_vms: installs above it fail with vm.limit.exceed.
+    """
+
+    def __init__(self, client_id='client_id', api_key='api_key', host='127.0.0.1', port=0, latency=0,
+                 endpoint_latency=None, operation_duration=0, max_vms=None):
+        self.client_id = client_id
+        self.api_key = api_key
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.endpoint_latency = endpoint_latency or {}
+        self.state = StubState(operation_duration=operation_duration, max_vms=max_vms)
+        self.request_counts = Counter()
+        self._errors = {}
+        self._errors_lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        return 'http://{}:{}{}'.format(self.host, self.port, API_PREFIX)
+
+    @property
+    def connection_count(self):
+        """
+        Number of TCP connections accepted so far.
+        """
+        return self._httpd.connection_count
+
+    def client(self, client_class=None, **kwargs):
+        if client_class is None:
+            from flops.client import FlopsClient
+            client_class = FlopsClient
+        return client_class(self.client_id, self.api_key, endpoint=self.endpoint, **kwargs)
+
+    def add_vm(self, name, **fields):
+        with self.state.lock:
+            return deepcopy(self.state.add_vm(name, **fields))
+
+    def inject_error(self, template, error_code=None, error_message='', status_code=200, count=1):
+        """
+        Makes the next count requests to the endpoint template (e.g. 'vm/{id}/reboot/') fail with
+        the API error_code or, with status_code other than 200, with that HTTP status.
+        count=None fails every request until clear_errors().
+        """
+        with self._errors_lock:
+            self._errors.setdefault(template.strip('/'), []).append(
+                {'error_code': error_code, 'error_message': error_message, 'status_code': status_code,
+                 'count': count})
+
+    def clear_errors(self):
+        with self._errors_lock:
+            self._errors.clear()
+
+    def _injected_error(self, template):
+        with self._errors_lock:
+            errors = self._errors.get(template)
+            if not errors:
+                return None
+            error = errors[0]
+            if error['count'] is not None:
+                error['count'] -= 1
+                if error['count'] <= 0:
+                    errors.pop(0)
+            return error
+
+    def _delay(self, template):
+        latency = self.endpoint_latency.get(template, self.endpoint_latency.get(template + '/', self.latency))
+        if isinstance(latency, (tuple, list)):
+            latency = random.uniform(*latency)
+        if latency:
+            sleep(latency)
+
+    def handle(self, path, query):
+        """
+        :return: (HTTP status, response payload)
+        """
+        params = _parse_params(query)
+        template = endpoint_template(path).strip('/')
+        self.request_counts[template] += 1
+        self._delay(template)
+
+        error = self._injected_error(template)
+        if error and error['status_code'] != 200:
+            return error['status_code'], {'status': 'ERROR', 'errorMessage': error['error_message']}
+        if error:
+            return 200, {'status': 'ERROR', 'errorCode': error['error_code'], 'errorMessage': error['error_message']}
+
+        if params.pop('clientId', None) != _value([self.client_id]) or \
+                params.pop('apiKey', None) != _value([self.api_key]):
+            return 200, {'status': 'ERROR', 'errorCode': 'error.not.owner', 'errorMessage': 'Wrong credentials'}
+
+        try:
+            with self.state.lock:
+                payload = deepcopy(self.state.dispatch(path, params))
+        except StubError as e:
+            return 200, {'status': 'ERROR', 'errorCode': e.error_code, 'errorMessage': e.error_message}
+        except (KeyError, ValueError, TypeError) as e:
+            return 200, {'status': 'ERROR', 'errorCode': None, 'errorMessage': str(e),
+                         'fieldErrors': {'params': str(e)}}
+        payload['status'] = 'OK'
+        return 200, payload
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if not url.path.startswith(API_PREFIX):
+                    status, payload = 404, {'status': 'ERROR', 'errorMessage': 'Not found'}
+                else:
+                    status, payload = server.handle(url.path[len(API_PREFIX):], url.query)
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._httpd = _HTTPServer((self.host, self.port), self._handler_class())
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='flops-stub-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local flops.ru API stub server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--client-id', default='client_id')
+    parser.add_argument('--api-key', default='api_key')
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--operation-duration', type=float, default=0)
+    parser.add_argument('--vms', type=int, default=0, help='number of VMs to create on start')
+    args = parser.parse_args()
+
+    server = StubServer(args.client_id, args.api_key, host=args.host, port=args.port, latency=args.latency,
+                        operation_duration=args.operation_duration)
+    for i in range(args.vms):
+        server.add_vm('vm-{}'.format(i))
+    server.start()
+    print('Serving flops API stub on {}'.format(server.endpoint))
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
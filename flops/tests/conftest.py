@@ -3,6 +3,7 @@ import pytest
 
 from flops.client import FlopsClient
 from flops.exceptions import NotFoundError
+from flops.stub import StubServer
 from flops.tests.helpers import generate_name, generate_password
 
 client_id = os.environ.get('CLIENT_ID', '')
@@ -21,9 +22,48 @@ def cleanup_test_pubkeys(fc):
         fc.delete_pubkey(pub_key['id'])
 
 
+@pytest.fixture
+def stub_server():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture
+def operation_server():
+    """
+    Stub server whose operations finish after 20 ms.
+    """
+    with StubServer(operation_duration=0.02) as server:
+        yield server
+
+
+@pytest.fixture
+def fast_client():
+    """
+    Makes clients of a stub server polling operations every 10 to 50 ms.
+    """
+    def make(server, **kwargs):
+        return server.client(polling_intervals={}, default_polling_interval=(0.01, 0.05), **kwargs)
+    return make
+
+
+@pytest.fixture(scope='session')
+def flops_endpoint():
+    """
+    The real API when CLIENT_ID and API_KEY are set, a local stub server otherwise.
+    """
+    if client_id and api_key:
+        yield FlopsClient.endpoint, client_id, api_key
+        return
+
+    with StubServer() as server:
+        yield server.endpoint, server.client_id, server.api_key
+
+
 @pytest.fixture(scope='session')
-def flops_client():
-    fc = FlopsClient(client_id, api_key)
+def flops_client(flops_endpoint):
+    endpoint, fc_client_id, fc_api_key = flops_endpoint
+    fc = FlopsClient(fc_client_id, fc_api_key, endpoint=endpoint)
     yield fc
     cleanup_test_vms(fc)
     cleanup_test_pubkeys(fc)
@@ -1,3 +1,4 @@
+import json
 import random
 import string
 
@@ -41,3 +42,53 @@ def get_vm_2nd_puplic_ip(vm):
 
 def get_vm_backup_policy(vm):
     return vm['backup_policy']
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode('utf-8')
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """
+    requests.Session replacement routing API paths to canned camelCase payloads.
+    A route value may be a payload or a callable taking the request params.
+    """
+
+    def __init__(self, routes, endpoint='https://api.flops.ru/api/v1/'):
+        self.routes = routes
+        self.endpoint = endpoint
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        path = url[len(self.endpoint):]
+        self.calls.append((path, params))
+        payload = self.routes[path]
+        if callable(payload):
+            payload = payload(params)
+        if isinstance(payload, FakeResponse):
+            return payload
+        return FakeResponse(payload)
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAsyncPool(FakeSession):
+    """
+    flops.aio.AsyncConnectionPool replacement with the routes of FakeSession.
+    """
+
+    async def get(self, url, params=None, **kwargs):
+        return FakeSession.get(self, url, params, **kwargs)
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,40 @@
+"""
+Synthetic flops.ru API payloads shaped like real responses (camelCase keys), shared by the tests and benchmarks.
+"""
+import random
+
+
+def make_vm(vm_id, tenant_id=1):
+    return {
+        'id': vm_id,
+        'name': 'vm-{}'.format(vm_id),
+        'tenantId': tenant_id,
+        'tariffId': 10 + vm_id % 5,
+        'memory': 1024,
+        'disk': 16384,
+        'cpu': 1 + vm_id % 4,
+        'ipCount': 1,
+        'state': 'VIR_DOMAIN_RUNNING',
+        'timeAdded': '2018-06-08T19:52:44.665+0000',
+        'privateIpAddress': '10.0.{}.{}'.format(vm_id // 256 % 256, vm_id % 256),
+        'internalId': 'vm{}'.format(vm_id),
+        'ipAddresses': ['5.{}.{}.{}'.format(vm_id // 65536 % 256, vm_id // 256 % 256, vm_id % 256)],
+        'distribution': {'id': 3, 'name': 'Debian 9', 'description': '64 bit', 'forWindows': False},
+        'backupPolicy': {'quantity': 2, 'frequency': 24},
+        'openSupportAccess': False,
+        'publicKeyIds': [1, 2],
+        'softwareIds': [],
+    }
+
+
+def make_vms_response(count, seed=0):
+    rng = random.Random(seed)
+    return {'status': 'OK', 'result': [make_vm(i + 1, tenant_id=rng.randint(1, 3)) for i in range(count)]}
+
+
+def make_install_spec(i):
+    return {
+        'name': 'vm-{}'.format(i), 'tenant_id': 1, 'distribution_id': 3, 'tariff_id': 1, 'memory': 1024,
+        'disk': 16384, 'cpu': 2, 'ip_count': 1, 'password': None, 'send_password': True,
+        'open_support_access': False, 'public_key_ids': [], 'software_ids': [],
+    }
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+from time import perf_counter
+
+import pytest
+
+from flops import AsyncFlopsClient
+from flops.async_client import API_METHODS, SYNC_ONLY
+from flops.exceptions import NotFoundError, OperationTimeoutError
+from flops.stub import StubServer
+from flops.tests.helpers import FakeAsyncPool
+
+VM = {'id': 1, 'name': 'vm1', 'tenantId': 10, 'ipAddresses': ['1.1.1.1']}
+
+
+class DelayedAsyncPool(FakeAsyncPool):
+    """
+    Answers the n-th request after delays[n] seconds (0 once the delays run out).
+    """
+
+    def __init__(self, routes, delays):
+        super().__init__(routes)
+        self.delays = list(delays)
+
+    async def get(self, url, params=None, **kwargs):
+        delay = self.delays.pop(0) if self.delays else 0
+        await asyncio.sleep(delay)
+        return await super().get(url, params, **kwargs)
+
+
+def make_client(routes, pool_class=FakeAsyncPool, **kwargs):
+    client = AsyncFlopsClient('client_id', 'api_key', concurrency=4)
+    client._pool = pool_class(routes, **kwargs)
+    return client
+
+
+def test_api_method_is_coroutine():
+    client = make_client({'vm/1/': {'status': 'OK', 'result': VM}})
+
+    res = asyncio.run(client.get_vm(1))
+    assert res == {'id': 1, 'name': 'vm1', 'tenant_id': 10, 'ip_addresses': ['1.1.1.1']}
+    client.close()
+
+
+def test_errors_are_mapped():
+    client = make_client({'vm/2/': {'status': 'ERROR', 'errorCode': 'error.vm.not.found', 'errorMessage': ''}})
+
+    with pytest.raises(NotFoundError):
+        asyncio.run(client.get_vm(2))
+    client.close()
+
+
+def test_gather():
+    routes = {'vm/{}/'.format(i): {'status': 'OK', 'result': dict(VM, id=i)} for i in range(20)}
+    client = make_client(routes)
+
+    async def main():
+        return await asyncio.gather(*(client.get_vm(i) for i in range(20)))
+
+    assert [vm['id'] for vm in asyncio.run(main())] == list(range(20))
+    client.close()
+
+
+def test_gather_with_shared_caches():
+    routes = {
+        'vm/1/': {'status': 'OK', 'result': VM},
+        'vm/1/reboot/': {'status': 'OK', 'operationId': 7},
+        'tenant': {'status': 'OK', 'result': [{'id': 10}]},
+        'tariffs': {'status': 'OK', 'result': [{'id': 1, 'name': 'S'}]},
+        'vm/install/': lambda params: {'status': 'OK', 'result': 5, 'operationId': 8},
+    }
+    # the tenant lookup of reboot_vm and the first tenant request answer last, after the caches are filled
+    client = make_client(routes, pool_class=DelayedAsyncPool, delays=[0.05, 0, 0.05, 0, 0, 0.05, 0])
+
+    async def main():
+        return await asyncio.gather(
+            client.reboot_vm(1), client.get_vm(1),
+            *(client.install_vm(name='vm', distribution_id=1, tariff_id=1) for _ in range(3)),
+            client.get_tariffs(), client.get_tariffs())
+
+    reboot, vm, *installs, tariffs, cached_tariffs = asyncio.run(main())
+    assert reboot['operation_id'] == 7 and vm['tenant_id'] == 10
+    assert [install['vm_id'] for install in installs] == [5, 5, 5]
+    assert tariffs == cached_tariffs == [{'id': 1, 'name': 'S'}]
+    assert all(params['tenantId'] == 10 for path, params in client._pool.calls if path == 'vm/install/')
+    client.close()
+
+
+def test_name_keyword_argument():
+    client = make_client({'vm/install/': {'status': 'OK', 'result': 5, 'operationId': 8}})
+
+    res = asyncio.run(client.install_vm(name='vm', distribution_id=1, tariff_id=1, tenant_id=10))
+    assert res['vm_id'] == 5
+    assert client._pool.calls[-1][1]['name'] == 'vm'
+    client.close()
+
+
+def test_wait_for_operation():
+    statuses = iter(['IN_PROGRESS', 'IN_PROGRESS', 'DONE'])
+    client = make_client({
+        'operation/5/': lambda params: {'status': 'OK', 'result': {'id': 5, 'status': next(statuses)}},
+    })
+
+    res = asyncio.run(client.wait_for_operation(5, polling_time=0))
+    assert res == {'id': 5, 'status': 'DONE'}
+    client.close()
+
+
+def test_wait_for_operation_timeout():
+    client = make_client({'operation/5/': {'status': 'OK', 'result': {'id': 5, 'status': 'IN_PROGRESS'}}})
+
+    with pytest.raises(OperationTimeoutError):
+        asyncio.run(client.wait_for_operation(5, timeout=0.05, polling_time=0.01))
+    client.close()
+
+
+def test_api_methods_follow_flops_client():
+    assert {'get_vm', 'reboot_vm', 'tariff_catalog', 'key_registry', 'snapshot_tree'} <= set(API_METHODS)
+    assert not SYNC_ONLY & set(API_METHODS)
+    assert all(asyncio.iscoroutinefunction(getattr(AsyncFlopsClient, name)) for name in API_METHODS)
+
+
+def test_stub_server_without_threads():
+    with StubServer(latency=0.05) as server:
+        vm_ids = [server.add_vm('vm{}'.format(i), tenant_id=10)['id'] for i in range(200)]
+
+        async def main():
+            async with server.client(client_class=AsyncFlopsClient, concurrency=50) as client:
+                vms = await asyncio.gather(*(client.get_vm(vm_id) for vm_id in vm_ids))
+                assert not [t for t in threading.enumerate() if t.name.startswith('ThreadPoolExecutor')]
+                operations = await asyncio.gather(*(client.reboot_vm(vm_id) for vm_id in vm_ids[:10]))
+                with pytest.raises(NotFoundError):
+                    await client.get_vm(10000)
+                return vms, operations
+
+        started_at = perf_counter()
+        vms, operations = asyncio.run(main())
+        assert perf_counter() - started_at < 2  # 200 requests of 50 ms, 50 at a time
+
+        assert [vm['id'] for vm in vms] == vm_ids and vms[0]['tenant_id'] == 10
+        assert all(op['operation_id'] for op in operations)
+        assert server.request_counts['vm/{id}/reboot'] == 10
+        assert server.connection_count <= 50
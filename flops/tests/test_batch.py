@@ -0,0 +1,86 @@
+import threading
+from time import monotonic, sleep
+
+from flops import FlopsClient
+from flops.batch import imap_bounded
+from flops.exceptions import OperationError, OperationTimeoutError
+from flops.tests.helpers import FakeSession
+
+VM_IDS = list(range(1, 21))
+
+
+def make_client():
+    routes = {'vm': {'status': 'OK', 'result': [{'id': vm_id, 'tenantId': 10} for vm_id in VM_IDS]}}
+    for vm_id in VM_IDS:
+        routes['vm/{}/reboot/'.format(vm_id)] = {'status': 'OK', 'operationId': 100 + vm_id}
+        routes['vm/{}/cpu_change/'.format(vm_id)] = {'status': 'OK', 'operationId': 100 + vm_id}
+        routes['operation/{}/'.format(100 + vm_id)] = {'status': 'OK', 'result': {'id': 100 + vm_id, 'status': 'DONE'}}
+    routes['vm/7/reboot/'] = {'status': 'ERROR', 'errorCode': 'error.operation.already.started', 'errorMessage': ''}
+    fc = FlopsClient('client_id', 'api_key')
+    fc._session = FakeSession(routes)
+    fc.get_vms()
+    return fc
+
+
+def test_map_keeps_input_order_and_exceptions():
+    fc = make_client()
+    results = fc.map('reboot_vm', VM_IDS, concurrency=4)
+
+    assert [r.item for r in results] == VM_IDS
+    assert [r.result['operation_id'] for r in results if r.ok] == [100 + i for i in VM_IDS if i != 7]
+    failed = [r for r in results if not r.ok]
+    assert len(failed) == 1
+    assert failed[0].item == 7
+    assert isinstance(failed[0].exception, OperationError)
+
+
+def test_batch_passes_arguments_and_waits():
+    fc = make_client()
+    results = fc.batch(VM_IDS[:3], wait=True).change_vm_cpu(cpu=2)
+
+    assert all(r.ok for r in results)
+    assert [r.operation['id'] for r in results] == [101, 102, 103]
+    assert all(params['cpu'] == 2 for path, params in fc._session.calls if path.endswith('cpu_change/'))
+
+
+def test_map_wait_shares_one_timeout():
+    fc = make_client()
+    for vm_id in (1, 2):
+        fc._session.routes['operation/{}/'.format(100 + vm_id)] = {
+            'status': 'OK', 'result': {'id': 100 + vm_id, 'status': 'IN_PROGRESS'}}
+
+    def reboot(vm_id):  # a handle and a plain response
+        response = fc.reboot_vm(vm_id)
+        return fc.operation(response) if vm_id == 1 else response
+
+    started_at = monotonic()
+    results = fc.map(reboot, [1, 2], wait=True, timeout=0.3)
+    assert monotonic() - started_at < 0.5
+    assert all(isinstance(r.exception, OperationTimeoutError) for r in results)
+
+
+def test_map_empty():
+    assert make_client().map('reboot_vm', []) == []
+
+
+def test_imap_bounded():
+    lock = threading.Lock()
+    running = [0, 0]  # current, max
+
+    def call(item):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return item * 2
+
+    assert sorted(imap_bounded(call, range(20), 3)) == [i * 2 for i in range(20)]
+    assert running[1] <= 3
+
+    started = []
+    results = imap_bounded(started.append, range(20), 2)
+    next(results)
+    results.close()
+    assert len(started) <= 3
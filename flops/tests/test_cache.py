@@ -0,0 +1,147 @@
+from time import sleep
+
+import pytest
+
+from flops import FlopsClient
+from flops.cache import TTLCache, FileCache, SQLiteCache
+from flops.tests.helpers import FakeSession
+
+OK = {'status': 'OK', 'operationId': 1}
+
+
+def make_client(**kwargs):
+    routes = {
+        'tenant': {'status': 'OK', 'result': [{'id': 10}, {'id': 20}]},
+        'vm': {'status': 'OK', 'result': [{'id': 1, 'tenantId': 10}, {'id': 2, 'tenantId': 20}]},
+        'vm/3/': {'status': 'OK', 'result': {'id': 3, 'tenantId': 30}},
+        'vm/install/': {'status': 'OK', 'result': 4, 'operationId': 1},
+    }
+    for vm_id in range(1, 5):
+        routes['vm/{}/reboot/'.format(vm_id)] = OK
+        routes['vm/{}/delete/'.format(vm_id)] = OK
+    fc = FlopsClient('client_id', 'api_key', **kwargs)
+    fc._session = FakeSession(routes)
+    return fc
+
+
+def request_paths(fc):
+    return [path for path, _ in fc._session.calls]
+
+
+def test_ttl_cache_expires():
+    cache = TTLCache(ttl=0.01)
+    cache.set('key', 1)
+    assert cache.get('key') == 1
+    sleep(0.02)
+    assert cache.get('key') is None
+    assert 'key' not in cache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+
+
+def test_ttl_cache_disabled():
+    cache = TTLCache(ttl=0)
+    cache.set('key', 1)
+    assert 'key' not in cache
+
+
+def test_vm_tenant_filled_from_get_vms():
+    fc = make_client()
+    fc.get_vms()
+    fc.reboot_vm(1)
+    fc.reboot_vm(2)
+    assert request_paths(fc) == ['vm', 'vm/1/reboot/', 'vm/2/reboot/']
+    assert fc._session.calls[-1][1]['tenantId'] == 20
+
+
+def test_vm_tenant_resolved_once():
+    fc = make_client()
+    fc.reboot_vm(3)
+    fc.reboot_vm(3)
+    assert request_paths(fc) == ['vm/3/', 'vm/3/reboot/', 'vm/3/reboot/']
+
+
+def test_install_vm_fills_tenant_and_default_tenant_is_memoized():
+    fc = make_client()
+    fc.install_vm(name='vm', distribution_id=1, tariff_id=1)
+    fc.install_vm(name='vm', distribution_id=1, tariff_id=1)
+    fc.reboot_vm(4)
+    assert request_paths(fc) == ['tenant', 'vm/install/', 'vm/install/', 'vm/4/reboot/']
+
+
+def test_delete_vm_evicts_tenant():
+    fc = make_client()
+    fc.reboot_vm(3)
+    fc.delete_vm(3)
+    assert '3' not in fc._vm_tenants
+
+
+def test_tenant_cache_disabled():
+    fc = make_client(tenant_cache_ttl=0)
+    fc.reboot_vm(3)
+    fc.reboot_vm(3)
+    assert request_paths(fc) == ['vm/3/', 'vm/3/reboot/', 'vm/3/', 'vm/3/reboot/']
+
+    fc.install_vm(name='vm', distribution_id=1, tariff_id=1)
+    fc.install_vm(name='vm', distribution_id=1, tariff_id=1)
+    assert request_paths(fc)[4:] == ['tenant', 'vm/install/', 'tenant', 'vm/install/']
+
+
+def test_clear_tenant_cache():
+    fc = make_client()
+    assert fc._get_default_tenant_id() == 10
+    fc._session.routes['tenant'] = {'status': 'OK', 'result': [{'id': 20}]}
+    fc.clear_tenant_cache()
+    assert fc._get_default_tenant_id() == 20
+    assert request_paths(fc) == ['tenant', 'tenant']
+
+
+@pytest.mark.parametrize('cache_class', [FileCache, SQLiteCache])
+def test_persistent_cache(tmp_path, cache_class):
+    path = str(tmp_path / 'cache')
+    if cache_class is SQLiteCache:
+        path += '.sqlite'
+    cache = cache_class(path)
+    cache.set('key', {'result': [1, 2]})
+    cache.set('expired', 1, ttl=-1)
+    assert cache_class(path).get('key') == {'result': [1, 2]}
+    assert cache.get('expired') is None
+
+    cache.delete('key')
+    assert cache.get('key') is None
+
+
+def test_reference_endpoints_are_cached():
+    fc = make_client()
+    fc._session.routes['tariffs'] = {'status': 'OK', 'result': [{'id': 1, 'forWindows': False, 'onDemand': True}]}
+    fc.get_tariffs()
+    fc.get_tariffs(for_windows=False)[0]['id'] = 2
+    assert fc.get_tariffs()[0]['id'] == 1
+    assert request_paths(fc) == ['tariffs']
+
+    fc.invalidate_cache('tariffs')
+    fc.get_tariffs()
+    assert request_paths(fc) == ['tariffs', 'tariffs']
+
+
+def test_reference_cache_is_shared_between_clients(tmp_path):
+    cache = FileCache(str(tmp_path))
+    fc = make_client(cache=cache)
+    fc.get_tenants()
+    fc = make_client(cache=cache)
+    fc.get_tenants()
+    assert request_paths(fc) == []
+
+
+def test_reference_cache_disabled():
+    fc = make_client(cache_ttls={})
+    fc.get_tenants()
+    fc.get_tenants()
+    assert request_paths(fc) == ['tenant', 'tenant']
@@ -0,0 +1,45 @@
+import pytest
+
+from flops.catalog import TariffCatalog
+from flops.exceptions import NotFoundError
+from flops.helpers import transform_dict_keys_to_underscore
+from flops.models import Tariff
+from flops.stub import TARIFFS, StubServer
+
+TARIFF_LIST = transform_dict_keys_to_underscore(TARIFFS)
+
+
+def ids(tariffs):
+    return [t['id'] for t in tariffs]
+
+
+def test_query():
+    catalog = TariffCatalog(TARIFF_LIST)
+
+    assert catalog.smallest(for_windows=False, on_demand=False, min_memory=4096, min_cpu=2)['id'] == 5
+    assert catalog.smallest(for_windows=True, min_memory=4096)['id'] == 8
+    assert catalog.smallest(min_memory=100000) is None
+    assert ids(catalog.query(on_demand=False, max_price=1000, order_by='memory')) == [2, 3, 4, 7]
+    assert ids(catalog.query(for_windows=False, min_cpu=2, max_cpu=4, order_by='cpu')) == [4, 5]
+    assert ids(catalog.query(min_price=290, max_price=590)) == [3, 4]
+    assert ids(catalog.query(order_by='price', limit=3)) == [1, 2, 3]
+    assert catalog.get(7)['name'] == 'Windows M'
+    with pytest.raises(NotFoundError):
+        catalog.get(100)
+    with pytest.raises(TypeError):
+        catalog.query(min_ram=1)
+
+
+def test_query_matches_scan():
+    catalog = TariffCatalog(Tariff.from_list(TARIFF_LIST))
+    for min_memory in (None, 512, 1000, 2048, 8192):
+        for max_price in (None, 0, 590, 2000):
+            expected = sorted((t for t in TARIFF_LIST if (min_memory is None or t['memory'] >= min_memory) and
+                               (max_price is None or t['price'] <= max_price)), key=lambda t: (t['disk'], t['id']))
+            assert ids(catalog.query(min_memory=min_memory, max_price=max_price, order_by='disk')) == ids(expected)
+
+
+def test_client_tariff_catalog():
+    with StubServer() as server:
+        fc = server.client()
+        assert len(fc.tariff_catalog()) == len(TARIFFS)
@@ -4,10 +4,10 @@ from flops import FlopsClient
 from flops.exceptions import AuthError, NotFoundError, ApiError
 
 
-def test_auth():
+def test_auth(flops_client):
     client_id = '123'
     api_key = '123'
-    fc = FlopsClient(client_id, api_key)
+    fc = FlopsClient(client_id, api_key, endpoint=flops_client.endpoint)
 
     with pytest.raises(AuthError):
         fc.get_tenants()
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from flops.client import FlopsClient
+from flops.decoders import OrjsonDecoder, StdlibDecoder, UnderscoreDecoder, default_decoder, orjson
+from flops.helpers import transform_dict_keys_to_underscore
+from flops.tests.helpers import FakeResponse
+
+PAYLOAD = {
+    'status': 'OK',
+    'result': [
+        {'id': 1, 'name': 'вм-1', 'ipAddresses': ['10.0.0.1'], 'backupPolicy': {'maxCount': 3, 'frequency': 1}},
+        {'id': 2, 'name': 'vm-2', 'ipAddresses': [], 'backupPolicy': None},
+    ],
+}
+
+DECODERS = [StdlibDecoder, UnderscoreDecoder]
+if orjson is not None:
+    DECODERS.append(OrjsonDecoder)
+
+
+@pytest.mark.parametrize('decoder_class', DECODERS)
+def test_decoders(decoder_class):
+    decoder = decoder_class()
+    data = decoder.decode(json.dumps(PAYLOAD, ensure_ascii=False).encode('utf-8'))
+    if not decoder.transforms_keys:
+        data = transform_dict_keys_to_underscore(data)
+    assert data == transform_dict_keys_to_underscore(PAYLOAD)
+
+
+@pytest.mark.parametrize('decoder_class', DECODERS)
+def test_process_response(decoder_class):
+    fc = FlopsClient('client_id', 'api_key', json_decoder=decoder_class())
+    data = fc._process_response(FakeResponse(PAYLOAD))
+    assert data['result'][0]['backup_policy']['max_count'] == 3
+
+
+def test_default_decoder():
+    assert isinstance(default_decoder(), UnderscoreDecoder)
+    assert isinstance(default_decoder(transform_keys=False), OrjsonDecoder if orjson is not None else StdlibDecoder)
+    assert FlopsClient().json_decoder.name == default_decoder().name
@@ -1,10 +1,15 @@
 import pytest
 
-from flops.helpers import transform_dict_keys_to_underscore, transform_dict_keys_to_camelcase, order_list_by_dict_key
+from flops import helpers
+from flops.helpers import (
+    transform_dict_keys_to_underscore, transform_dict_keys_to_camelcase, order_list_by_dict_key, filter_by_name,
+)
 
 test_data = [
     [{'clientId': 123, 'client': 321}, {'client_id': 123, 'client': 321}],
     [{'testKey': [{'clientId': 123, 'client': 321}]}, {'test_key': [{'client_id': 123, 'client': 321}]}],
+    [{'testKey': [{'clientId': 1}, {'clientId': 2, 'ipCount': [{'ipAddr': 3}]}, {'clientId': 3}, 4, [5]]},
+     {'test_key': [{'client_id': 1}, {'client_id': 2, 'ip_count': [{'ip_addr': 3}]}, {'client_id': 3}, 4, [5]]}],
 ]
 
 
@@ -23,3 +28,21 @@ def test_transform_dict_keys_to_camelcase(in_dict, out_dict):
 ])
 def test_order_list_by_dict_key(unsorted_list, sorted_list):
     assert sorted_list == order_list_by_dict_key(unsorted_list, key='k', descending=False)
+
+
+def test_transform_dict_keys_to_underscore_list():
+    assert transform_dict_keys_to_underscore([{'vmId': 1}, {'vmId': 2}]) == [{'vm_id': 1}, {'vm_id': 2}]
+
+
+def test_key_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(helpers, '_underscore_keys', {})
+    monkeypatch.setattr(helpers, 'KEY_CACHE_SIZE', 1)
+    assert helpers.camelcase_to_underscore('vmId') == 'vm_id'
+    assert helpers.camelcase_to_underscore('tenantId') == 'tenant_id'
+    assert helpers._underscore_keys == {'vmId': 'vm_id'}
+
+
+def test_filter_by_name():
+    data = [{'name': 'ab'}, {'name': 'a'}, {'name': 'b'}]
+    assert filter_by_name(data, 'a') == [{'name': 'a'}]
+    assert filter_by_name(data, 'a', match_type='startswith') == [{'name': 'ab'}, {'name': 'a'}]
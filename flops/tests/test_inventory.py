@@ -0,0 +1,58 @@
+import pytest
+
+from flops import FlopsClient
+from flops.exceptions import NotFoundError
+from flops.tests.helpers import FakeSession
+
+VMS = [
+    {'id': 1, 'name': 'web-2', 'tenantId': 10, 'ipAddresses': ['1.1.1.1', '1.1.1.2']},
+    {'id': 2, 'name': 'db', 'tenantId': 20, 'ipAddresses': ['2.2.2.2']},
+    {'id': 3, 'name': 'web-1', 'tenantId': 10, 'ipAddresses': []},
+    {'id': 4, 'name': 'web', 'tenantId': 10, 'ipAddresses': ['4.4.4.4']},
+]
+PUBKEYS = [{'id': 7, 'name': 'alice', 'publicKey': 'ssh-rsa A'}, {'id': 8, 'name': 'al', 'publicKey': 'ssh-rsa B'}]
+
+
+@pytest.fixture
+def flops_client():
+    fc = FlopsClient('client_id', 'api_key')
+    fc._session = FakeSession({
+        'vm': {'status': 'OK', 'result': VMS},
+        'pubkeys': {'status': 'OK', 'result': PUBKEYS},
+    })
+    return fc
+
+
+def ids(records):
+    return [r['id'] for r in records]
+
+
+def test_inventory_lookups(flops_client):
+    inventory = flops_client.inventory()
+
+    assert inventory.get_vm(2)['name'] == 'db'
+    assert ids(inventory.get_vms_by_name('web')) == [4]
+    assert ids(inventory.get_vms_by_name('web', match_type='startswith')) == [1, 3, 4]
+    assert inventory.get_vms_by_name('we', match_type='startswith') == flops_client.get_vms_by_name(
+        'we', match_type='startswith')
+    assert ids(inventory.get_vms_by_tenant(10)) == [1, 3, 4]
+    assert inventory.get_vm_by_ip('1.1.1.2')['id'] == 1
+    assert inventory.get_pubkey(8)['name'] == 'al'
+    assert ids(inventory.get_pubkeys_by_name('al', match_type='startswith')) == [7, 8]
+    assert inventory.get_vms_by_name('') is None
+
+    with pytest.raises(NotFoundError):
+        inventory.get_vm(5)
+    with pytest.raises(NotFoundError):
+        inventory.get_vm_by_ip('5.5.5.5')
+
+
+def test_inventory_does_not_request_on_lookup(flops_client):
+    inventory = flops_client.inventory()
+    for _ in range(100):
+        inventory.get_vms_by_name('web', match_type='startswith')
+    assert len(flops_client._session.calls) == 2
+
+    flops_client._session.routes['vm'] = {'status': 'OK', 'result': VMS[:1]}
+    inventory.refresh()
+    assert len(inventory.vms) == 1
@@ -0,0 +1,51 @@
+from flops.keys import ADD, DELETE, EDIT, KeyChange, KeyRegistry, fingerprint, plan_pubkey_sync
+from flops.stub import StubServer
+
+ED25519 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIFXbbVA6BhXQiZvl0SYxRnq0k6z3jcKpN7mAVxOVwdV8 alice@host'
+
+
+def key(name, body):
+    return {'name': name, 'public_key': 'ssh-rsa {} {}@host'.format(body, name)}
+
+
+def test_fingerprint():
+    assert fingerprint(ED25519) == fingerprint(ED25519.rsplit(' ', 1)[0] + ' other comment')
+    assert fingerprint(ED25519).startswith('SHA256:') and '=' not in fingerprint(ED25519)
+    assert fingerprint('ssh-rsa not-base64!') == fingerprint('ssh-rsa not-base64! comment')
+    assert fingerprint('ssh-rsa AAAA') != fingerprint('ssh-rsa BBBB')
+
+
+def test_plan_pubkey_sync():
+    registry = KeyRegistry([
+        dict(key('alice', 'AAAA'), id=1),
+        dict(key('bob', 'BBBB'), id=2),
+        dict(key('carol', 'CCCC'), id=3),
+        dict(key('dave', 'DDDD'), id=4),
+        dict(key('dave-copy', 'DDDD'), id=5),
+    ])
+    desired = [key('alice', 'AAAA'), key('robert', 'BBBB'), key('carol', 'CCC1'), key('dave', 'DDDD'),
+               key('erin', 'EEEE')]
+
+    assert plan_pubkey_sync(registry, desired) == [
+        KeyChange(EDIT, 2, 'robert', None),
+        KeyChange(EDIT, 3, None, desired[2]['public_key']),
+        KeyChange(ADD, None, 'erin', desired[4]['public_key']),
+        KeyChange(DELETE, 5, 'dave-copy', None),
+    ]
+    assert [c.action for c in plan_pubkey_sync(registry, desired, delete=False)] == [EDIT, EDIT, ADD]
+    assert registry.find_by_public_key(desired[3]['public_key'])[0]['id'] == 4
+
+
+def test_sync_pubkeys():
+    with StubServer() as server:
+        fc = server.client()
+        for name, body in [('alice', 'AAAA'), ('bob', 'BBBB'), ('old', 'OOOO')]:
+            fc.add_pubkey(**key(name, body))
+        desired = [key('alice', 'AAAA'), key('bob', 'BBB1'), key('erin', 'EEEE')]
+
+        results = fc.sync_pubkeys(desired, concurrency=4)
+
+        assert all(r.ok for r in results) and len(results) == 3
+        assert sorted((k['name'], k['public_key']) for k in fc.get_pubkeys()) == sorted(
+            (k['name'], k['public_key']) for k in desired)
+        assert fc.sync_pubkeys(desired) == []
@@ -0,0 +1,53 @@
+import pytest
+
+from flops.exceptions import NotFoundError
+from flops.metrics import MetricsCollector, EndpointStats, RequestInfo, TENANT_LOOKUP
+
+
+def test_hooks(stub_server):
+    fc = stub_server.client()
+    events = []
+    fc.add_hook('on_request', lambda info: events.append(('request', info.endpoint)))
+    fc.add_hook('on_response', lambda info: events.append(('response', info.endpoint, info.status_code)))
+    fc.add_hook('on_error', lambda info: events.append(('error', info.endpoint, type(info.error))))
+
+    fc.get_vms()
+    with pytest.raises(NotFoundError):
+        fc.get_vm(100)
+    assert events == [('request', 'vm'), ('response', 'vm', 200),
+                      ('request', 'vm/{id}/'), ('error', 'vm/{id}/', NotFoundError)]
+
+
+def test_metrics_collector(stub_server):
+    vm = stub_server.add_vm('vm1')
+    fc = stub_server.client()
+    metrics = MetricsCollector().install(fc)
+
+    fc.reboot_vm(vm['id'])
+    fc.reboot_vm(vm['id'])
+    fc.get_vm(vm['id'])
+    with pytest.raises(NotFoundError):
+        fc.reboot_vm(100)
+
+    report = {(s['endpoint'], s['purpose']): s for s in metrics.report()}
+    assert report[('vm/{id}/reboot/', None)]['count'] == 2
+    assert report[('vm/{id}/', TENANT_LOOKUP)]['count'] == 2
+    assert report[('vm/{id}/', TENANT_LOOKUP)]['errors'] == 1
+    assert report[('vm/{id}/', None)]['count'] == 1
+    assert report[('vm/{id}/', None)]['bytes'] > 0
+    assert report[('vm/{id}/', None)]['decode_time'] > 0
+
+    metrics.uninstall(fc)
+    fc.get_vms()
+    assert ('vm', None) not in {(s['endpoint'], s['purpose']) for s in metrics.report()}
+
+
+def test_endpoint_stats_quantile():
+    stats = EndpointStats('vm', buckets=(0.01, 0.1, 1, float('inf')))
+    for elapsed in (0.005, 0.005, 0.05, 0.5):
+        info = RequestInfo('vm', 'vm')
+        info.elapsed = elapsed
+        stats.add(info)
+    assert stats.histogram == [2, 1, 1, 0]
+    assert stats.quantile(0.5) == 0.01
+    assert stats.quantile(1) == 0.5
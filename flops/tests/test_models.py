@@ -0,0 +1,61 @@
+import tracemalloc
+
+from flops.helpers import transform_dict_keys_to_underscore
+from flops.models import BackupPolicy, Tariff, VMRecord
+from flops.stub import StubServer
+from flops.tests.payloads import make_vms_response
+
+
+def vms(count):
+    return transform_dict_keys_to_underscore(make_vms_response(count))['result']
+
+
+def test_record_round_trip():
+    data = vms(3)
+    data[1]['new_field'] = 1
+    del data[2]['software_ids']
+
+    records = VMRecord.from_list(data)
+    assert records[0].to_dict() == data[0]
+    assert records[1].to_dict() == data[1]
+    assert records[1]['new_field'] == 1 and 'new_field' in records[1]
+    assert records[2].software_ids is None
+    assert records[2].to_dict() == data[2]
+    assert records[0].backup_policy == BackupPolicy(quantity=2, frequency=24)
+    assert records[0].distribution.name == 'Debian 9'
+    assert records[0]['tenant_id'] == data[0]['tenant_id'] and records[0].get('missing', 1) == 1
+
+
+def test_plan_is_shared_per_key_tuple():
+    VMRecord.from_list(vms(100))
+    assert len(VMRecord._plans) >= 1
+    assert VMRecord._plan(tuple(vms(1)[0])) is VMRecord._plan(tuple(vms(1)[0]))
+    assert Tariff._plans is not VMRecord._plans
+
+
+def test_records_use_less_memory():
+    def allocated(factory):
+        tracemalloc.start()
+        data = factory()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del data
+        return size
+
+    payload = make_vms_response(2000)
+    dict_size = allocated(lambda: transform_dict_keys_to_underscore(payload)['result'])
+    record_size = allocated(lambda: VMRecord.from_list(transform_dict_keys_to_underscore(payload)['result']))
+    assert record_size < dict_size
+
+
+def test_client_as_records():
+    with StubServer() as server:
+        fc = server.client()
+        vm = server.add_vm('vm1')
+        fc.create_vm_snapshot(vm['id'], 'snap')
+
+        assert fc.get_vm(vm['id'], as_records=True) == fc.get_vm(vm['id'])
+        assert isinstance(fc.get_vms(as_records=True)[0], VMRecord)
+        assert [t.id for t in fc.get_tariffs(for_windows=True, order_by='price', as_records=True)] == [7, 8]
+        assert fc.get_distributions(as_records=True)[0].for_windows is False
+        assert fc.get_vm_snapshots(vm['id'], as_records=True)[0].name == 'snap'
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import as_completed
+
+import pytest
+
+from flops import FlopsClient, AsyncFlopsClient
+from flops.exceptions import OperationTimeoutError, NotFoundError
+from flops.operations import OperationScheduler, Operation
+from flops.tests.helpers import FakeAsyncPool, FakeSession
+
+INTERVALS = {'VM_INSTALL': (0.02, 0.05)}
+DEFAULT_INTERVAL = (0.01, 0.02)
+
+
+def operation_routes(polls_to_finish, operation_type='VM_REBOOT'):
+    polls = Counter()
+
+    def route(operation_id):
+        def status(params):
+            polls[operation_id] += 1
+            done = polls[operation_id] >= polls_to_finish[operation_id]
+            return {'status': 'OK', 'result': {'id': operation_id, 'operationType': operation_type,
+                                               'status': 'DONE' if done else 'IN_PROGRESS'}}
+        return status
+
+    return {'operation/{}/'.format(i): route(i) for i in polls_to_finish}, polls
+
+
+def make_client(routes, client_class=FlopsClient, **kwargs):
+    client = client_class('client_id', 'api_key', **kwargs)
+    if client_class is AsyncFlopsClient:
+        client._pool = FakeAsyncPool(routes)
+    else:
+        client._session = FakeSession(routes)
+    return client
+
+
+def test_scheduler_backoff():
+    scheduler = OperationScheduler([1], intervals=INTERVALS, backoff_factor=2)
+    delays = []
+    for _ in range(4):
+        scheduler.pop()
+        scheduler.report(1, {'status': 'IN_PROGRESS', 'operation_type': 'VM_INSTALL'})
+        delays.append(round(scheduler._delays[1], 2))
+    assert delays == [0.02, 0.04, 0.05, 0.05]
+    assert scheduler.polls == 4
+
+
+def test_scheduler_follows_percentage():
+    scheduler = OperationScheduler([1], intervals={'VM_INSTALL': (0.5, 30)})
+    scheduler._started_at[1] -= 10
+    scheduler.pop()
+    scheduler.report(1, {'status': 'IN_PROGRESS', 'operation_type': 'VM_INSTALL', 'percentage': 50})
+    assert 4.9 < scheduler._delays[1] < 5.1
+
+
+def test_wait_for_operations_yields_in_completion_order():
+    routes, polls = operation_routes({1: 5, 2: 1, 3: 3})
+    fc = make_client(routes)
+
+    res = fc.wait_for_operations([1, 2, 3], default_interval=DEFAULT_INTERVAL)
+    assert [status['id'] for status in res] == [2, 3, 1]
+    assert sum(polls.values()) == 9
+
+
+def test_wait_for_operations_timeout():
+    routes, _ = operation_routes({1: 1, 2: 1000})
+    fc = make_client(routes)
+
+    done = []
+    with pytest.raises(OperationTimeoutError):
+        for status in fc.wait_for_operations([1, 2], timeout=0.1, default_interval=DEFAULT_INTERVAL):
+            done.append(status['id'])
+    assert done == [1]
+
+
+def test_async_wait_for_operations():
+    routes, _ = operation_routes({1: 3, 2: 1})
+    client = make_client(routes, client_class=AsyncFlopsClient)
+
+    async def main():
+        return [status['id'] async for status in client.wait_for_operations([1, 2], default_interval=DEFAULT_INTERVAL)]
+
+    assert asyncio.run(main()) == [2, 1]
+    client.close()
+
+
+def make_handles_client(polls_to_finish):
+    routes, polls = operation_routes(polls_to_finish)
+    routes['vm'] = {'status': 'OK', 'result': [{'id': i, 'tenantId': 10} for i in polls_to_finish]}
+    for i in polls_to_finish:
+        routes['vm/{}/reboot/'.format(i)] = {'status': 'OK', 'operationId': i}
+    fc = make_client(routes, operation_handles=True, default_polling_interval=DEFAULT_INTERVAL)
+    fc.get_vms()
+    return fc
+
+
+def test_operation_handles():
+    fc = make_handles_client({1: 3, 2: 1})
+    first, second = fc.reboot_vm(1), fc.reboot_vm(2)
+    assert isinstance(first, Operation)
+    assert first['operation_id'] == 1
+
+    callback_results = []
+    first.add_done_callback(lambda op: callback_results.append(op.result()['id']))
+    assert [op.result(timeout=5)['id'] for op in as_completed([first, second], timeout=5)] == [2, 1]
+    assert first.done() and not first.cancel()
+    assert callback_results == [1]
+
+
+def test_operation_handles_share_one_thread():
+    fc = make_handles_client({i: 2 for i in range(1, 31)})
+    threads_before = threading.active_count()
+    operations = [fc.reboot_vm(i) for i in range(1, 31)]
+    assert threading.active_count() <= threads_before + 1
+    assert all(op.result(timeout=5)['status'] == 'DONE' for op in operations)
+
+
+def test_operation_handle_error():
+    fc = make_handles_client({1: 1})
+    fc._session.routes['operation/1/'] = {'status': 'ERROR', 'errorCode': 'error.object.not.found', 'errorMessage': ''}
+    with pytest.raises(NotFoundError):
+        fc.reboot_vm(1).result(timeout=5)
+
+
+def test_operation_of_response():
+    fc = make_handles_client({1: 2})
+    fc.operation_handles = False
+    response = fc.reboot_vm(1)
+    assert not isinstance(response, Operation)
+
+    operation = fc.operation(response)
+    assert fc.operation(operation) is operation
+    assert operation.result(timeout=5)['status'] == 'DONE'
+
+
+def test_batch_waits_for_handles():
+    fc = make_handles_client({1: 2, 2: 1})
+    results = fc.batch([1, 2], wait=True, timeout=5).reboot_vm()
+    assert [r.operation['id'] for r in results] == [1, 2]
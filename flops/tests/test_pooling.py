@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+import requests
+
+from flops.stub import StubServer
+
+
+def pool(fc):
+    return fc._session.get_adapter(fc.endpoint).poolmanager.connection_from_url(fc.endpoint)
+
+
+def test_concurrent_requests_reuse_pooled_connections():
+    with StubServer(latency=0.02) as server:
+        vm_ids = [server.add_vm('vm-{}'.format(i))['id'] for i in range(64)]
+        with server.client(pool_maxsize=8) as fc:
+            fc.get_vms()
+            for _ in range(3):
+                results = fc.map(fc.get_vm, vm_ids, concurrency=8)
+                assert all(r.ok for r in results)
+            assert pool(fc).num_connections <= 8
+            assert server.connection_count <= 8
+
+
+def test_thread_sessions_are_released():
+    with StubServer() as server:
+        vm_ids = [server.add_vm('vm-{}'.format(i))['id'] for i in range(8)]
+        with server.client(per_thread_session=True) as fc:
+            for _ in range(5):
+                assert all(r.ok for r in fc.map(fc.get_vm, vm_ids, concurrency=4))
+                assert len(fc._thread_sessions) <= 4
+            assert server.connection_count <= 4 * 5 + 1
+
+
+def test_read_timeout():
+    with StubServer(latency=0.5) as server:
+        fc = server.client(timeout=(1, 0.05), retry_policy=None)
+        with pytest.raises(requests.Timeout):
+            fc.get_tenants()
+        fc.close()
+
+
+def test_per_thread_session():
+    with StubServer() as server:
+        fc = server.client(per_thread_session=True)
+        sessions = []
+
+        def call():
+            fc.get_vms()
+            sessions.append(fc._get_session())
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(map(id, sessions))) == 4
+        assert len(fc._thread_sessions) == 4
+        fc.close()
+        assert len(fc._thread_sessions) == 0
@@ -0,0 +1,112 @@
+import socket
+import threading
+from time import monotonic, sleep
+
+import pytest
+
+from flops.exceptions import OperationTimeoutError, ProvisionError, ReadinessTimeoutError, ValidationError
+from flops.provision import make_specs
+from flops.stub import StubServer
+
+TEMPLATE = {'name': 'web-{}', 'tariff_id': 'M', 'distribution_id': 'Ubuntu 16.04 64 bit'}
+
+
+@pytest.fixture
+def listener():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(64)
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+def test_provision_many(listener, fast_client):
+    with StubServer(operation_duration=0.2) as server:
+        fc = fast_client(server)
+        results = list(fc.provision_many(TEMPLATE, 5, concurrency=2, port=listener,
+                                         address=lambda vm: '127.0.0.1'))
+
+        assert all(r.ok for r in results)
+        assert sorted(r.vm['name'] for r in results) == ['web-{}'.format(i) for i in range(1, 6)]
+        assert {(r.vm['tariff_id'], r.vm['distribution']['id']) for r in results} == {(3, 4)}
+        assert server.request_counts['tariffs'] == 1 and server.request_counts['tenant'] == 1
+
+
+def test_provision_many_validates_all_specs_first(fast_client):
+    with StubServer() as server:
+        fc = fast_client(server)
+        with pytest.raises(ValidationError):
+            fc.provision_many(dict(TEMPLATE, tariff_id=1, memory=100), 3)
+        assert server.request_counts['vm/install'] == 0
+
+
+def test_make_specs_resolves_only_names():
+    with StubServer() as server:
+        specs = make_specs(server.client(), dict(TEMPLATE, tariff_id=3, distribution_id='4'), 2)
+        assert [(spec['name'], spec['tariff_id'], spec['distribution_id']) for spec in specs] == [
+            ('web-1', 3, '4'), ('web-2', 3, '4')]
+        assert server.request_counts['tariffs'] == server.request_counts['distribution'] == 0
+
+
+def test_provision_many_readiness_timeout(fast_client):
+    with StubServer() as server:
+        fc = fast_client(server)
+        result, = fc.provision_many(TEMPLATE, 1, port=1, address=lambda vm: '127.0.0.1', ready_timeout=0.1)
+        assert isinstance(result.exception, ReadinessTimeoutError)
+
+
+def test_provision_many_cleanup(fast_client):
+    with StubServer(max_vms=3, operation_duration=0.1) as server:
+        fc = fast_client(server)
+        results = []
+        with pytest.raises(ProvisionError) as e:
+            for result in fc.provision_many(TEMPLATE, 5, concurrency=1, port=None, cleanup=True):
+                results.append(result)
+
+        assert len(results) == 5 and len(e.value.failures) == 2
+        assert e.value.cleanup_failures == []
+        assert fc.get_vms() == []
+
+
+def test_provision_many_timeout_cleanup(fast_client):
+    with StubServer(operation_duration=0.3) as server:
+        fc = fast_client(server)
+        with pytest.raises(OperationTimeoutError) as e:
+            list(fc.provision_many(TEMPLATE, 6, concurrency=2, port=None, cleanup=True, timeout=0.1))
+
+        assert e.value.cleanup_failures == []
+        assert fc.get_vms() == []
+        assert server.request_counts['vm/install'] == 2
+
+
+def test_provision_many_close_cleanup(fast_client):
+    with StubServer(operation_duration=0.1) as server:
+        fc = fast_client(server)
+        results = fc.provision_many(TEMPLATE, 8, concurrency=2, port=None, cleanup=True)
+        assert next(results).ok
+        results.close()
+
+        assert server.request_counts['vm/install'] <= 3
+        assert fc.get_vms() == []
+
+
+def test_provision_many_timeout_stops_readiness_checks(fast_client):
+    with StubServer() as server:
+        fc = fast_client(server)
+        with pytest.raises(OperationTimeoutError):
+            list(fc.provision_many(TEMPLATE, 2, port=1, address=lambda vm: '127.0.0.1', timeout=0.3))
+
+        sleep(0.2)
+        assert not [t for t in threading.enumerate() if t.name.startswith('flops-provision-ready')]
+
+
+def test_provision_many_cleanup_timeout(fast_client):
+    with StubServer(operation_duration=30) as server:
+        fc = fast_client(server)
+        started_at = monotonic()
+        with pytest.raises(OperationTimeoutError) as e:
+            list(fc.provision_many(TEMPLATE, 4, concurrency=2, port=None, cleanup=True, timeout=0.1,
+                                   cleanup_timeout=0.2))
+
+        assert monotonic() - started_at < 5
+        assert len(e.value.cleanup_failures) == 2  # the VMs still being installed can not be deleted
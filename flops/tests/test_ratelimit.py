@@ -0,0 +1,72 @@
+import threading
+from time import monotonic, sleep
+
+import pytest
+
+from flops.exceptions import ApiLimitError
+from flops.ratelimit import TokenBucket, AdaptiveBucket, RateLimiter
+from flops.stub import StubServer
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=100, burst=1)
+    started_at = monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    assert monotonic() - started_at >= 0.09
+
+
+def test_token_bucket_is_shared_between_threads():
+    bucket = TokenBucket(rate=200, burst=1)
+    started_at = monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert monotonic() - started_at >= 0.09
+
+
+def test_adaptive_bucket():
+    bucket = AdaptiveBucket(rate=10, recovery=0.1, min_rate=2, cooldown=0)
+    bucket.on_limit()
+    assert bucket.rate == 5
+    bucket.on_limit()
+    bucket.on_limit()
+    assert bucket.rate == 2
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+
+def test_adaptive_bucket_decreases_once_per_cooldown():
+    bucket = AdaptiveBucket(rate=10, cooldown=0.05)
+    for _ in range(8):  # a burst of concurrent requests throttled together
+        bucket.on_limit()
+    assert bucket.rate == 5 and bucket.tokens <= 0
+    sleep(0.06)
+    bucket.on_limit()
+    assert bucket.rate == 2.5
+
+
+def test_rate_limiter_endpoint_budget():
+    limiter = RateLimiter(rate=1000, endpoint_rates={'vm/install/': 1})
+    assert limiter.acquire('vm/install/') == 0
+    assert limiter.acquire('vm') == 0
+    assert limiter.acquire('vm/install/') > 0.5
+
+
+def test_client_rate_limiter_reacts_to_limit_errors():
+    limiter = RateLimiter(rate=1000, endpoint_rates={'vm/{id}/reboot/': 100})
+    with StubServer() as server:
+        vm = server.add_vm('vm1')
+        fc = server.client(rate_limiter=limiter)
+        fc.get_vm(vm['id'])
+        server.inject_error('vm/{id}/reboot/', status_code=429)
+        with pytest.raises(ApiLimitError):
+            fc.reboot_vm(vm['id'])
+
+        assert limiter.bucket.rate == 500
+        assert limiter.endpoint_buckets['vm/{id}/reboot/'].rate == 50
+        fc.reboot_vm(vm['id'])
+        assert limiter.endpoint_buckets['vm/{id}/reboot/'].rate == 51
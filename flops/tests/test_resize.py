@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from flops.exceptions import ValidationError
+from flops.resize import DONE, FAILED, plan_resize
+
+VM = {'memory': 1024, 'disk': 20480, 'cpu': 1, 'state': 'VIR_DOMAIN_RUNNING'}
+
+
+def test_plan_resize():
+    assert plan_resize(VM, {'memory': 1024}) == []
+    assert plan_resize(VM, {'cpu': 2}) == [('change_vm_cpu', {'cpu': 2})]
+    assert plan_resize(VM, {'memory': 2048}) == [('change_vm_memory', {'memory': 2048, 'allow_restart': True})]
+    assert plan_resize(VM, {'memory': 2048, 'disk': 40960, 'cpu': 2}) == [
+        ('shutdown_vm', {}),
+        ('change_vm_memory', {'memory': 2048, 'allow_restart': False}),
+        ('change_vm_disk', {'disk': 40960, 'allow_restart': False}),
+        ('change_vm_cpu', {'cpu': 2}),
+        ('start_vm', {}),
+    ]
+    assert [method for method, _ in plan_resize(VM, {'memory': 512, 'disk': 30720})] == [
+        'shutdown_vm', 'change_vm_disk', 'change_vm_memory', 'start_vm']
+    assert [method for method, _ in plan_resize(VM, {'memory': 512, 'cpu': 2}, consolidate_restarts=False)] == [
+        'change_vm_memory', 'change_vm_cpu']
+
+    stopped = dict(VM, state='VIR_DOMAIN_SHUTOFF')
+    assert plan_resize(stopped, {'cpu': 2}) == [('change_vm_cpu', {'cpu': 2})]
+    assert plan_resize(stopped, {'cpu': 1}, was_running=True) == [('start_vm', {})]
+
+
+def test_rolling_resize(operation_server, fast_client, tmp_path):
+    fc = fast_client(operation_server)
+    vm_ids = [operation_server.add_vm('vm{}'.format(i), tariff_id=1, memory=1024, disk=20480, cpu=1)['id']
+              for i in range(6)]
+    checkpoint = str(tmp_path / 'resize.json')
+
+    results = list(fc.rolling_resize(vm_ids, {'memory': 2048, 'disk': 40960, 'cpu': 2}, max_unavailable=3,
+                                     checkpoint=checkpoint))
+
+    assert sorted(r.vm_id for r in results) == vm_ids and all(r.ok for r in results)
+    for vm in fc.get_vms():
+        assert (vm['memory'], vm['disk'], vm['cpu'], vm['state']) == (2048, 40960, 2, 'VIR_DOMAIN_RUNNING')
+    assert operation_server.request_counts['vm/{id}/shutdown'] == 6
+    with open(checkpoint) as f:
+        assert {state['status'] for state in json.load(f)['vms'].values()} == {DONE}
+    assert list(fc.rolling_resize(vm_ids, {'memory': 4096}, checkpoint=checkpoint)) == []
+
+
+def test_rolling_resize_resumes_and_reports_failures(operation_server, fast_client, tmp_path):
+    fc = fast_client(operation_server)
+    vm_ids = [operation_server.add_vm('vm{}'.format(i), tariff_id=1, memory=1024, cpu=1)['id'] for i in range(3)]
+    checkpoint = tmp_path / 'resize.json'
+    checkpoint.write_text(json.dumps({'vms': {str(vm_ids[0]): {'status': DONE}}}))
+    operation_server.inject_error('vm/{id}/cpu_change/', 'error.operation.already.started')
+
+    results = list(fc.rolling_resize(vm_ids, {'cpu': 4}, checkpoint=str(checkpoint)))
+
+    assert sorted(r.vm_id for r in results) == vm_ids[1:]
+    assert len([r for r in results if not r.ok]) == 1
+    assert fc.get_vm(vm_ids[0])['cpu'] == 1
+    assert json.loads(checkpoint.read_text())['vms'][str(results[0].vm_id)]['status'] == FAILED
+
+
+def test_rolling_resize_starts_vm_after_failure(operation_server, fast_client):
+    fc = fast_client(operation_server)
+    vm_id = operation_server.add_vm('vm', tariff_id=1, memory=1024, disk=20480, cpu=1)['id']
+    operation_server.inject_error('vm/{id}/disk_change/', 'error.operation.already.started')
+
+    result, = fc.rolling_resize([vm_id], {'memory': 2048, 'disk': 40960})
+
+    assert not result.ok and not hasattr(result.exception, 'start_exception')
+    assert operation_server.request_counts['vm/{id}/shutdown'] == 1
+    assert fc.get_vm(vm_id)['state'] == 'VIR_DOMAIN_RUNNING'
+
+
+def test_rolling_resize_validates_target(operation_server, fast_client):
+    with pytest.raises(ValidationError):
+        fast_client(operation_server).rolling_resize([1], {'memory': 100})
+
+
+def test_rolling_resize_stops_when_closed(operation_server, fast_client, tmp_path):
+    fc = fast_client(operation_server)
+    vm_ids = [operation_server.add_vm('vm{}'.format(i), tariff_id=1, cpu=1)['id'] for i in range(8)]
+    checkpoint = str(tmp_path / 'resize.json')
+
+    results = fc.rolling_resize(vm_ids, {'cpu': 2}, max_unavailable=1, checkpoint=checkpoint)
+    assert next(results).ok
+    results.close()
+
+    resized = [vm['id'] for vm in fc.get_vms() if vm['cpu'] == 2]
+    assert 1 <= len(resized) <= 2  # the finished VM and at most the one in flight
+    remaining = list(fc.rolling_resize(vm_ids, {'cpu': 2}, max_unavailable=4, checkpoint=checkpoint))
+    assert sorted(r.vm_id for r in remaining) == sorted(set(vm_ids) - set(resized))
+    assert all(vm['cpu'] == 2 for vm in fc.get_vms())
@@ -0,0 +1,56 @@
+import pytest
+import requests
+
+from flops.exceptions import ApiError, ApiLimitError
+from flops.metrics import MetricsCollector
+from flops.retry import RetryPolicy
+
+
+def fast_policy(**kwargs):
+    return RetryPolicy(backoff=0.001, **kwargs)
+
+
+def test_retry_policy():
+    policy = RetryPolicy(max_attempts=3, backoff=1, max_backoff=3)
+    error = ApiError()
+    error.status_code = 503
+
+    assert policy.should_retry('vm/{id}/', error, 1)
+    assert policy.should_retry('tenant', requests.ConnectionError(), 2)
+    assert not policy.should_retry('vm/{id}/', error, 3)
+    assert not policy.should_retry('vm/{id}/reboot/', error, 1)
+    assert not policy.should_retry('vm/{id}/', ApiError('vm.not.found'), 1)
+    assert all(0 <= policy.delay(attempt) <= 3 for attempt in range(1, 10))
+
+
+def test_safe_request_is_retried(stub_server):
+    fc = stub_server.client(retry_policy=fast_policy())
+    metrics = MetricsCollector().install(fc)
+    vm = stub_server.add_vm('vm1')
+    stub_server.inject_error('vm/{id}/', status_code=502, count=2)
+
+    assert fc.get_vm(vm['id'])['name'] == 'vm1'
+    stats, = metrics.report()
+    assert (stats['count'], stats['errors'], stats['retries']) == (3, 2, 2)
+
+
+def test_retries_are_limited(stub_server):
+    fc = stub_server.client(retry_policy=fast_policy(max_attempts=2))
+    stub_server.inject_error('vm', status_code=429, count=None)
+
+    with pytest.raises(ApiLimitError) as e:
+        fc.get_vms()
+    assert e.value.attempts == 2
+    assert e.value.status_code == 429
+    assert stub_server.request_counts['vm'] == 2
+
+
+def test_mutation_is_not_retried(stub_server):
+    fc = stub_server.client(retry_policy=fast_policy())
+    vm = stub_server.add_vm('vm1')
+    stub_server.inject_error('vm/{id}/reboot/', status_code=502)
+
+    with pytest.raises(ApiError) as e:
+        fc.reboot_vm(vm['id'])
+    assert e.value.attempts == 1
+    assert stub_server.request_counts['vm/{id}/reboot'] == 1
@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+import pytest
+
+from flops.exceptions import NotFoundError
+from flops.singleflight import SingleFlight
+from flops.stub import StubServer
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {'result': [1]}
+
+    with ThreadPoolExecutor(4) as executor:
+        leader = executor.submit(flight.do, 'key', func)
+        started.wait()
+        followers = [executor.submit(flight.do, 'key', func) for _ in range(3)]
+        while flight.shared < 3:
+            sleep(0.001)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1 and flight.shared == 3
+    assert all(r == {'result': [1]} for r in results)
+    assert len(set(map(id, results))) == 4
+    assert flight.do('key', lambda: 2) == 2
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do('key', lambda: int('x'))
+    assert flight._calls == {}
+
+
+def test_client_coalesces_safe_requests():
+    with StubServer(latency=0.1) as server:
+        vm = server.add_vm('vm1')
+        fc = server.client()
+        with ThreadPoolExecutor(16) as executor:
+            vms = list(executor.map(lambda _: fc.get_vm(vm['id']), range(16)))
+            list(executor.map(lambda _: fc.reboot_vm(vm['id']), range(4)))
+
+        assert server.request_counts['vm/{id}'] < 16
+        assert fc._single_flight.shared == 16 - server.request_counts['vm/{id}']
+        assert all(v == vms[0] for v in vms) and len(set(map(id, vms))) == 16
+        assert server.request_counts['vm/{id}/reboot'] == 4
+
+
+def test_client_coalescing_can_be_disabled():
+    with StubServer(latency=0.05) as server:
+        fc = server.client(coalesce_endpoints=())
+        with ThreadPoolExecutor(4) as executor:
+            for future in [executor.submit(fc.get_vm, 100) for _ in range(4)]:
+                with pytest.raises(NotFoundError):
+                    future.result()
+        assert server.request_counts['vm/{id}'] == 4
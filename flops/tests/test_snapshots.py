@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from flops.snapshots import RetentionPolicy, SnapshotTree, parse_time
+
+NOW = datetime(2020, 1, 31, tzinfo=timezone.utc)
+
+
+def snapshot(snapshot_id, parent_id, days_ago):
+    time_added = (NOW - timedelta(days=days_ago)).strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+    return {'id': snapshot_id, 'name': 's{}'.format(snapshot_id), 'parent_id': parent_id, 'time_added': time_added}
+
+
+#   1 - 2 - 3 - 4
+#        \
+#         5 - 6
+TREE = SnapshotTree(1, [snapshot(1, None, 30), snapshot(2, 1, 20), snapshot(3, 2, 10), snapshot(4, 3, 1),
+                        snapshot(5, 2, 15), snapshot(6, 5, 5)])
+
+
+def ids(snapshots):
+    return [s['id'] for s in snapshots]
+
+
+def test_parse_time():
+    assert parse_time('2018-06-08T19:52:44.665+0000') == datetime(2018, 6, 8, 19, 52, 44, 665000, timezone.utc)
+
+
+def test_snapshot_tree():
+    assert ids(TREE.roots) == [1]
+    assert ids(TREE.children(2)) == [3, 5] and TREE.parent(5)['id'] == 2 and TREE.parent(1) is None
+    assert ids(TREE.ancestors(6)) == [5, 2, 1]
+    assert ids(TREE.descendants(2)) == [3, 4, 5, 6]
+    assert [(s['id'], depth) for s, depth in TREE.walk()] == [(1, 0), (2, 1), (3, 2), (4, 3), (5, 2), (6, 3)]
+    assert ids(TREE.children_first()) == [6, 5, 4, 3, 2, 1]
+    assert ids(SnapshotTree(1, [snapshot(2, 1, 0)]).roots) == [2]  # the parent was deleted
+
+
+def test_retention_policy():
+    assert RetentionPolicy().expired(TREE, NOW) == []
+    assert ids(RetentionPolicy(keep_last=2).expired(TREE, NOW)) == [5, 3, 2, 1]
+    assert ids(RetentionPolicy(max_age=timedelta(days=12)).expired(TREE, NOW)) == [5, 2, 1]
+    assert ids(RetentionPolicy(keep_last=4, max_age=12 * 86400).expired(TREE, NOW)) == [2, 1]
+    assert ids(RetentionPolicy(keep_last=0).expired(TREE, NOW)) == [6, 5, 4, 3, 2, 1]
+    with pytest.raises(ValueError):
+        RetentionPolicy(keep_last=-1)
+
+
+def make_snapshots(server, fc, vm_id, count):
+    for i in range(count):
+        fc.operation(fc.create_vm_snapshot(vm_id, 'snap{}'.format(i))).result(timeout=5)
+    for days_ago, snapshot in enumerate(sorted(server.state.snapshots[vm_id].values(), key=lambda s: -s['id'])):
+        snapshot['timeAdded'] = (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime(
+            '%Y-%m-%dT%H:%M:%S.000+0000')
+
+
+def test_prune_snapshots(operation_server, fast_client):
+    fc = fast_client(operation_server)
+    vm_ids = [operation_server.add_vm('vm{}'.format(i), tariff_id=1)['id'] for i in range(4)]
+    for vm_id in vm_ids:
+        make_snapshots(operation_server, fc, vm_id, 5)
+
+    dry_run = list(fc.prune_snapshots(vm_ids, keep_last=2, dry_run=True))
+    assert all(len(r.expired) == 3 and r.deleted == [] for r in dry_run)
+    assert operation_server.request_counts['vm/{id}/snapshot_delete'] == 0
+
+    results = list(fc.prune_snapshots(vm_ids, keep_last=2, max_age=timedelta(days=2, hours=12), concurrency=4))
+
+    assert sorted(r.vm_id for r in results) == vm_ids and all(r.ok for r in results)
+    for result in results:
+        assert result.deleted == ids(result.expired) and len(result.deleted) == 2
+        tree = fc.snapshot_tree(result.vm_id)
+        assert sorted(s['name'] for s in tree) == ['snap2', 'snap3', 'snap4']
+        assert [s['name'] for s, _ in tree.walk()] == ['snap2', 'snap3', 'snap4']  # re-parented to the kept chain
+    assert all(r.deleted == [] for r in fc.prune_snapshots(vm_ids, keep_last=2, max_age=timedelta(days=2, hours=12)))
+
+
+def test_prune_snapshots_stops_a_tree_on_failure(operation_server, fast_client):
+    fc = fast_client(operation_server)
+    vm_id = operation_server.add_vm('vm', tariff_id=1)['id']
+    make_snapshots(operation_server, fc, vm_id, 3)
+    operation_server.inject_error('vm/{id}/snapshot_delete/', 'error.operation.already.started')
+
+    result, = fc.prune_snapshots([vm_id], keep_last=1)
+
+    assert not result.ok and result.deleted == [] and len(result.expired) == 2
+    assert len(fc.get_vm_snapshots(vm_id)) == 3
+
+
+def test_prune_snapshots_stops_when_closed(operation_server, fast_client):
+    fc = fast_client(operation_server)
+    vm_ids = [operation_server.add_vm('vm{}'.format(i), tariff_id=1)['id'] for i in range(6)]
+    for vm_id in vm_ids:
+        make_snapshots(operation_server, fc, vm_id, 2)
+
+    results = fc.prune_snapshots(vm_ids, keep_last=1, concurrency=2)
+    assert next(results).ok
+    results.close()
+
+    assert 1 <= operation_server.request_counts['vm/{id}/snapshot_delete'] <= 3
+    assert sum(len(fc.get_vm_snapshots(vm_id)) == 2 for vm_id in vm_ids) >= 3
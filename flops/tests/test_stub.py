@@ -0,0 +1,65 @@
+from time import monotonic
+
+import pytest
+
+from flops.exceptions import ApiError, ApiLimitError, AuthError, OperationError
+from flops.stub import StubServer
+
+
+def test_stub_state(stub_server):
+    fc = stub_server.client()
+    vm = stub_server.add_vm('vm1')
+
+    assert fc.get_vm(vm['id'])['name'] == 'vm1'
+    fc.poweroff_vm(vm['id'])
+    assert fc.get_vm(vm['id'])['state'] == 'VIR_DOMAIN_SHUTOFF'
+    assert stub_server.request_counts['vm/{id}/poweroff'] == 1
+
+
+def test_stub_credentials(stub_server):
+    fc = stub_server.client()
+    fc.api_key = 'wrong'
+    with pytest.raises(AuthError):
+        fc.get_vms()
+
+
+def test_stub_error_injection(stub_server):
+    fc = stub_server.client(retry_policy=None)
+    vm = stub_server.add_vm('vm1')
+    stub_server.inject_error('vm/{id}/reboot/', 'error.operation.already.started')
+    stub_server.inject_error('vm', status_code=502, count=2)
+
+    with pytest.raises(OperationError):
+        fc.reboot_vm(vm['id'])
+    assert fc.reboot_vm(vm['id'])['operation_id']
+
+    for _ in range(2):
+        with pytest.raises(ApiError):
+            fc.get_vms()
+    assert fc.get_vms()
+
+
+def test_stub_vm_limit():
+    with StubServer(max_vms=1) as server:
+        fc = server.client()
+        fc.install_vm(name='vm1', distribution_id=3, tariff_id=2)
+        with pytest.raises(ApiLimitError):
+            fc.install_vm(name='vm2', distribution_id=3, tariff_id=2)
+
+
+def test_stub_operation_duration():
+    with StubServer(operation_duration=0.2) as server:
+        fc = server.client()
+        vm_id = fc.install_vm(name='vm1', distribution_id=3, tariff_id=2)['vm_id']
+        with pytest.raises(OperationError):
+            fc.start_vm(vm_id)
+
+
+def test_stub_latency():
+    with StubServer(latency=0.05, endpoint_latency={'tenant': 0}) as server:
+        fc = server.client(cache_ttls={})
+        started_at = monotonic()
+        fc.get_tenants()
+        assert monotonic() - started_at < 0.05
+        fc.get_vms()
+        assert monotonic() - started_at >= 0.05
@@ -0,0 +1,61 @@
+import pytest
+
+from flops.exceptions import ValidationError
+from flops.tests.payloads import make_install_spec
+from flops.validators import MESSAGES, FlopsValidator
+
+
+def test_validate_create():
+    spec = make_install_spec(1)
+    assert FlopsValidator._validate_create(spec) == {k: v for k, v in spec.items() if v is not None}
+
+    for field, value in [('name', ''), ('tenant_id', 'x'), ('memory', 256), ('disk', 2 ** 20), ('cpu', 13),
+                         ('public_key_ids', 1), ('tariff_id', 1.5)]:
+        with pytest.raises(ValidationError) as e:
+            FlopsValidator._validate_create(dict(spec, **{field: value}))
+        assert str(e.value) == MESSAGES[field]
+
+    with pytest.raises(ValidationError) as e:
+        FlopsValidator._validate_create(dict(spec, memory=512, disk=40960))
+    assert str(e.value) == MESSAGES['disk_memory_ratio']
+
+
+def test_validate_reinstall():
+    assert FlopsValidator._validate_reinstall(1, {'cpu': 2, 'memory': None, 'public_key_ids': [],
+                                                  'software_ids': []}) == {'cpu': 2, 'public_key_ids': [],
+                                                                           'software_ids': []}
+    with pytest.raises(ValidationError):
+        FlopsValidator._validate_reinstall('vm', {'public_key_ids': [], 'software_ids': []})
+    with pytest.raises(ValidationError):
+        FlopsValidator._validate_reinstall(1, {'cpu': '2', 'public_key_ids': [], 'software_ids': []})
+
+
+def test_validate_change_backup_policy():
+    assert FlopsValidator._validate_change_backup_policy(3, 24) == {'quantity': 3, 'frequency': 24}
+    for quantity, frequency, field in [(None, 24, 'quantity'), (11, 24, 'quantity'), (3, 5, 'frequency')]:
+        with pytest.raises(ValidationError) as e:
+            FlopsValidator._validate_change_backup_policy(quantity, frequency)
+        assert str(e.value) == MESSAGES[field]
+    # booleans are integers, as before the validators were compiled from schemas
+    assert FlopsValidator._validate_change_backup_policy(True, 24) == {'quantity': True, 'frequency': 24}
+    with pytest.raises(ValidationError):
+        FlopsValidator._validate_change_backup_policy(False, 24)
+
+
+def test_validate_many():
+    specs = [
+        {'name': 'vm1', 'distribution_id': 3, 'tariff_id': 1, 'memory': 1024, 'public_key_ids': 1},
+        {'name': '', 'distribution_id': 3, 'tariff_id': 1, 'memory': 256, 'disk': 0, 'cpu': 20},
+        {'name': 'vm3', 'distribution_id': 3, 'tariff_id': 1, 'tenant_id': 'x', 'software_ids': None},
+    ]
+    errors = FlopsValidator.validate_many(specs)
+    assert errors[0] == []
+    assert errors[1] == [MESSAGES[f] for f in ('name', 'memory', 'disk', 'cpu')]
+    assert errors[2] == [MESSAGES['tenant_id'], MESSAGES['software_ids']]
+
+    # the same messages, in the same order, as the first error install_vm raises
+    for spec, spec_errors in zip(specs[1:], errors[1:]):
+        with pytest.raises(ValidationError) as e:
+            FlopsValidator._validate_create(dict(spec, tenant_id=spec.get('tenant_id', 1), public_key_ids=[],
+                                                 software_ids=[]))
+        assert str(e.value) == spec_errors[0]
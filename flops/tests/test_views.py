@@ -0,0 +1,93 @@
+import json
+from copy import deepcopy
+
+import pytest
+
+from flops import FlopsClient
+from flops.exceptions import NotFoundError
+from flops.helpers import transform_dict_keys_to_underscore
+from flops.models import VMRecord
+from flops.stub import StubServer
+from flops.tests.helpers import FakeSession
+from flops.tests.payloads import make_vms_response
+from flops.views import LazyMapping, LazySequence, materialize
+from flops.watch import VMWatcher
+
+
+def test_lazy_mapping():
+    payload = make_vms_response(3)
+    expected = transform_dict_keys_to_underscore(payload)
+    data = LazyMapping(json.loads(json.dumps(payload)))
+
+    vms = data['result']
+    assert isinstance(vms, LazySequence) and len(vms) == 3
+    assert vms[0]['backup_policy']['quantity'] == 2
+    assert vms[0] is not vms[1] and vms[0] is data['result'][0]
+    assert vms[1]._data is None  # untouched records are not translated
+    assert 'ip_addresses' in vms[0] and 'ipAddresses' not in vms[0]
+    assert data == expected and vms[-1:] == expected['result'][-1:]
+    assert materialize(data) == expected and type(materialize(data)['result'][2]) is dict
+    assert deepcopy(data) == expected
+
+
+def test_lazy_mutation():
+    data = LazyMapping({'status': 'OK', 'result': [{'vmId': 1}]})
+    data['operation_id'] = data.pop('result')[0]['vm_id']
+    data['tags'] = LazySequence([])
+    data['tags'].append({'name': 'a'})
+    assert materialize(data) == {'status': 'OK', 'operation_id': 1, 'tags': [{'name': 'a'}]}
+
+
+def test_client_lazy_responses():
+    with StubServer() as server:
+        fc = server.client(lazy_responses=True)
+        eager = server.client()
+        vm = server.add_vm('vm1')
+        server.add_vm('vm2')
+
+        vms = fc.get_vms()
+        assert isinstance(vms, LazySequence)
+        assert vms == eager.get_vms()
+        assert fc.get_vms_by_name('vm2')[0]['id'] == 2
+        assert fc.get_vm(vm['id'], as_records=True) == eager.get_vm(vm['id'])
+        assert isinstance(fc.get_vm(vm['id'], as_records=True), VMRecord)
+        assert fc.get_tariffs(order_by='price')[0]['price'] == 0
+        assert fc.reboot_vm(vm['id'])['operation_id']
+
+
+def test_client_lazy_get_vms_fills_tenants():
+    fc = FlopsClient('client_id', 'api_key', lazy_responses=True)
+    fc._session = FakeSession({'vm': make_vms_response(3), 'vm/2/reboot/': {'status': 'OK', 'operationId': 1}})
+
+    vms = fc.get_vms()
+    assert vms[0]['id'] == 1
+    assert type(vms._items[1]) is dict  # the tenant ids were read without translating the records
+    fc.reboot_vm(2)
+    assert [path for path, _ in fc._session.calls] == ['vm', 'vm/2/reboot/']
+    assert fc._session.calls[-1][1]['tenantId'] == vms[1]['tenant_id']
+
+
+def test_client_lazy_nested_error():
+    fc = FlopsClient('client_id', 'api_key', lazy_responses=True)
+    fc._session = FakeSession({'vm/1/': {'status': 'OK', 'result': {
+        'status': 'ERROR', 'errorCode': 'error.vm.not.found', 'errorMessage': 'not found'}}})
+    with pytest.raises(NotFoundError):
+        fc.get_vm(1)
+
+
+def test_client_lazy_batch_waits():
+    with StubServer(operation_duration=0.02) as server:
+        fc = server.client(lazy_responses=True)
+        vm_ids = [server.add_vm('vm{}'.format(i))['id'] for i in range(3)]
+
+        results = fc.map('reboot_vm', vm_ids, wait=True, timeout=10)
+
+        assert all(r.ok and r.operation['status'] == 'DONE' for r in results)
+
+
+def test_watch_lazy_responses():
+    watcher = VMWatcher(None)
+    assert len(watcher.diff(LazySequence([{'id': 1, 'state': 'on'}]))) == 1
+    assert watcher.diff(LazySequence([{'id': 1, 'state': 'on'}])) == []
+    change, = watcher.diff(LazySequence([{'id': 1, 'state': 'off'}]))
+    assert change.changed_fields == {'state': ('on', 'off')}
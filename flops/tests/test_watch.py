@@ -0,0 +1,57 @@
+import asyncio
+
+from flops import FlopsClient, AsyncFlopsClient
+from flops.tests.helpers import FakeAsyncPool, FakeSession
+from flops.watch import VMWatcher, CREATED, DELETED, CHANGED
+
+VM1 = {'id': 1, 'name': 'vm1', 'state': 'VIR_DOMAIN_RUNNING'}
+VM2 = {'id': 2, 'name': 'vm2', 'state': 'VIR_DOMAIN_RUNNING'}
+
+
+def test_diff():
+    watcher = VMWatcher(client=None)
+    assert [(c.type, c.vm_id) for c in watcher.diff([VM1, VM2])] == [(CREATED, 1), (CREATED, 2)]
+    assert watcher.diff([VM1, VM2]) == []
+
+    changes = watcher.diff([dict(VM1, state='VIR_DOMAIN_SHUTOFF'), {'id': 3, 'name': 'vm3'}])
+    assert [(c.type, c.vm_id) for c in changes] == [(CHANGED, 1), (CREATED, 3), (DELETED, 2)]
+    assert changes[0].changed_fields == {'state': ('VIR_DOMAIN_RUNNING', 'VIR_DOMAIN_SHUTOFF')}
+
+
+def test_diff_without_initial():
+    watcher = VMWatcher(client=None, emit_initial=False)
+    assert watcher.diff([VM1]) == []
+    assert [c.type for c in watcher.diff([])] == [DELETED]
+
+
+def test_next_delay_jitter():
+    watcher = VMWatcher(client=None, interval=10, jitter=0.2)
+    assert all(8 <= watcher.next_delay() <= 12 for _ in range(100))
+
+
+def snapshots():
+    responses = iter([[VM1], [VM1, VM2], [VM2]])
+    return lambda params: {'status': 'OK', 'result': next(responses)}
+
+
+def test_watch_vms():
+    fc = FlopsClient('client_id', 'api_key')
+    fc._session = FakeSession({'vm': snapshots()})
+
+    watch = fc.watch_vms(interval=0)
+    assert [next(watch)[:2] for _ in range(3)] == [(CREATED, 1), (CREATED, 2), (DELETED, 1)]
+
+
+def test_async_watch_vms():
+    client = AsyncFlopsClient('client_id', 'api_key')
+    client._pool = FakeAsyncPool({'vm': snapshots()})
+
+    async def main():
+        changes = []
+        async for change in client.watch_vms(interval=0):
+            changes.append((change.type, change.vm_id))
+            if len(changes) == 3:
+                return changes
+
+    assert asyncio.run(main()) == [(CREATED, 1), (CREATED, 2), (DELETED, 1)]
+    client.close()
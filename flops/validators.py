@@ -1,90 +1,177 @@
 from flops.exceptions import ValidationError
 
+MEMORY_RANGE = (512, 16384)
+DISK_RANGE = (8192, 524288)
+CPU_RANGE = (1, 12)
+MAX_DISK_MEMORY_RATIO = 64
+BACKUP_QUANTITY_RANGE = (1, 10)
+BACKUP_FREQUENCIES = (3, 6, 12, 24, 72)
 
-class FlopsValidator:
-    create_params = {'name', 'tenant_id', 'distribution_id', 'tariff_id', 'memory', 'disk', 'cpu', 'ip_count',
-                     'password', 'send_password', 'open_support_access', 'public_key_ids', 'software_ids'}
+MESSAGES = {
+    'vm_id': 'vm_id: Идентификатор виртуального сервера, число, обязательный',
+    'tariff_id': 'tariff_id: Идентификатор тарифа, число',
+    'name': 'name: Введите имя виртуального сервера',
+    'tenant_id': 'tenant_id: Идентификатор проекта, число, обязательный.',
+    'distribution_id': 'distribution_id: Идентификатор дистрибутива, число, обязательный.',
+    'memory': 'memory: Pазмер RAM в мегабайтах. Минимальное значение — 512, максимальное — 16384.',
+    'disk': 'disk: Размер HDD в мегабайтах, число.'
+            'При выборе фиксированного тарифа игнорируется.'
+            'Минимальное значение — 8192, максимальное — 524288',
+    'disk_memory_ratio': 'Между размерами RAM и HDD должно выполняться условие HDD/RAM >= 64.',
+    'cpu': 'cpu: Количество процессорных ядер, число. При выборе фиксированного тарифа \\ '
+           'игнорируется. Минимальное значение — 1, максимальное — 12',
+    'public_key_ids': 'public_key_ids: Список публичных ключей',
+    'software_ids': 'software_ids: Список программного обеспечения',
+    'quantity': 'quantity: Количество хранимых копий, число, обязательный. '
+                'Минимальное значение — 1, максимальное — 10.',
+    'frequency': 'frequency: Интервал между копиями в часах, число, обязательный. '
+                 'Одно из значений: 3, 6, 12, 24, 72.',
+}
 
-    @staticmethod
-    def _validate_reinstall(vm_id, params):
-        params = {k: v for k, v in params.items() if v is not None}
+# (rule, field, *args), checked in this order
+REINSTALL_SCHEMA = (
+    ('range', 'memory') + MEMORY_RANGE,
+    ('range', 'disk') + DISK_RANGE,
+    ('max_ratio', 'disk_memory_ratio', 'disk', 'memory', MAX_DISK_MEMORY_RATIO),
+    ('range', 'cpu') + CPU_RANGE,
+    ('sequence', 'public_key_ids'),
+    ('sequence', 'software_ids'),
+)
+RESIZE_SCHEMA = REINSTALL_SCHEMA[:4]
+CREATE_SCHEMA = (
+    ('type', 'tariff_id', (str, int)),
+    ('required', 'name'),
+    ('digits', 'tenant_id'),
+    ('digits', 'distribution_id'),
+) + REINSTALL_SCHEMA
+BACKUP_POLICY_SCHEMA = (
+    ('required_range', 'quantity') + BACKUP_QUANTITY_RANGE,
+    ('choice', 'frequency', BACKUP_FREQUENCIES),
+)
 
-        if not str(vm_id).isdigit():
-            raise ValidationError('vm_id: Идентификатор виртуального сервера, число, обязательный')
+INSTALL_DEFAULTS = {'send_password': True, 'open_support_access': False, 'public_key_ids': [], 'software_ids': []}
+
+
+def _required(field):
+    return lambda params: bool(params.get(field))
+
+
+def _digits(field):
+    return lambda params: str(params.get(field)).isdigit()
+
+
+def _optional_digits(field):
+    return lambda params: field not in params or str(params[field]).isdigit()
 
-        if 'memory' in params and (params['memory'] > 16384 or params['memory'] < 512):
-            raise ValidationError('memory: Pазмер RAM в мегабайтах. Минимальное значение — 512, максимальное — 16384.')
 
-        if 'disk' in params and (params['disk'] > 524288 or params['disk'] < 8192):
-            raise ValidationError('disk: Размер HDD в мегабайтах, число.'
-                                  'При выборе фиксированного тарифа игнорируется.'
-                                  'Минимальное значение — 8192, максимальное — 524288')
+def _type(field, types):
+    return lambda params: isinstance(params.get(field, ''), types)
 
-        if 'disk' in params and 'memory' in params and params['disk'] / params['memory'] > 64:
-            raise ValidationError('Между размерами RAM и HDD должно выполняться условие HDD/RAM >= 64.')
 
-        if 'cpu' in params and (params['cpu'] > 12 or params['cpu'] < 1):
-            raise ValidationError('cpu: Количество процессорных ядер, число. При выборе фиксированного тарифа \ '
-                                  'игнорируется. Минимальное значение — 1, максимальное — 12')
+NUMBER_TYPES = (int, float)
 
-        if not isinstance(params['public_key_ids'], (list, tuple)):
-            raise ValidationError('public_key_ids: Список публичных ключей')
 
-        if not isinstance(params['software_ids'], (list, tuple)):
-            raise ValidationError('software_ids: Список программного обеспечения')
+def _range(field, low, high):
+    def check(params):
+        value = params.get(field)
+        return value is None or isinstance(value, NUMBER_TYPES) and low <= value <= high
+    return check
 
-        return {k: v for k, v in params.items() if v is not None}
 
-    @staticmethod
-    def _validate_create(params):
-        params = {k: v for k, v in params.items() if v is not None}
+def _required_range(field, low, high):
+    def check(params):
+        value = params.get(field)
+        return isinstance(value, NUMBER_TYPES) and low <= value <= high
+    return check
 
-        assert isinstance(params.get('tariff_id', ''), (str, int))  # TODO fix this
 
-        if not params['name']:
-            raise ValidationError('name: Введите имя виртуального сервера')
+def _choice(field, choices):
+    return lambda params: params.get(field) in choices
 
-        if not str.isdigit(str(params['tenant_id'])):
-            raise ValidationError('tenant_id: Идентификатор проекта, число, обязательный.')
 
-        if not str.isdigit(str(params['distribution_id'])):
-            raise ValidationError('distribution_id: Идентификатор дистрибутива, число, обязательный.')
+def _max_ratio(name, numerator, denominator, max_ratio):
+    def check(params):
+        a, b = params.get(numerator), params.get(denominator)
+        return not (isinstance(a, NUMBER_TYPES) and isinstance(b, NUMBER_TYPES) and b > 0) or a <= b * max_ratio
+    return check
 
-        if 'memory' in params and (params['memory'] > 16384 or params['memory'] < 512):
-            raise ValidationError('memory: Pазмер RAM в мегабайтах. Минимальное значение — 512, максимальное — 16384.')
 
-        if 'disk' in params and (params['disk'] > 524288 or params['disk'] < 8192):
-            raise ValidationError('disk: Размер HDD в мегабайтах, число.'
-                                  'При выборе фиксированного тарифа игнорируется.'
-                                  'Минимальное значение — 8192, максимальное — 524288')
+def _sequence(field):
+    return lambda params: isinstance(params.get(field), (list, tuple))
 
-        if 'disk' in params and 'memory' in params and params['disk'] / params['memory'] > 64:
-            raise ValidationError('Между размерами RAM и HDD должно выполняться условие HDD/RAM >= 64.')
 
-        if 'cpu' in params and (params['cpu'] > 12 or params['cpu'] < 1):
-            raise ValidationError('cpu: Количество процессорных ядер, число. При выборе фиксированного тарифа \ '
-                                  'игнорируется. Минимальное значение — 1, максимальное — 12')
+RULES = {
+    'required': _required, 'digits': _digits, 'optional_digits': _optional_digits, 'type': _type, 'range': _range,
+    'required_range': _required_range, 'choice': _choice, 'max_ratio': _max_ratio, 'sequence': _sequence,
+}
 
-        if not isinstance(params['public_key_ids'], (list, tuple)):
-            raise ValidationError('public_key_ids: Список публичных ключей')
 
-        if not isinstance(params['software_ids'], (list, tuple)):
-            raise ValidationError('software_ids: Список программного обеспечения')
+def compile_schema(schema, messages=MESSAGES):
+    """
+    :return: list of (check(params) -> is valid, error message) built once from the schema rules
+    """
+    return [(RULES[rule](field, *args), messages[field]) for rule, field, *args in schema]
 
-        return {k: v for k, v in params.items() if v is not None}
 
-    @staticmethod
-    def _validate_change_backup_policy(quantity, frequency):
-        data = {}
+class CompiledValidator:
+    def __init__(self, schema, messages=MESSAGES):
+        self.checks = compile_schema(schema, messages)
+        self._functions = [check for check, _ in self.checks]
 
-        if not quantity or quantity < 1 or quantity > 10:
-            raise ValidationError('quantity: Количество хранимых копий, число, обязательный. '
-                                  'Минимальное значение — 1, максимальное — 10.')
-        data['quantity'] = quantity
+    def errors(self, params):
+        return [message for check, message in self.checks if not check(params)]
 
-        if not frequency or frequency not in {3, 6, 12, 24, 72}:
-            raise ValidationError('frequency: Интервал между копиями в часах, число, обязательный. '
-                                  'Одно из значений: 3, 6, 12, 24, 72.')
-        data['frequency'] = frequency
+    def __call__(self, params):
+        for check in self._functions:
+            if not check(params):
+                raise ValidationError(self.errors(params)[0])
+        return params
 
-        return data
+
+def install_params(spec):
+    """
+    :return: install_vm params of spec (install_vm keyword arguments) with the defaults of install_vm
+    """
+    params = dict(INSTALL_DEFAULTS, **spec)
+    for field in ('public_key_ids', 'software_ids'):
+        if isinstance(params[field], (str, int)):
+            params[field] = [params[field]]
+    return {k: v for k, v in params.items() if v is not None}
+
+
+class FlopsValidator:
+    create_params = {'name', 'tenant_id', 'distribution_id', 'tariff_id', 'memory', 'disk', 'cpu', 'ip_count',
+                     'password', 'send_password', 'open_support_access', 'public_key_ids', 'software_ids'}
+
+    _create_validator = CompiledValidator(CREATE_SCHEMA)
+    _reinstall_validator = CompiledValidator(REINSTALL_SCHEMA)
+    _backup_policy_validator = CompiledValidator(BACKUP_POLICY_SCHEMA)
+    # install_vm resolves a missing tenant_id, so specs only check a given one
+    _spec_validator = CompiledValidator(tuple(('optional_digits',) + rule[1:] if rule[1] == 'tenant_id' else rule
+                                              for rule in CREATE_SCHEMA))
+
+    @classmethod
+    def _validate_reinstall(cls, vm_id, params):
+        if not str(vm_id).isdigit():
+            raise ValidationError(MESSAGES['vm_id'])
+        return cls._reinstall_validator({k: v for k, v in params.items() if v is not None})
+
+    @classmethod
+    def _validate_create(cls, params):
+        return cls._create_validator({k: v for k, v in params.items() if v is not None})
+
+    @classmethod
+    def _validate_change_backup_policy(cls, quantity, frequency):
+        return cls._backup_policy_validator({'quantity': quantity, 'frequency': frequency})
+
+    @classmethod
+    def validate_many(cls, specs):
+        """
+        Checks install_vm keyword arguments of many planned VMs without stopping at the first error.
+        :return: list of error messages per spec, empty for valid specs
+        """
+        validator = cls._spec_validator
+        errors = []
+        for spec in specs:
+            errors.append(validator.errors(install_params(spec)))
+        return errors
@@ -0,0 +1,138 @@
+"""
+Lazy views of decoded API responses.
+
+LazyMapping and LazySequence wrap the camelCase JSON objects and translate keys to underscore only for
+the objects that are accessed. Reading data['result'][0]['id'] from a get_vms response converts the keys of
+one VM instead of the whole payload.
+
+    flops_client = FlopsClient(client_id, api_key, lazy_responses=True)
+    vms = flops_client.get_vms()  # LazySequence of LazyMapping
+    plain = materialize(vms)      # list of dicts, the same as without lazy_responses
+"""
+from collections.abc import Mapping, MutableMapping, MutableSequence, Sequence
+
+from flops.helpers import camelcase_to_underscore, transform_dict_keys_to_underscore, underscore_to_camelcase
+
+
+def _wrap(value):
+    value_type = type(value)
+    if value_type is dict:
+        return LazyMapping(value)
+    if value_type is list:
+        return LazySequence(value)
+    return value
+
+
+def materialize(value):
+    """
+    :return: value with all views replaced by plain dicts and lists
+    """
+    if isinstance(value, (LazyMapping, LazySequence)):
+        return value.materialize()
+    return transform_dict_keys_to_underscore(value)
+
+
+def peek_field(items, key):
+    """
+    :return: list of item.get(key) of a sequence of mappings. The items of a LazySequence are read without
+             translating their keys, so reading one field of a big response keeps it lazy.
+    """
+    if not isinstance(items, LazySequence):
+        return [item.get(key) for item in items]
+    raw_key = underscore_to_camelcase(key)
+    return [item.get(raw_key) if type(item) is dict else item.peek(key) for item in items._items]
+
+
+class LazyMapping(MutableMapping):
+    __slots__ = ('_raw', '_data')
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._data = None
+
+    @property
+    def _items(self):
+        # keys of this level are translated on first use; nested values are wrapped when they are read
+        if self._data is None:
+            self._data = {camelcase_to_underscore(k): v for k, v in self._raw.items()}
+            self._raw = None
+        return self._data
+
+    def __getitem__(self, key):
+        items = self._items
+        value = items[key]
+        if type(value) in (dict, list):
+            value = items[key] = _wrap(value)
+        return value
+
+    def __setitem__(self, key, value):
+        self._items[key] = value
+
+    def __delitem__(self, key):
+        del self._items[key]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items) if self._data is not None else len(self._raw)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return len(self) == len(other) and all(key in other and self[key] == other[key] for key in self)
+
+    def __repr__(self):
+        return 'LazyMapping({!r})'.format(self.materialize())
+
+    def peek(self, key, default=None):
+        """
+        :return: self.get(key) without translating the keys of this level; for scalar values, nested ones may be raw
+        """
+        if self._data is not None:
+            return self[key] if key in self._data else default
+        return self._raw.get(underscore_to_camelcase(key), default)
+
+    def materialize(self):
+        return {key: materialize(value) for key, value in self._items.items()}
+
+
+class LazySequence(MutableSequence):
+    __slots__ = ('_items',)
+
+    def __init__(self, raw):
+        self._items = raw
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazySequence([self[i] for i in range(*index.indices(len(self._items)))])
+        value = self._items[index]
+        if type(value) in (dict, list):
+            value = self._items[index] = _wrap(value)
+        return value
+
+    def __setitem__(self, index, value):
+        self._items[index] = value
+
+    def __delitem__(self, index):
+        del self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+    def insert(self, index, value):
+        self._items.insert(index, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return 'LazySequence({!r})'.format(self.materialize())
+
+    def materialize(self):
+        return [materialize(value) for value in self._items]
@@ -0,0 +1,72 @@
+import random
+from collections import namedtuple
+from time import sleep
+
+from flops.views import LazyMapping
+
+CREATED = 'created'
+DELETED = 'deleted'
+CHANGED = 'changed'
+
+
+class VMChange(namedtuple('VMChange', ['type', 'vm_id', 'vm', 'changed_fields'])):
+    """
+    type is one of CREATED, DELETED, CHANGED. vm is the last known record,
+    changed_fields maps each changed field to (old value, new value).
+    """
+
+
+class VMWatcher:
+    """
+    Diffs consecutive get_vms snapshots. Each record is compared with the previous one as a whole (a C level
+    dict comparison), and only the changed VMs are inspected field by field.
+    """
+
+    def __init__(self, client, interval=5, jitter=0.1, emit_initial=True):
+        self.client = client
+        self.interval = interval
+        self.jitter = jitter
+        self.emit_initial = emit_initial
+        self._vms = None
+
+    def diff(self, vms):
+        initial = self._vms is None
+        previous = self._vms or {}
+        current = {}
+        changes = []
+
+        for vm in vms:
+            if isinstance(vm, LazyMapping):  # plain dicts compare much faster
+                vm = vm.materialize()
+            vm_id = vm['id']
+            current[vm_id] = vm
+            old = previous.get(vm_id)
+            if old is None:
+                if not initial or self.emit_initial:
+                    changes.append(VMChange(CREATED, vm_id, vm, {}))
+            elif vm != old:
+                changed_fields = {
+                    field: (old.get(field), vm.get(field))
+                    for field in set(old) | set(vm) if old.get(field) != vm.get(field)
+                }
+                if changed_fields:
+                    changes.append(VMChange(CHANGED, vm_id, vm, changed_fields))
+
+        for vm_id, vm in previous.items():
+            if vm_id not in current:
+                changes.append(VMChange(DELETED, vm_id, vm, {}))
+
+        self._vms = current
+        return changes
+
+    def poll(self):
+        return self.diff(self.client.get_vms())
+
+    def next_delay(self):
+        return max(0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def __iter__(self):
+        while True:
+            for change in self.poll():
+                yield change
+            sleep(self.next_delay())
@@ -25,9 +25,11 @@ setup(
         'Intended Audience :: Developers',
         'Development Status :: 5 - Production/Stable',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 2',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Topic :: Internet :: WWW/HTTP'
     ],
+    python_requires='>=3.7',
     install_requires=['requests'],
+    extras_require={'fast': ['orjson']},
 )